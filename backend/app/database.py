@@ -5,6 +5,7 @@ Neon PostgreSQL Connection with SQLite fallback for local development
 
 import os
 import logging
+import orjson
 from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -18,6 +19,33 @@ logger = logging.getLogger(__name__)
 # Get database URL from environment
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 
+# Worker processes serving the app (gunicorn.conf.py exports its count);
+# each one has its own connection pool
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY") or 1))
+
+# Connection pool sizing for PostgreSQL. DB_MAX_CONNECTIONS is the budget for
+# all workers together, kept below PostgreSQL's default max_connections=100
+# to leave room for migrations and admin sessions, and split evenly between
+# the workers. One worker never needs more than 60: sync endpoints run on
+# FastAPI's threadpool (40 threads by default), so 40 pooled connections
+# plus 20 overflow already serve every thread without queueing.
+# DB_POOL_SIZE / DB_MAX_OVERFLOW override the derived per-worker values.
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "80"))
+_worker_connections = max(1, min(60, DB_MAX_CONNECTIONS // WEB_CONCURRENCY))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE") or max(1, _worker_connections * 2 // 3))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW") or _worker_connections - DB_POOL_SIZE)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def _json_serializer(value) -> str:
+    """Serialize JSON/JSONB column values with orjson, accepting numpy scalars"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+# JSON columns (CareScore.contributing_signals, Escalation.health_summary, ...)
+# are encoded and decoded with orjson instead of the stdlib json module
+_JSON_CODEC = {"json_serializer": _json_serializer, "json_deserializer": orjson.loads}
+
 # Track if we're using fallback
 _using_fallback = False
 _engine = None
@@ -40,18 +68,31 @@ def _create_engine_with_fallback():
         if "neon.tech" in database_url:
             _engine = create_engine(
                 database_url,
+                **_JSON_CODEC,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
                 pool_pre_ping=True,
-                pool_recycle=300,
+                pool_recycle=300,  # Neon closes idle connections after 5 minutes
+                pool_use_lifo=True,
                 connect_args={"sslmode": "require"}
             )
         elif database_url.startswith("sqlite"):
             _engine = create_engine(
                 database_url,
+                **_JSON_CODEC,
                 connect_args={"check_same_thread": False}
             )
             _using_fallback = True
         else:
-            _engine = create_engine(database_url, pool_pre_ping=True)
+            _engine = create_engine(
+                database_url,
+                **_JSON_CODEC,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_pre_ping=True,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_use_lifo=True
+            )
         
         # Test connection
         with _engine.connect() as conn:
@@ -68,6 +109,7 @@ def _create_engine_with_fallback():
         database_url = "sqlite:///./pulseai_local.db"
         _engine = create_engine(
             database_url,
+            **_JSON_CODEC,
             connect_args={"check_same_thread": False}
         )
         _using_fallback = True
@@ -78,6 +120,7 @@ def _create_engine_with_fallback():
         database_url = "sqlite:///./pulseai_local.db"
         _engine = create_engine(
             database_url,
+            **_JSON_CODEC,
             connect_args={"check_same_thread": False}
         )
         _using_fallback = True
@@ -4,16 +4,26 @@ Clinical surveillance platform for early health warning
 """
 
 import os
+import asyncio
+import logging
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from app.database import get_db, init_db
+from app.database import get_db, init_db, SessionLocal
+from app.responses import ORJSONResponse
 from app.routes import health, analysis, escalation, users, webhook, auth, dashboard, oauth, care_score
 from app.routers import doctors, caretakers, relationships, notifications, patients
 from app.services.synthetic_data import SyntheticDataGenerator
-from app.services.gemini_service import GeminiService
+from app.services.gemini_service import get_gemini_service, close_gemini_service
+from app.services.auth_service import flush_api_key_usage
+from app.routes.care_score import close_gemini_client
+
+logger = logging.getLogger(__name__)
+
+# How often batched API key usage counters are written to the database
+API_KEY_USAGE_FLUSH_SECONDS = 5
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -21,7 +31,8 @@ app = FastAPI(
     description="Continuous clinical surveillance platform for early health warning",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS configuration
@@ -39,6 +50,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Next-page cursor of GET /health/user/{id}
+    expose_headers=["X-Next-Before", "X-Next-Before-Id"],
 )
 
 
@@ -66,10 +79,38 @@ app.include_router(patients.router)       # Patient care team management
 app.include_router(care_score.router)     # CareScore calculation
 
 
+def _flush_api_key_usage():
+    db = SessionLocal()
+    try:
+        flush_api_key_usage(db)
+    finally:
+        db.close()
+
+
+async def _flush_api_key_usage_periodically():
+    """Persist batched API key usage counters in the background"""
+    while True:
+        await asyncio.sleep(API_KEY_USAGE_FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(_flush_api_key_usage)
+        except Exception as e:
+            logger.warning(f"Failed to flush API key usage: {e}")
+
+
 @app.on_event("startup")
 async def startup():
     """Initialize database on startup"""
     init_db()
+    app.state.api_key_usage_task = asyncio.create_task(_flush_api_key_usage_periodically())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background tasks and write any pending usage counters"""
+    app.state.api_key_usage_task.cancel()
+    await asyncio.to_thread(_flush_api_key_usage)
+    await close_gemini_client()
+    await close_gemini_service()
 
 
 @app.get("/")
@@ -102,7 +143,7 @@ async def generate(prompt: Prompt):
     """
     Proxy to Gemini API for AI-generated insights
     """
-    gemini = GeminiService()
+    gemini = get_gemini_service()
     result = await gemini.generate(prompt.text)
     return result
 
@@ -110,7 +151,7 @@ async def generate(prompt: Prompt):
 @app.get("/gemini/health")
 async def gemini_health():
     """Check Gemini API health"""
-    gemini = GeminiService()
+    gemini = get_gemini_service()
     return await gemini.health_check()
 
 
@@ -182,9 +223,11 @@ def compute_demo_scores(db: Session = Depends(get_db)):
 
 if __name__ == "__main__":
     import uvicorn
+    workers = int(os.getenv("WEB_CONCURRENCY") or 1)
     uvicorn.run(
         "app.main:app",
         host=os.getenv("HOST", "0.0.0.0"),
         port=int(os.getenv("PORT", 8000)),
-        reload=True
+        workers=workers,
+        reload=workers == 1  # Auto-reload only works with a single process
     )
@@ -9,3 +9,6 @@ from app.models.caretaker_profile import CaretakerProfile
 from app.models.patient_doctor import PatientDoctor
 from app.models.patient_caretaker import PatientCaretaker
 from app.models.notification import Notification
+from app.models.user_status import UserStatusCache
+from app.models.health_daily import HealthDataDaily
+from app.models.suggestion_cache import SuggestionCacheEntry
@@ -3,9 +3,8 @@ API Key Model for Pulse AI
 Used for webhook authentication
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index, LargeBinary, func
 from sqlalchemy.orm import relationship
-from datetime import datetime
 from app.database import Base
 
 
@@ -14,12 +13,13 @@ class APIKey(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    key = Column(String(255), unique=True, nullable=False, index=True)
+    key = Column(LargeBinary(32), unique=True, nullable=False)  # SHA-256 digest of the raw key
+    key_prefix = Column(String(16), nullable=True, index=True)  # Non-secret lookup id
     name = Column(String(100), nullable=True)  # Friendly name for the key
     device_id = Column(String(255), nullable=True)  # Optional device binding
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
     last_used_at = Column(DateTime, nullable=True)
     expires_at = Column(DateTime, nullable=True)
     
@@ -31,6 +31,13 @@ class APIKey(Base):
     
     # Relationship
     user = relationship("User", back_populates="api_keys")
+    
+    # Fetch created_at with RETURNING as part of the INSERT
+    __mapper_args__ = {"eager_defaults": True}
+    
+    __table_args__ = (
+        Index("ix_api_keys_user_active", "user_id", "is_active"),
+    )
 
 
 class DeviceRegistration(Base):
@@ -43,7 +50,7 @@ class DeviceRegistration(Base):
     device_type = Column(String(50), nullable=True)  # android, ios, etc.
     
     # Timestamps
-    registered_at = Column(DateTime, default=datetime.utcnow)
+    registered_at = Column(DateTime, server_default=func.now())
     last_sync_at = Column(DateTime, nullable=True)
     
     # Status
@@ -51,3 +58,6 @@ class DeviceRegistration(Base):
     
     # Relationship
     user = relationship("User", back_populates="devices")
+    
+    # Fetch registered_at with RETURNING as part of the INSERT
+    __mapper_args__ = {"eager_defaults": True}
@@ -3,11 +3,15 @@ CareScore Model for Pulse AI
 Stores computed risk scores and analysis results
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Text, Index, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
 
+# JSONB on PostgreSQL, plain JSON (stored as text) on the SQLite fallback
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 
 class CareScore(Base):
     __tablename__ = "care_scores"
@@ -31,7 +35,7 @@ class CareScore(Base):
     stability_score = Column(Float, default=0)  # Trend stability 0-100
     
     # Explainability
-    contributing_signals = Column(Text, nullable=True)  # JSON array
+    contributing_signals = Column(JSONType, nullable=True)  # List of deviation dicts
     explanation = Column(Text, nullable=True)  # Human-readable explanation
     
     # Status
@@ -39,6 +43,14 @@ class CareScore(Base):
     
     # Relationship
     user = relationship("User", back_populates="care_scores")
+    
+    # Fetch server-generated values with RETURNING as part of the INSERT
+    __mapper_args__ = {"eager_defaults": True}
+    
+    __table_args__ = (
+        # Latest-score and history lookups per user
+        Index("ix_care_scores_user_timestamp", "user_id", timestamp.desc()),
+    )
 
 
 class Escalation(Base):
@@ -55,7 +67,7 @@ class Escalation(Base):
     # Content
     title = Column(String, nullable=False)
     message = Column(Text, nullable=False)
-    health_summary = Column(Text, nullable=True)  # JSON
+    health_summary = Column(JSONType, nullable=True)
     
     # User interaction
     acknowledged = Column(Integer, default=0)
@@ -63,3 +75,10 @@ class Escalation(Base):
     
     # Relationship
     user = relationship("User", back_populates="escalations")
+    
+    __table_args__ = (
+        # Per-user escalation listings, newest first
+        Index("ix_escalations_user_timestamp", "user_id", timestamp.desc()),
+        # Recent-escalation checks per user and level
+        Index("ix_escalations_user_level_timestamp", "user_id", "level", "timestamp"),
+    )
@@ -0,0 +1,125 @@
+"""
+Daily Health Rollup Model for Pulse AI
+Per-user, per-day sums and counts of the trend signals, kept current on write
+so trend endpoints read one row per day instead of aggregating raw readings
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Iterable
+
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey, event, select, delete, func, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.database import Base
+from app.models.health_data import HealthData
+
+# Signals rolled up per day
+ROLLUP_SIGNALS = ("heart_rate", "hrv", "sleep_duration", "activity_level", "breathing_rate")
+
+
+class HealthDataDaily(Base):
+    __tablename__ = "health_data_daily"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    # Sum and count of non-zero readings per signal; average = sum / count
+    heart_rate_sum = Column(Float, nullable=True)
+    heart_rate_count = Column(Integer, default=0)
+    hrv_sum = Column(Float, nullable=True)
+    hrv_count = Column(Integer, default=0)
+    sleep_duration_sum = Column(Float, nullable=True)
+    sleep_duration_count = Column(Integer, default=0)
+    activity_level_sum = Column(Float, nullable=True)
+    activity_level_count = Column(Integer, default=0)
+    breathing_rate_sum = Column(Float, nullable=True)
+    breathing_rate_count = Column(Integer, default=0)
+
+    reading_count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def average(self, signal: str):
+        count = getattr(self, f"{signal}_count")
+        return getattr(self, f"{signal}_sum") / count if count else None
+
+
+def refresh_daily_rollup(connection, user_id: int, days: Iterable[date]) -> None:
+    """Recompute the rollup rows of the given days from health_data"""
+    aggregates = [func.count().label("reading_count")]
+    for signal in ROLLUP_SIGNALS:
+        # Zero readings count as missing, matching the trend endpoints
+        value = func.nullif(getattr(HealthData, signal), 0)
+        aggregates.append(func.sum(value).label(f"{signal}_sum"))
+        aggregates.append(func.count(value).label(f"{signal}_count"))
+
+    dialect = connection.dialect.name
+    for day in set(days):
+        start = datetime.combine(day, time.min)
+        row = connection.execute(
+            select(*aggregates).where(
+                HealthData.user_id == user_id,
+                HealthData.timestamp >= start,
+                HealthData.timestamp < start + timedelta(days=1)
+            )
+        ).one()
+
+        if not row.reading_count:
+            connection.execute(
+                delete(HealthDataDaily).where(
+                    HealthDataDaily.user_id == user_id,
+                    HealthDataDaily.day == day
+                )
+            )
+            continue
+
+        values = dict(row._mapping, updated_at=datetime.utcnow())
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(HealthDataDaily).values(user_id=user_id, day=day, **values)
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=[HealthDataDaily.user_id, HealthDataDaily.day],
+                set_=values
+            ))
+        else:
+            connection.execute(
+                delete(HealthDataDaily).where(
+                    HealthDataDaily.user_id == user_id,
+                    HealthDataDaily.day == day
+                )
+            )
+            connection.execute(
+                HealthDataDaily.__table__.insert().values(user_id=user_id, day=day, **values)
+            )
+
+
+def _reading_days(obj: HealthData) -> set:
+    """Days a flushed reading affects, including the old day if its timestamp moved"""
+    timestamps = [obj.timestamp]
+    history = inspect(obj).attrs.timestamp.history
+    timestamps.extend(history.deleted or ())
+    return {ts.date() for ts in timestamps if ts is not None}
+
+
+@event.listens_for(HealthData.timestamp, "set", active_history=True)
+def _load_previous_reading_day(target, value, oldvalue, initiator):
+    """
+    Registered with active_history so assigning a new timestamp to an expired
+    reading (e.g. after a commit) loads the old one first; otherwise its
+    history is empty and _reading_days misses the day it moved away from
+    """
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_daily_rollup(session, flush_context):
+    """Refresh the rollup rows of every day whose readings changed in this flush"""
+    affected = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, HealthData) and obj.user_id is not None:
+            affected.setdefault(obj.user_id, set()).update(_reading_days(obj))
+
+    if not affected:
+        return
+
+    connection = session.connection()
+    for user_id, days in affected.items():
+        refresh_daily_rollup(connection, user_id, days)
@@ -3,7 +3,7 @@ Health Data Model for Pulse AI
 Stores wearable and manual health inputs
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -51,4 +51,9 @@ class HealthData(Base):
     
     # Relationship
     user = relationship("User", back_populates="health_data")
+    
+    __table_args__ = (
+        # Latest-reading and time-window lookups per user
+        Index("ix_health_data_user_timestamp", "user_id", timestamp.desc()),
+    )
 
@@ -3,7 +3,7 @@ Patient-Doctor Relationship Model for Pulse AI
 Manages connections between patients and their healthcare providers
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -31,3 +31,7 @@ class PatientDoctor(Base):
     # Relationships
     patient = relationship("User", foreign_keys=[patient_id])
     doctor = relationship("User", foreign_keys=[doctor_id])
+    
+    __table_args__ = (
+        Index("ix_patient_doctors_patient_doctor", "patient_id", "doctor_id"),
+    )
@@ -0,0 +1,20 @@
+"""
+Suggestion Cache Model for Pulse AI
+Gemini health suggestions by bucketed prompt inputs, persisted so the
+in-memory suggestion cache starts warm after a restart and is shared by
+every worker
+"""
+
+from sqlalchemy import Column, String, DateTime
+from datetime import datetime
+from app.database import Base
+from app.models.care_score import JSONType
+
+
+class SuggestionCacheEntry(Base):
+    __tablename__ = "suggestion_cache"
+
+    # Serialized suggestion cache key (see gemini_health_service._suggestion_key)
+    key = Column(String, primary_key=True)
+    suggestions = Column(JSONType, nullable=False)  # List of suggestion strings
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
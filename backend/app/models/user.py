@@ -3,9 +3,8 @@ User Model for Pulse AI
 Supports multiple roles: patient, doctor, caretaker
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Enum, func
 from sqlalchemy.orm import relationship
-from datetime import datetime
 from app.database import Base
 import enum
 
@@ -25,7 +24,7 @@ class User(Base):
     age = Column(Integer, nullable=True)
     gender = Column(String, nullable=True)
     phone = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
     is_active = Column(Boolean, default=True)
     
     # Role management
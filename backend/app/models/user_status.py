@@ -0,0 +1,110 @@
+"""
+User Status Summary Model for Pulse AI
+One row per user with the latest CareScore and reading, kept current on write
+so dashboard status polls read a single row
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, event, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from datetime import datetime
+from app.database import Base
+from app.models.health_data import HealthData
+from app.models.care_score import CareScore
+
+# Signals of the latest reading mirrored as latest_<signal> columns
+LATEST_READING_FIELDS = (
+    "heart_rate", "hrv", "sleep_duration", "sleep_quality", "activity_level",
+    "breathing_rate", "bp_systolic", "bp_diastolic", "blood_sugar"
+)
+
+
+class UserStatusCache(Base):
+    __tablename__ = "user_status_cache"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    # Latest CareScore
+    care_score = Column(Float, nullable=True)
+    status = Column(String, nullable=True)
+    score_timestamp = Column(DateTime, nullable=True)
+
+    # Latest reading
+    latest_heart_rate = Column(Float, nullable=True)
+    latest_hrv = Column(Float, nullable=True)
+    latest_sleep_duration = Column(Float, nullable=True)
+    latest_sleep_quality = Column(Float, nullable=True)
+    latest_activity_level = Column(Float, nullable=True)
+    latest_breathing_rate = Column(Float, nullable=True)
+    latest_bp_systolic = Column(Float, nullable=True)
+    latest_bp_diastolic = Column(Float, nullable=True)
+    latest_blood_sugar = Column(Float, nullable=True)
+    latest_reading_at = Column(DateTime, nullable=True)
+
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def latest_reading(self) -> dict:
+        """Signal values of the latest reading, keyed like HealthData columns"""
+        return {field: getattr(self, f"latest_{field}") for field in LATEST_READING_FIELDS}
+
+
+def refresh_user_status(connection, user_id: int) -> None:
+    """Recompute a user's summary row from care_scores and health_data"""
+    score = connection.execute(
+        select(CareScore.care_score, CareScore.status, CareScore.timestamp)
+        .where(CareScore.user_id == user_id)
+        .order_by(CareScore.timestamp.desc())
+        .limit(1)
+    ).first()
+
+    reading = connection.execute(
+        select(HealthData.timestamp, *[getattr(HealthData, field) for field in LATEST_READING_FIELDS])
+        .where(HealthData.user_id == user_id)
+        .order_by(HealthData.timestamp.desc())
+        .limit(1)
+    ).first()
+
+    values = {
+        "care_score": score.care_score if score else None,
+        "status": score.status if score else None,
+        "score_timestamp": score.timestamp if score else None,
+        **{
+            f"latest_{field}": getattr(reading, field) if reading else None
+            for field in LATEST_READING_FIELDS
+        },
+        "latest_reading_at": reading.timestamp if reading else None,
+        "updated_at": datetime.utcnow()
+    }
+
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(UserStatusCache).values(user_id=user_id, **values)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[UserStatusCache.user_id],
+            set_=values
+        ))
+        return
+
+    result = connection.execute(
+        update(UserStatusCache).where(UserStatusCache.user_id == user_id).values(**values)
+    )
+    if result.rowcount == 0:
+        connection.execute(UserStatusCache.__table__.insert().values(user_id=user_id, **values))
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_user_status(session, flush_context):
+    """Refresh the summary row of every user whose scores or readings changed in this flush"""
+    user_ids = {
+        obj.user_id
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, (CareScore, HealthData)) and obj.user_id is not None
+    }
+
+    if not user_ids:
+        return
+
+    connection = session.connection()
+    for user_id in user_ids:
+        refresh_user_status(connection, user_id)
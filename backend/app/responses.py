@@ -0,0 +1,18 @@
+"""
+Response classes for Pulse AI
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, which is several times faster than the
+    stdlib encoder and serializes datetimes and numpy scalars natively
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
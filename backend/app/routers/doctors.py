@@ -7,10 +7,11 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from app.database import get_db
 from app.models import User, DoctorProfile, PatientDoctor, HealthData, CareScore
+from app.services.notification_service import NotificationService
 
 router = APIRouter(prefix="/doctors", tags=["Doctors"])
 
@@ -263,7 +264,6 @@ def get_patient_health_summary(
     ).order_by(CareScore.timestamp.desc()).first()
     
     # Get recent health data (last 24 hours)
-    from datetime import timedelta
     cutoff = datetime.utcnow() - timedelta(hours=24)
     
     recent_data = db.query(HealthData).filter(
@@ -308,7 +308,6 @@ def get_patient_health_summary(
                 trend = "worsening"
                 
     # Get health suggestions
-    from app.services.notification_service import NotificationService
     notification_service = NotificationService(db)
     suggestions = notification_service.get_health_suggestions(
         latest_score.care_score if latest_score else 0
@@ -4,12 +4,13 @@ Handles patient-specific endpoints including care team management
 """
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
 from typing import List, Optional
 from pydantic import BaseModel
 
 from app.database import get_db
 from app.models import User, PatientDoctor, PatientCaretaker, DoctorProfile, CaretakerProfile
+from app.services.notification_service import NotificationService
 
 router = APIRouter(prefix="/patients", tags=["Patients"])
 
@@ -34,50 +35,52 @@ class ConnectionRequest(BaseModel):
     target_user_id: int
 
 
-@router.get("/care-team/{patient_user_id}", response_model=List[CareTeamMember])
+# Hot list endpoints build their items straight from trusted DB rows, so they
+# use model_construct and document the schema via `responses` instead of
+# response_model to avoid validating every item twice
+@router.get("/care-team/{patient_user_id}", responses={200: {"model": List[CareTeamMember]}})
 def get_care_team(patient_user_id: int, db: Session = Depends(get_db)):
     """Get all connected doctors and caretakers for a patient"""
     care_team = []
     
-    # Get connected doctors
-    doctor_connections = db.query(PatientDoctor).filter(
+    # Get connected doctors with their user row and profile in a single query
+    doctor_rows = db.query(PatientDoctor, User, DoctorProfile).join(
+        User, User.id == PatientDoctor.doctor_id
+    ).outerjoin(
+        DoctorProfile, DoctorProfile.user_id == PatientDoctor.doctor_id
+    ).filter(
         PatientDoctor.patient_id == patient_user_id
     ).all()
     
-    for conn in doctor_connections:
-        doctor = db.query(User).filter(User.id == conn.doctor_id).first()
-        if doctor:
-            profile = db.query(DoctorProfile).filter(
-                DoctorProfile.user_id == conn.doctor_id
-            ).first()
-            
-            care_team.append(CareTeamMember(
-                id=doctor.id,
-                name=doctor.name,
-                role="doctor",
-                specialization=profile.specialization if profile else None,
-                status=conn.status
-            ))
+    for conn, doctor, profile in doctor_rows:
+        care_team.append(CareTeamMember.model_construct(
+            id=doctor.id,
+            name=doctor.name,
+            role="doctor",
+            specialization=profile.specialization if profile else None,
+            status=conn.status
+        ))
     
-    # Get connected caretakers
-    caretaker_connections = db.query(PatientCaretaker).filter(
+    # Get connected caretakers with their user row in a single query
+    caretaker_rows = db.query(PatientCaretaker, User).join(
+        User, User.id == PatientCaretaker.caretaker_id
+    ).filter(
         PatientCaretaker.patient_id == patient_user_id
     ).all()
     
-    for conn in caretaker_connections:
-        caretaker = db.query(User).filter(User.id == conn.caretaker_id).first()
-        if caretaker:
-            care_team.append(CareTeamMember(
-                id=caretaker.id,
-                name=caretaker.name,
-                role="caretaker",
-                status=conn.status
-            ))
+    for conn, caretaker in caretaker_rows:
+        care_team.append(CareTeamMember.model_construct(
+            id=caretaker.id,
+            name=caretaker.name,
+            role="caretaker",
+            specialization=None,
+            status=conn.status
+        ))
     
     return care_team
 
 
-@router.get("/search-doctors", response_model=List[DoctorSearchResult])
+@router.get("/search-doctors", responses={200: {"model": List[DoctorSearchResult]}})
 def search_doctors(
     query: Optional[str] = None,
     specialization: Optional[str] = None,
@@ -85,7 +88,13 @@ def search_doctors(
     db: Session = Depends(get_db)
 ):
     """Search for doctors to connect with"""
-    doctors_query = db.query(User, DoctorProfile).join(
+    doctors_query = db.query(
+        User.id,
+        User.name,
+        DoctorProfile.specialization,
+        DoctorProfile.hospital_name,
+        DoctorProfile.city
+    ).join(
         DoctorProfile, User.id == DoctorProfile.user_id
     ).filter(User.role == "doctor")
     
@@ -103,14 +112,14 @@ def search_doctors(
     results = doctors_query.limit(20).all()
     
     return [
-        DoctorSearchResult(
-            id=user.id,
-            name=user.name,
-            specialization=profile.specialization,
-            hospital_name=profile.hospital_name,
-            city=profile.city
+        DoctorSearchResult.model_construct(
+            id=row.id,
+            name=row.name,
+            specialization=row.specialization,
+            hospital_name=row.hospital_name,
+            city=row.city
         )
-        for user, profile in results
+        for row in results
     ]
 
 
@@ -121,26 +130,29 @@ def request_doctor_connection(
     db: Session = Depends(get_db)
 ):
     """Request connection with a doctor"""
-    # Check if patient exists
-    patient = db.query(User).filter(User.id == patient_user_id).first()
-    if not patient:
+    # Load the patient along with the doctor and duplicate-connection
+    # checks in a single round-trip
+    target = aliased(User)
+    row = db.query(
+        User,
+        db.query(target).filter(
+            target.id == request.target_user_id,
+            target.role == "doctor"
+        ).exists().label("doctor_exists"),
+        db.query(PatientDoctor).filter(
+            PatientDoctor.patient_id == patient_user_id,
+            PatientDoctor.doctor_id == request.target_user_id
+        ).exists().label("connection_exists")
+    ).filter(User.id == patient_user_id).first()
+    
+    if not row:
         raise HTTPException(status_code=404, detail="Patient not found")
     
-    # Check if doctor exists
-    doctor = db.query(User).filter(
-        User.id == request.target_user_id, 
-        User.role == "doctor"
-    ).first()
-    if not doctor:
+    patient = row.User
+    if not row.doctor_exists:
         raise HTTPException(status_code=404, detail="Doctor not found")
     
-    # Check if connection already exists
-    existing = db.query(PatientDoctor).filter(
-        PatientDoctor.patient_id == patient_user_id,
-        PatientDoctor.doctor_id == request.target_user_id
-    ).first()
-    
-    if existing:
+    if row.connection_exists:
         raise HTTPException(status_code=400, detail="Connection already exists")
     
     # Create connection request
@@ -151,17 +163,16 @@ def request_doctor_connection(
     )
     
     db.add(connection)
-    db.commit()
     
-    # Send notification to doctor
-    from app.services.notification_service import NotificationService
-    notification_service = NotificationService(db)
-    notification_service.send_connection_notification(
+    # Notify the doctor in the same transaction as the connection
+    NotificationService(db).send_connection_notification(
         to_user_id=request.target_user_id,
         from_user_id=patient_user_id,
         connection_type="doctor_request",
-        action="request"
+        action="request",
+        from_user=patient
     )
+    db.commit()
     
     return {"message": "Connection request sent", "status": "pending"}
 
@@ -173,26 +184,29 @@ def invite_caretaker(
     db: Session = Depends(get_db)
 ):
     """Invite a caretaker to monitor patient"""
-    # Check if patient exists
-    patient = db.query(User).filter(User.id == patient_user_id).first()
-    if not patient:
+    # Load the patient along with the caretaker and duplicate-connection
+    # checks in a single round-trip
+    target = aliased(User)
+    row = db.query(
+        User,
+        db.query(target).filter(
+            target.id == request.target_user_id,
+            target.role == "caretaker"
+        ).exists().label("caretaker_exists"),
+        db.query(PatientCaretaker).filter(
+            PatientCaretaker.patient_id == patient_user_id,
+            PatientCaretaker.caretaker_id == request.target_user_id
+        ).exists().label("connection_exists")
+    ).filter(User.id == patient_user_id).first()
+    
+    if not row:
         raise HTTPException(status_code=404, detail="Patient not found")
     
-    # Check if caretaker exists
-    caretaker = db.query(User).filter(
-        User.id == request.target_user_id,
-        User.role == "caretaker"
-    ).first()
-    if not caretaker:
+    patient = row.User
+    if not row.caretaker_exists:
         raise HTTPException(status_code=404, detail="Caretaker not found")
     
-    # Check if connection already exists
-    existing = db.query(PatientCaretaker).filter(
-        PatientCaretaker.patient_id == patient_user_id,
-        PatientCaretaker.caretaker_id == request.target_user_id
-    ).first()
-    
-    if existing:
+    if row.connection_exists:
         raise HTTPException(status_code=400, detail="Connection already exists")
     
     # Create connection
@@ -203,17 +217,16 @@ def invite_caretaker(
     )
     
     db.add(connection)
-    db.commit()
     
-    # Send notification
-    from app.services.notification_service import NotificationService
-    notification_service = NotificationService(db)
-    notification_service.send_connection_notification(
+    # Notify the caretaker in the same transaction as the connection
+    NotificationService(db).send_connection_notification(
         to_user_id=request.target_user_id,
         from_user_id=patient_user_id,
         connection_type="caretaker_invite",
-        action="request"
+        action="request",
+        from_user=patient
     )
+    db.commit()
     
     return {"message": "Caretaker invitation sent", "status": "pending"}
 
@@ -243,17 +256,15 @@ def accept_connection(
         raise HTTPException(status_code=404, detail="Connection request not found")
     
     connection.status = "accepted"
-    db.commit()
     
-    # Send notification
-    from app.services.notification_service import NotificationService
-    notification_service = NotificationService(db)
-    notification_service.send_connection_notification(
+    # Notify the patient in the same transaction as the status change
+    NotificationService(db).send_connection_notification(
         to_user_id=request.target_user_id,
         from_user_id=user_id,
         connection_type=f"{connection_type}_request",
         action="accept"
     )
+    db.commit()
     
     return {"message": "Connection accepted", "status": "accepted"}
 
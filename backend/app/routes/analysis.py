@@ -3,21 +3,29 @@ Analysis Routes for Pulse AI
 CareScore, anomaly detection, and training endpoints
 """
 
-import json
-from fastapi import APIRouter, Depends, HTTPException
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional, Dict
+from datetime import datetime
 
 from app.database import get_db
+from app.responses import ORJSONResponse
 from app.models.user import User
 from app.models.health_data import HealthData
 from app.models.care_score import CareScore
+from app.models.user_status import UserStatusCache
 from app.services.carescore_engine import CareScoreEngine
 from app.services.anomaly_detector import AnomalyDetector
+from app.services.response_cache import carescore_cache
+from app.services.pagination import newest_first_page
 
 router = APIRouter(prefix="/analysis", tags=["Analysis"])
 
+# Largest page the history endpoint will return
+MAX_HISTORY_PAGE = 100
+
 
 class AnalyzeRequest(BaseModel):
     user_id: int
@@ -104,6 +112,11 @@ def get_carescore(user_id: int, db: Session = Depends(get_db)):
     """
     Get current CareScore for a user
     """
+    # Serve the pre-serialized body while it is fresh; compute invalidates it
+    cached = carescore_cache.get(user_id)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
     # Get latest CareScore
     latest_score = db.query(CareScore).filter(
         CareScore.user_id == user_id
@@ -112,7 +125,7 @@ def get_carescore(user_id: int, db: Session = Depends(get_db)):
     if not latest_score:
         raise HTTPException(status_code=404, detail="No CareScore found")
     
-    return {
+    body = orjson.dumps({
         "user_id": user_id,
         "care_score": latest_score.care_score,
         "status": latest_score.status,
@@ -127,10 +140,13 @@ def get_carescore(user_id: int, db: Session = Depends(get_db)):
             "confidence": latest_score.confidence_score,
             "stability": latest_score.stability_score
         },
-        "contributing_signals": json.loads(latest_score.contributing_signals) if latest_score.contributing_signals else [],
+        "contributing_signals": latest_score.contributing_signals or [],
         "explanation": latest_score.explanation,
-        "timestamp": latest_score.timestamp.isoformat()
-    }
+        "timestamp": latest_score.timestamp
+    })
+    carescore_cache.set(user_id, body)
+    
+    return Response(content=body, media_type="application/json")
 
 
 @router.post("/carescore/compute")
@@ -182,36 +198,55 @@ def compute_carescore(request: AnalyzeRequest, db: Session = Depends(get_db)):
             "stability": care_score.stability_score
         },
         "explanation": care_score.explanation,
-        "timestamp": care_score.timestamp.isoformat()
+        "timestamp": care_score.timestamp
     }
 
 
 @router.get("/carescore/{user_id}/history")
 def get_carescore_history(
     user_id: int, 
-    limit: int = 30,
+    limit: int = Query(30, ge=1, le=MAX_HISTORY_PAGE),
+    before: Optional[datetime] = None,
+    before_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Get CareScore history for a user
+    Get CareScore history for a user, newest first.
+    Pass the returned next_cursor's `before` and `before_id` to fetch the
+    next page.
     """
-    scores = db.query(CareScore).filter(
+    query = db.query(
+        CareScore.id,
+        CareScore.timestamp,
+        CareScore.care_score,
+        CareScore.status,
+        CareScore.drift_score,
+        CareScore.stability_score
+    ).filter(
         CareScore.user_id == user_id
-    ).order_by(CareScore.timestamp.desc()).limit(limit).all()
+    )
     
-    return {
+    # Keyset pagination: seek into the (user_id, timestamp DESC) index
+    # instead of skipping rows with OFFSET
+    scores, next_cursor = newest_first_page(
+        query, CareScore.timestamp, CareScore.id, limit, before, before_id
+    )
+    
+    # Returning the response directly skips jsonable_encoder
+    return ORJSONResponse({
         "user_id": user_id,
         "history": [
             {
-                "timestamp": s.timestamp.isoformat(),
+                "timestamp": s.timestamp,
                 "care_score": s.care_score,
                 "status": s.status,
                 "drift_score": s.drift_score,
                 "stability": s.stability_score
             }
             for s in scores
-        ]
-    }
+        ],
+        "next_cursor": next_cursor
+    })
 
 
 @router.get("/status/{user_id}")
@@ -219,17 +254,18 @@ def get_user_status(user_id: int, db: Session = Depends(get_db)):
     """
     Get complete health status for a user
     """
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # The latest score and reading are kept in user_status_cache on every
+    # write, so this is a single primary-key lookup
+    row = db.query(User, UserStatusCache).outerjoin(
+        UserStatusCache, UserStatusCache.user_id == User.id
+    ).filter(User.id == user_id).first()
     
-    latest_score = db.query(CareScore).filter(
-        CareScore.user_id == user_id
-    ).order_by(CareScore.timestamp.desc()).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    latest_data = db.query(HealthData).filter(
-        HealthData.user_id == user_id
-    ).order_by(HealthData.timestamp.desc()).first()
+    user, status = row
+    has_score = status is not None and status.score_timestamp is not None
+    has_reading = status is not None and status.latest_reading_at is not None
     
     return {
         "user": {
@@ -248,13 +284,13 @@ def get_user_status(user_id: int, db: Session = Depends(get_db)):
             "blood_sugar": user.baseline_blood_sugar
         },
         "current_care_score": {
-            "score": latest_score.care_score if latest_score else None,
-            "status": latest_score.status if latest_score else "unknown",
-            "timestamp": latest_score.timestamp.isoformat() if latest_score else None
+            "score": status.care_score if has_score else None,
+            "status": status.status if has_score else "unknown",
+            "timestamp": status.score_timestamp if has_score else None
         },
         "latest_reading": {
-            "timestamp": latest_data.timestamp.isoformat() if latest_data else None,
-            "heart_rate": latest_data.heart_rate if latest_data else None,
-            "hrv": latest_data.hrv if latest_data else None
-        } if latest_data else None
+            "timestamp": status.latest_reading_at,
+            "heart_rate": status.latest_heart_rate,
+            "hrv": status.latest_hrv
+        } if has_reading else None
     }
@@ -10,10 +10,19 @@ from pydantic import BaseModel
 
 from app.database import get_db
 from app.models.user import User
+from app.models.doctor_profile import DoctorProfile
+from app.models.caretaker_profile import CaretakerProfile
 from app.services.auth_service import AuthService
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# Fixed part of the webhook_config returned by onboarding
+_WEBHOOK_ENDPOINTS = {
+    "endpoint": "/webhook/ingest",
+    "batch_endpoint": "/webhook/ingest-batch",
+    "analyze_endpoint": "/webhook/ingest-and-analyze"
+}
+
 
 # ============================================
 # Pydantic Models
@@ -61,7 +70,7 @@ class DeviceResponse(BaseModel):
 # ============================================
 
 @router.post("/api-keys/generate")
-async def generate_api_key(
+def generate_api_key(
     request: GenerateAPIKeyRequest,
     db: Session = Depends(get_db)
 ):
@@ -83,7 +92,7 @@ async def generate_api_key(
             "success": True,
             "api_key": raw_key,
             "key_id": api_key.id,
-            "expires_at": api_key.expires_at.isoformat() if api_key.expires_at else None,
+            "expires_at": api_key.expires_at,
             "warning": "Save this API key securely - it cannot be retrieved again!"
         }
         
@@ -92,7 +101,7 @@ async def generate_api_key(
 
 
 @router.get("/api-keys/{user_id}")
-async def list_api_keys(
+def list_api_keys(
     user_id: int,
     db: Session = Depends(get_db)
 ):
@@ -107,9 +116,9 @@ async def list_api_keys(
                 "id": key.id,
                 "name": key.name,
                 "device_id": key.device_id,
-                "created_at": key.created_at.isoformat(),
-                "last_used_at": key.last_used_at.isoformat() if key.last_used_at else None,
-                "expires_at": key.expires_at.isoformat() if key.expires_at else None,
+                "created_at": key.created_at,
+                "last_used_at": key.last_used_at,
+                "expires_at": key.expires_at,
                 "is_active": key.is_active,
                 "request_count": key.request_count
             }
@@ -119,7 +128,7 @@ async def list_api_keys(
 
 
 @router.delete("/api-keys/{key_id}")
-async def revoke_api_key(
+def revoke_api_key(
     key_id: int,
     db: Session = Depends(get_db)
 ):
@@ -134,23 +143,23 @@ async def revoke_api_key(
 
 
 @router.get("/validate")
-async def validate_api_key(
+def validate_api_key(
     x_api_key: str = Header(..., alias="X-API-Key"),
     db: Session = Depends(get_db)
 ):
     """Validate an API key and return user info"""
     auth_service = AuthService(db)
-    user = auth_service.validate_api_key(x_api_key)
+    identity = auth_service.resolve_api_key(x_api_key)
     
-    if not user:
+    if not identity:
         raise HTTPException(status_code=401, detail="Invalid or expired API key")
     
     return {
         "valid": True,
         "user": {
-            "id": user.id,
-            "email": user.email,
-            "name": user.name
+            "id": identity.user_id,
+            "email": identity.email,
+            "name": identity.name
         }
     }
 
@@ -160,7 +169,7 @@ async def validate_api_key(
 # ============================================
 
 @router.post("/devices/register")
-async def register_device(
+def register_device(
     request: RegisterDeviceRequest,
     db: Session = Depends(get_db)
 ):
@@ -181,7 +190,7 @@ async def register_device(
                 "device_id": device.device_id,
                 "device_name": device.device_name,
                 "device_type": device.device_type,
-                "registered_at": device.registered_at.isoformat()
+                "registered_at": device.registered_at
             }
         }
         
@@ -190,7 +199,7 @@ async def register_device(
 
 
 @router.get("/devices/{user_id}")
-async def list_devices(
+def list_devices(
     user_id: int,
     db: Session = Depends(get_db)
 ):
@@ -206,8 +215,8 @@ async def list_devices(
                 "device_id": device.device_id,
                 "device_name": device.device_name,
                 "device_type": device.device_type,
-                "registered_at": device.registered_at.isoformat(),
-                "last_sync_at": device.last_sync_at.isoformat() if device.last_sync_at else None,
+                "registered_at": device.registered_at,
+                "last_sync_at": device.last_sync_at,
                 "is_active": device.is_active
             }
             for device in devices
@@ -220,7 +229,7 @@ async def list_devices(
 # ============================================
 
 @router.post("/onboard")
-async def onboard_user(
+def onboard_user(
     email: str,
     name: str,
     device_id: Optional[str] = None,
@@ -239,22 +248,22 @@ async def onboard_user(
     user = db.query(User).filter(User.email == email).first()
     
     if not user:
-        # Create new user
+        # Create new user; flushing assigns the id without committing
         user = User(
             email=email,
             name=name,
             is_active=True
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        db.flush()
     
-    # Generate API key
+    # Generate API key and register the device in the same transaction
     auth_service = AuthService(db)
     raw_key, api_key = auth_service.generate_api_key(
         user_id=user.id,
         name=f"Key for {device_name or 'device'}",
-        device_id=device_id
+        device_id=device_id,
+        commit=False
     )
     
     # Register device if provided
@@ -264,10 +273,12 @@ async def onboard_user(
             user_id=user.id,
             device_id=device_id,
             device_name=device_name,
-            device_type="android"
+            device_type="android",
+            commit=False
         )
     
-    return {
+    # Build the response before committing so nothing is reloaded afterwards
+    response = {
         "success": True,
         "user": {
             "id": user.id,
@@ -280,15 +291,16 @@ async def onboard_user(
             "device_id": device_id
         } if device else None,
         "webhook_config": {
-            "endpoint": "/webhook/ingest",
-            "batch_endpoint": "/webhook/ingest-batch",
-            "analyze_endpoint": "/webhook/ingest-and-analyze",
+            **_WEBHOOK_ENDPOINTS,
             "headers": {
                 "X-API-Key": raw_key,
                 "X-Device-ID": device_id or ""
             }
         }
     }
+    db.commit()
+    
+    return response
 
 
 # ============================================
@@ -331,7 +343,7 @@ class CaretakerRegisterRequest(BaseModel):
 
 
 @router.post("/register/patient")
-async def register_patient(
+def register_patient(
     request: PatientRegisterRequest,
     db: Session = Depends(get_db)
 ):
@@ -369,13 +381,11 @@ async def register_patient(
 
 
 @router.post("/register/doctor")
-async def register_doctor(
+def register_doctor(
     request: DoctorRegisterRequest,
     db: Session = Depends(get_db)
 ):
     """Register a new doctor with extended profile"""
-    from app.models.doctor_profile import DoctorProfile
-    
     # Check if user already exists
     existing = db.query(User).filter(User.email == request.email).first()
     if existing:
@@ -426,13 +436,11 @@ async def register_doctor(
 
 
 @router.post("/register/caretaker")
-async def register_caretaker(
+def register_caretaker(
     request: CaretakerRegisterRequest,
     db: Session = Depends(get_db)
 ):
     """Register a new caretaker user"""
-    from app.models.caretaker_profile import CaretakerProfile
-    
     # Check if user already exists
     existing = db.query(User).filter(User.email == request.email).first()
     if existing:
@@ -476,7 +484,7 @@ async def register_caretaker(
 
 
 @router.get("/user/{user_id}/role")
-async def get_user_role(
+def get_user_role(
     user_id: int,
     db: Session = Depends(get_db)
 ):
@@ -495,7 +503,6 @@ async def get_user_role(
     
     # Add role-specific profile
     if user.role == "doctor":
-        from app.models.doctor_profile import DoctorProfile
         profile = db.query(DoctorProfile).filter(DoctorProfile.user_id == user_id).first()
         if profile:
             response["doctor_profile"] = {
@@ -505,7 +512,6 @@ async def get_user_role(
                 "is_verified": profile.is_verified
             }
     elif user.role == "caretaker":
-        from app.models.caretaker_profile import CaretakerProfile
         profile = db.query(CaretakerProfile).filter(CaretakerProfile.user_id == user_id).first()
         if profile:
             response["caretaker_profile"] = {
@@ -3,40 +3,102 @@ CareScore Routes for Pulse AI
 Endpoints for calculating and retrieving CareScore with Gemini AI integration
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Dict, NamedTuple, Optional, Tuple
+from datetime import datetime
+from cachetools import TTLCache
+import asyncio
+import hashlib
 import httpx
+import json
 import logging
+import numpy as np
 
 from app.database import get_db
 from app.models import User, HealthData, CareScore
+from app.services.response_cache import carescore_cache
+from app.services.pagination import newest_first_page
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/care-score", tags=["CareScore"])
 
+# Largest page the history endpoint will return
+MAX_HISTORY_PAGE = 100
+
+CARESCORE_DISCLAIMER = "This is for informational purposes only and does not constitute medical advice."
+SUGGESTIONS_DISCLAIMER = (
+    "These are general wellness suggestions only and do not constitute medical advice. "
+    "Consult your healthcare provider for personalized guidance."
+)
+GENERAL_SUGGESTIONS_DISCLAIMER = "These are general wellness suggestions only."
+
 # Your Gemini hosted API endpoint
 GEMINI_API_URL = "https://pulseai-gemini.prateekhnayak.workers.dev/generate"
 
+# Shared client so Gemini calls reuse pooled keep-alive connections instead
+# of paying a TCP+TLS handshake per request; closed on app shutdown
+_gemini_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(30.0, connect=5.0),
+    limits=httpx.Limits(
+        max_connections=100,
+        max_keepalive_connections=40,
+        keepalive_expiry=30.0
+    )
+)
+
+
+async def close_gemini_client():
+    """Close the shared Gemini HTTP client"""
+    await _gemini_client.aclose()
+
+
+# Successful Gemini analyses, keyed by rounded vitals and score bucket so
+# near-identical readings reuse the same answer for an hour. Only touched
+# from the event loop, so no lock is needed.
+_gemini_cache = TTLCache(maxsize=10_000, ttl=3600)
+
+# Rounding step per vital; readings within a step share a cache entry
+_GEMINI_CACHE_ROUNDING = {
+    'heart_rate': 1,
+    'hrv': 5,
+    'sleep_duration': 0.5,
+    'activity_level': 500,
+    'bp_systolic': 1,
+    'bp_diastolic': 1,
+    'blood_sugar': 1,
+}
 
-async def get_gemini_analysis(health_data: dict, care_score: float, status: str) -> dict:
-    """
-    Call Gemini API for health analysis and suggestions
-    """
-    # Build prompt with health signals
-    prompt = f"""You are a wellness advisor for a health monitoring app called Pulse AI.
 
-A user has the following health signals:
-- Heart Rate: {health_data.get('heart_rate', 'N/A')} bpm
-- Heart Rate Variability (HRV): {health_data.get('hrv', 'N/A')} ms
-- Sleep Duration: {health_data.get('sleep_duration', 'N/A')} hours
-- Activity Level: {health_data.get('activity_level', 'N/A')} steps
-- Blood Pressure: {health_data.get('bp_systolic', 'N/A')}/{health_data.get('bp_diastolic', 'N/A')} mmHg
-- Blood Sugar: {health_data.get('blood_sugar', 'N/A')} mg/dL
+# Upper bound on concurrent calls to the Gemini worker; bursts of
+# recalculations queue here instead of piling timeouts onto the upstream
+GEMINI_MAX_CONCURRENCY = 32
+_gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
 
-Their current CareScore is {care_score}/100 (Status: {status}).
-CareScore interpretation: 0-30 = Stable, 31-50 = Mild concern, 51-70 = Moderate concern, 71-100 = High concern.
+# Gemini requests in flight, by cache key, so concurrent callers with the
+# same key share one request
+_gemini_inflight: Dict[str, asyncio.Task] = {}
+
+
+def _gemini_cache_key(health_data: dict, care_score: float, status: str) -> str:
+    rounded = {}
+    for signal, step in _GEMINI_CACHE_ROUNDING.items():
+        value = health_data.get(signal)
+        rounded[signal] = round(value / step) * step if value is not None else None
+    rounded['bucket'] = int(care_score // 10)
+    rounded['status'] = status.lower()
+    return hashlib.sha256(json.dumps(rounded, sort_keys=True).encode()).hexdigest()
+
+
+# Static part of the Gemini prompt, built once; only the vitals header
+# changes per call
+_PROMPT_PREFIX = """You are a wellness advisor for a health monitoring app called Pulse AI.
+
+"""
+
+_PROMPT_SUFFIX = """CareScore interpretation: 0-30 = Stable, 31-50 = Mild concern, 51-70 = Moderate concern, 71-100 = High concern.
 
 Based on these health signals, provide:
 1. A brief 2-3 sentence analysis of their current health status
@@ -49,12 +111,37 @@ IMPORTANT RULES:
 - Be encouraging and supportive
 
 Format your response as JSON:
-{{"analysis": "your analysis here", "suggestions": ["suggestion 1", "suggestion 2", "suggestion 3"]}}
+{"analysis": "your analysis here", "suggestions": ["suggestion 1", "suggestion 2", "suggestion 3"]}
 """
 
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
+
+def _vital(health_data: dict, signal: str):
+    value = health_data.get(signal)
+    return "N/A" if value is None else value
+
+
+def build_gemini_prompt(health_data: dict, care_score: float, status: str) -> str:
+    """Build the Gemini prompt: vitals header plus the static instructions"""
+    return (
+        f"{_PROMPT_PREFIX}"
+        f"A user has the following health signals:\n"
+        f"- Heart Rate: {_vital(health_data, 'heart_rate')} bpm\n"
+        f"- Heart Rate Variability (HRV): {_vital(health_data, 'hrv')} ms\n"
+        f"- Sleep Duration: {_vital(health_data, 'sleep_duration')} hours\n"
+        f"- Activity Level: {_vital(health_data, 'activity_level')} steps\n"
+        f"- Blood Pressure: {_vital(health_data, 'bp_systolic')}/{_vital(health_data, 'bp_diastolic')} mmHg\n"
+        f"- Blood Sugar: {_vital(health_data, 'blood_sugar')} mg/dL\n"
+        f"\n"
+        f"Their current CareScore is {care_score}/100 (Status: {status}).\n"
+        f"{_PROMPT_SUFFIX}"
+    )
+
+
+async def _request_gemini_analysis(cache_key: str, prompt: str) -> Optional[dict]:
+    """Send one prompt to the Gemini worker and cache a successful result"""
+    async with _gemini_semaphore:
+        try:
+            response = await _gemini_client.post(
                 GEMINI_API_URL,
                 json={"text": prompt},
                 headers={"Content-Type": "application/json"}
@@ -63,88 +150,131 @@ Format your response as JSON:
             if response.status_code == 200:
                 result = response.json()
                 # Parse the response - Gemini returns text that should be JSON
-                if isinstance(result, dict):
-                    return result
-                elif isinstance(result, str):
-                    import json
+                if isinstance(result, str):
                     try:
-                        return json.loads(result)
+                        result = json.loads(result)
                     except:
-                        return {"analysis": result, "suggestions": []}
+                        result = {"analysis": result, "suggestions": []}
+                if isinstance(result, dict):
+                    _gemini_cache[cache_key] = result
+                    return result
             else:
                 logger.error(f"Gemini API error: {response.status_code} - {response.text}")
                 return None
-    except Exception as e:
-        logger.error(f"Failed to call Gemini API: {e}")
-        return None
+        except Exception as e:
+            logger.error(f"Failed to call Gemini API: {e}")
+            return None
+
+
+async def get_gemini_analysis(health_data: dict, care_score: float, status: str) -> dict:
+    """
+    Call Gemini API for health analysis and suggestions
+    """
+    cache_key = _gemini_cache_key(health_data, care_score, status)
+    cached = _gemini_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Join an identical request that is already in flight rather than
+    # sending a duplicate
+    task = _gemini_inflight.get(cache_key)
+    if task is None:
+        prompt = build_gemini_prompt(health_data, care_score, status)
+        task = asyncio.ensure_future(_request_gemini_analysis(cache_key, prompt))
+        _gemini_inflight[cache_key] = task
+        task.add_done_callback(lambda _: _gemini_inflight.pop(cache_key, None))
+    
+    # Shielded so one caller disconnecting doesn't cancel the request for the rest
+    return await asyncio.shield(task)
+
+
+# Deviation flags set by calculate_simple_care_score, so fallback
+# suggestions can dispatch on them instead of matching deviation text
+DEV_HEART_RATE = 1 << 0
+DEV_HRV = 1 << 1
+DEV_SLEEP = 1 << 2
+DEV_BLOOD_PRESSURE = 1 << 3
+DEV_BLOOD_SUGAR = 1 << 4
+DEV_ACTIVITY = 1 << 5
+
+
+class _SignalRule(NamedTuple):
+    """
+    Scoring rule for one signal. Tiers are (predicate, penalty, deviation
+    label, flag) checked in order, and the first match applies. A penalty may be
+    a function of the readings and baseline; a tier without a label adds to
+    the score without reporting a deviation.
+    """
+    fields: Tuple[str, ...]
+    tiers: Tuple[tuple, ...]
+    baseline: Optional[Tuple[str, float]] = None  # (User attribute, default)
+    allow_zero: bool = False  # Score a reading of 0 instead of treating it as missing
+
+
+_SCORING_RULES = (
+    # Heart rate (normal: 60-100 bpm)
+    _SignalRule(("heart_rate",), (
+        (lambda hr: hr > 100 or hr < 55,
+         lambda hr, baseline: min(15, abs(hr - baseline) / baseline * 100 / 2),
+         "Heart rate: {0} bpm (baseline: {baseline})", DEV_HEART_RATE),
+    ), baseline=("baseline_heart_rate", 72)),
+    # HRV (higher is generally better, normal: 20-70ms)
+    _SignalRule(("hrv",), (
+        (lambda hrv: hrv < 30, 10, "Low HRV: {0} ms", DEV_HRV),
+    )),
+    # Sleep (optimal: 7-9 hours)
+    _SignalRule(("sleep_duration",), (
+        (lambda sleep: sleep < 6, 8, "Insufficient sleep: {0} hours", DEV_SLEEP),
+        (lambda sleep: sleep < 7, 4, None, 0),
+    )),
+    # Blood pressure
+    _SignalRule(("bp_systolic", "bp_diastolic"), (
+        (lambda sys, dia: sys >= 180 or dia >= 120, 20, "High blood pressure: {0}/{1}", DEV_BLOOD_PRESSURE),
+        (lambda sys, dia: sys >= 140 or dia >= 90, 12, "Elevated blood pressure: {0}/{1}", DEV_BLOOD_PRESSURE),
+        (lambda sys, dia: sys >= 130, 5, None, 0),
+    )),
+    # Blood sugar (normal fasting: 70-100 mg/dL)
+    _SignalRule(("blood_sugar",), (
+        (lambda sugar: sugar >= 200, 15, "High blood sugar: {0} mg/dL", DEV_BLOOD_SUGAR),
+        (lambda sugar: sugar >= 140, 8, "Elevated blood sugar: {0} mg/dL", DEV_BLOOD_SUGAR),
+        (lambda sugar: sugar <= 70, 10, "Low blood sugar: {0} mg/dL", DEV_BLOOD_SUGAR),
+    )),
+    # Activity level (recommended: 7000-10000 steps)
+    _SignalRule(("activity_level",), (
+        (lambda activity: activity < 3000, 5, "Low physical activity", DEV_ACTIVITY),
+    ), allow_zero=True),
+)
 
 
 def calculate_simple_care_score(health_data: dict, user: User) -> dict:
     """
     Calculate CareScore without complex engine dependencies
-    Uses simple deviation-based scoring
+    Uses simple deviation-based scoring driven by _SCORING_RULES
     """
     score = 0
     deviations = []
+    flags = 0
     
-    # Heart rate scoring (normal: 60-100 bpm)
-    hr = health_data.get('heart_rate')
-    if hr:
-        baseline = user.baseline_heart_rate or 72
-        if hr > 100 or hr < 55:
-            deviation = abs(hr - baseline) / baseline * 100
-            score += min(15, deviation / 2)
-            deviations.append(f"Heart rate: {hr} bpm (baseline: {baseline})")
-    
-    # HRV scoring (higher is generally better, normal: 20-70ms)
-    hrv = health_data.get('hrv')
-    if hrv:
-        baseline = user.baseline_hrv or 50
-        if hrv < 30:
-            score += 10
-            deviations.append(f"Low HRV: {hrv} ms")
-    
-    # Sleep scoring (optimal: 7-9 hours)
-    sleep = health_data.get('sleep_duration')
-    if sleep:
-        if sleep < 6:
-            score += 8
-            deviations.append(f"Insufficient sleep: {sleep} hours")
-        elif sleep < 7:
-            score += 4
-    
-    # Blood pressure scoring
-    bp_sys = health_data.get('bp_systolic')
-    bp_dia = health_data.get('bp_diastolic')
-    if bp_sys and bp_dia:
-        if bp_sys >= 180 or bp_dia >= 120:
-            score += 20
-            deviations.append(f"High blood pressure: {bp_sys}/{bp_dia}")
-        elif bp_sys >= 140 or bp_dia >= 90:
-            score += 12
-            deviations.append(f"Elevated blood pressure: {bp_sys}/{bp_dia}")
-        elif bp_sys >= 130:
-            score += 5
-    
-    # Blood sugar scoring (normal fasting: 70-100 mg/dL)
-    sugar = health_data.get('blood_sugar')
-    if sugar:
-        if sugar >= 200:
-            score += 15
-            deviations.append(f"High blood sugar: {sugar} mg/dL")
-        elif sugar >= 140:
-            score += 8
-            deviations.append(f"Elevated blood sugar: {sugar} mg/dL")
-        elif sugar <= 70:
-            score += 10
-            deviations.append(f"Low blood sugar: {sugar} mg/dL")
-    
-    # Activity level scoring (recommended: 7000-10000 steps)
-    activity = health_data.get('activity_level')
-    if activity is not None:
-        if activity < 3000:
-            score += 5
-            deviations.append("Low physical activity")
+    for rule in _SCORING_RULES:
+        values = [health_data.get(field) for field in rule.fields]
+        if rule.allow_zero:
+            if any(value is None for value in values):
+                continue
+        elif not all(values):
+            continue
+        
+        baseline = None
+        if rule.baseline:
+            attr, default = rule.baseline
+            baseline = getattr(user, attr) or default
+        
+        for matches, penalty, label, flag in rule.tiers:
+            if matches(*values):
+                score += penalty(*values, baseline) if callable(penalty) else penalty
+                if label:
+                    deviations.append(label.format(*values, baseline=baseline))
+                    flags |= flag
+                break
     
     # Normalize score to 0-100
     score = min(100, max(0, score))
@@ -162,11 +292,81 @@ def calculate_simple_care_score(health_data: dict, user: User) -> dict:
     return {
         'score': round(score, 1),
         'status': status,
-        'deviations': deviations
+        'deviations': deviations,
+        'flags': flags
     }
 
 
-def get_fallback_suggestions(score: float, deviations: list) -> list:
+# Column order of the vitals matrix taken by calculate_simple_care_score_batch
+BATCH_SIGNALS = (
+    'heart_rate', 'hrv', 'sleep_duration', 'bp_systolic',
+    'bp_diastolic', 'blood_sugar', 'activity_level'
+)
+
+
+def calculate_simple_care_score_batch(
+    vitals: np.ndarray,
+    baseline_heart_rate: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized calculate_simple_care_score for bulk recalculation.
+    
+    vitals is an (N, 7) float array in BATCH_SIGNALS order with NaN for
+    missing readings; baseline_heart_rate is an optional length-N array.
+    Applies the same rules as _SCORING_RULES in a single pass per column and
+    returns (scores, deviation flags) arrays. A parity test against
+    calculate_simple_care_score keeps the two in step.
+    """
+    vitals = np.asarray(vitals, dtype=np.float64)
+    hr, hrv, sleep, bp_sys, bp_dia, sugar, activity = vitals.T
+    
+    # Most signals treat 0 like a missing reading; activity only skips NaN
+    def present(values):
+        return ~np.isnan(values) & (values != 0)
+    
+    if baseline_heart_rate is None:
+        baseline = np.full(len(vitals), 72.0)
+    else:
+        baseline = np.asarray(baseline_heart_rate, dtype=np.float64)
+        baseline = np.where(present(baseline), baseline, 72.0)
+    
+    with np.errstate(invalid='ignore'):
+        hr_flag = present(hr) & ((hr > 100) | (hr < 55))
+        hr_score = np.where(hr_flag, np.minimum(15, np.abs(hr - baseline) / baseline * 100 / 2), 0)
+        
+        hrv_flag = present(hrv) & (hrv < 30)
+        
+        sleep_ok = present(sleep)
+        sleep_flag = sleep_ok & (sleep < 6)
+        sleep_score = np.select([sleep_flag, sleep_ok & (sleep < 7)], [8, 4], 0)
+        
+        bp_ok = present(bp_sys) & present(bp_dia)
+        bp_high = bp_ok & ((bp_sys >= 180) | (bp_dia >= 120))
+        bp_elevated = bp_ok & ((bp_sys >= 140) | (bp_dia >= 90))
+        bp_score = np.select([bp_high, bp_elevated, bp_ok & (bp_sys >= 130)], [20, 12, 5], 0)
+        
+        sugar_ok = present(sugar)
+        sugar_conditions = [sugar_ok & (sugar >= 200), sugar_ok & (sugar >= 140), sugar_ok & (sugar <= 70)]
+        sugar_score = np.select(sugar_conditions, [15, 8, 10], 0)
+        
+        activity_flag = ~np.isnan(activity) & (activity < 3000)
+    
+    scores = hr_score + hrv_flag * 10 + sleep_score + bp_score + sugar_score + activity_flag * 5
+    scores = np.round(np.clip(scores, 0, 100), 1)
+    
+    flags = (
+        hr_flag * DEV_HEART_RATE
+        | hrv_flag * DEV_HRV
+        | sleep_flag * DEV_SLEEP
+        | (bp_high | bp_elevated) * DEV_BLOOD_PRESSURE
+        | np.logical_or.reduce(sugar_conditions) * DEV_BLOOD_SUGAR
+        | activity_flag * DEV_ACTIVITY
+    )
+    
+    return scores, flags
+
+
+def get_fallback_suggestions(score: float, flags: int = 0) -> list:
     """Generate fallback suggestions when Gemini is unavailable"""
     suggestions = []
     
@@ -174,19 +374,19 @@ def get_fallback_suggestions(score: float, deviations: list) -> list:
         suggestions.append("Take time to rest and prioritize quality sleep tonight")
         suggestions.append("Stay well hydrated - aim for 8 glasses of water today")
     
-    if any("blood pressure" in d.lower() for d in deviations):
+    if flags & DEV_BLOOD_PRESSURE:
         suggestions.append("Consider reducing salt intake in your meals")
         suggestions.append("Practice deep breathing exercises for 5 minutes")
     
-    if any("blood sugar" in d.lower() for d in deviations):
+    if flags & DEV_BLOOD_SUGAR:
         suggestions.append("Avoid sugary snacks and processed foods today")
         suggestions.append("Take a 15-minute walk after meals")
     
-    if any("sleep" in d.lower() for d in deviations):
+    if flags & DEV_SLEEP:
         suggestions.append("Avoid caffeine after 2 PM")
         suggestions.append("Try to maintain a consistent sleep schedule")
     
-    if any("activity" in d.lower() for d in deviations):
+    if flags & DEV_ACTIVITY:
         suggestions.append("Take short walking breaks every hour")
         suggestions.append("Try gentle stretching or light exercise")
     
@@ -200,22 +400,57 @@ def get_fallback_suggestions(score: float, deviations: list) -> list:
     return suggestions[:4]
 
 
+# The Gemini endpoints are async so the HTTP call doesn't hold a worker
+# thread; their blocking DB work is pushed to the threadpool through these
+# helpers so it never runs on the event loop
+
+def _load_user_snapshot(
+    db: Session, user_id: int
+) -> Tuple[Optional[User], Optional[HealthData], Optional[CareScore]]:
+    """
+    Load a user with their latest reading and latest CareScore in a single
+    round-trip, resolving the latest rows as correlated subqueries
+    """
+    latest_health_id = db.query(HealthData.id).filter(
+        HealthData.user_id == User.id
+    ).order_by(HealthData.timestamp.desc()).limit(1).correlate(User).scalar_subquery()
+    
+    latest_score_id = db.query(CareScore.id).filter(
+        CareScore.user_id == User.id
+    ).order_by(CareScore.timestamp.desc()).limit(1).correlate(User).scalar_subquery()
+    
+    row = db.query(User, HealthData, CareScore).outerjoin(
+        HealthData, HealthData.id == latest_health_id
+    ).outerjoin(
+        CareScore, CareScore.id == latest_score_id
+    ).filter(User.id == user_id).first()
+    
+    if not row:
+        return None, None, None
+    return row
+
+
+def _save_care_score(db: Session, care_score_record: CareScore) -> None:
+    # Detach after flush so the response can be built without a refresh SELECT
+    db.add(care_score_record)
+    db.flush()
+    db.expunge(care_score_record)
+    db.commit()
+    carescore_cache.invalidate(care_score_record.user_id)
+
+
 @router.post("/calculate/{user_id}")
 async def calculate_care_score(user_id: int, db: Session = Depends(get_db)):
     """
     Calculate CareScore for a user based on their health data.
     Uses Gemini AI for analysis and suggestions.
     """
+    user, latest_health, _ = await run_in_threadpool(_load_user_snapshot, db, user_id)
+    
     # Verify user exists
-    user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get latest health data
-    latest_health = db.query(HealthData).filter(
-        HealthData.user_id == user_id
-    ).order_by(HealthData.timestamp.desc()).first()
-    
     if not latest_health:
         raise HTTPException(
             status_code=400, 
@@ -250,7 +485,7 @@ async def calculate_care_score(user_id: int, db: Session = Depends(get_db)):
             suggestions = gemini_result.get('suggestions', [])
         else:
             analysis = f"Your current health status is {status.lower()}."
-            suggestions = get_fallback_suggestions(score, deviations)
+            suggestions = get_fallback_suggestions(score, result['flags'])
         
         # Save CareScore to database
         care_score_record = CareScore(
@@ -267,9 +502,7 @@ async def calculate_care_score(user_id: int, db: Session = Depends(get_db)):
             status=status.lower()
         )
         
-        db.add(care_score_record)
-        db.commit()
-        db.refresh(care_score_record)
+        await run_in_threadpool(_save_care_score, db, care_score_record)
         
         return {
             "message": "CareScore calculated successfully",
@@ -284,8 +517,8 @@ async def calculate_care_score(user_id: int, db: Session = Depends(get_db)):
             "analysis": analysis,
             "suggestions": suggestions,
             "deviations": deviations,
-            "timestamp": care_score_record.timestamp.isoformat(),
-            "disclaimer": "This is for informational purposes only and does not constitute medical advice."
+            "timestamp": care_score_record.timestamp,
+            "disclaimer": CARESCORE_DISCLAIMER
         }
         
     except Exception as e:
@@ -318,59 +551,65 @@ def get_latest_care_score(user_id: int, db: Session = Depends(get_db)):
         "explanation": care_score.explanation,
         "confidence": care_score.confidence_score,
         "stability": care_score.stability_score,
-        "timestamp": care_score.timestamp.isoformat()
+        "timestamp": care_score.timestamp
     }
 
 
 @router.get("/history/{user_id}")
 def get_care_score_history(
     user_id: int, 
-    limit: int = 30,
+    limit: int = Query(30, ge=1, le=MAX_HISTORY_PAGE),
+    before: Optional[datetime] = None,
+    before_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Get CareScore history for a user"""
-    scores = db.query(CareScore).filter(
+    """
+    Get CareScore history for a user, newest first.
+    Pass the returned next_cursor's `before` and `before_id` to fetch the
+    next page.
+    """
+    query = db.query(
+        CareScore.id,
+        CareScore.care_score,
+        CareScore.status,
+        CareScore.timestamp
+    ).filter(
         CareScore.user_id == user_id
-    ).order_by(CareScore.timestamp.desc()).limit(limit).all()
+    )
+    
+    # Keyset pagination over the (user_id, timestamp DESC) index
+    scores, next_cursor = newest_first_page(
+        query, CareScore.timestamp, CareScore.id, limit, before, before_id
+    )
     
     return {
         "history": [
             {
                 "care_score": s.care_score,
                 "status": s.status,
-                "timestamp": s.timestamp.isoformat()
+                "timestamp": s.timestamp
             }
             for s in scores
         ],
-        "count": len(scores)
+        "count": len(scores),
+        "next_cursor": next_cursor
     }
 
 
 @router.get("/suggestions/{user_id}")
 async def get_health_suggestions(user_id: int, db: Session = Depends(get_db)):
     """Get AI-generated health suggestions based on current health data"""
-    # Get user
-    user = db.query(User).filter(User.id == user_id).first()
+    user, latest_health, care_score = await run_in_threadpool(_load_user_snapshot, db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get latest health data
-    latest_health = db.query(HealthData).filter(
-        HealthData.user_id == user_id
-    ).order_by(HealthData.timestamp.desc()).first()
-    
-    # Get latest care score
-    care_score = db.query(CareScore).filter(
-        CareScore.user_id == user_id
-    ).order_by(CareScore.timestamp.desc()).first()
-    
     if not latest_health:
         return {
             "suggestions": [
                 "Sync your health data to get personalized suggestions",
                 "Stay hydrated and maintain regular sleep patterns"
             ],
-            "disclaimer": "These are general wellness suggestions only."
+            "disclaimer": GENERAL_SUGGESTIONS_DISCLAIMER
         }
     
     health_data = {
@@ -393,7 +632,7 @@ async def get_health_suggestions(user_id: int, db: Session = Depends(get_db)):
         suggestions = gemini_result['suggestions']
         analysis = gemini_result.get('analysis', '')
     else:
-        suggestions = get_fallback_suggestions(score, [])
+        suggestions = get_fallback_suggestions(score)
         analysis = "Based on your recent health data, here are some suggestions to maintain your wellness."
     
     return {
@@ -401,5 +640,5 @@ async def get_health_suggestions(user_id: int, db: Session = Depends(get_db)):
         "status": status,
         "analysis": analysis,
         "suggestions": suggestions,
-        "disclaimer": "These are general wellness suggestions only and do not constitute medical advice. Consult your healthcare provider for personalized guidance."
+        "disclaimer": SUGGESTIONS_DISCLAIMER
     }
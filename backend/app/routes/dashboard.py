@@ -6,14 +6,15 @@ API endpoints for frontend dashboard data
 from datetime import datetime, timedelta
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer
 from sqlalchemy import func
 
 from app.database import get_db
-from app.models.user import User
 from app.models.health_data import HealthData
 from app.models.care_score import CareScore, Escalation
 from app.services.auth_service import AuthService
+from app.services.user_cache import get_user_cached
+from app.services.health_trends import get_daily_averages
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
@@ -23,7 +24,7 @@ router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 # ============================================
 
 @router.get("/summary/{user_id}")
-async def get_dashboard_summary(
+def get_dashboard_summary(
     user_id: int,
     db: Session = Depends(get_db)
 ):
@@ -32,7 +33,7 @@ async def get_dashboard_summary(
     Returns: CareScore, latest metrics, trends, and active escalations
     """
     # Verify user exists
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_user_cached(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -78,7 +79,7 @@ async def get_dashboard_summary(
             "confidence": latest_score.confidence_score if latest_score else 0,
             "stability": latest_score.stability_score if latest_score else 0,
             "explanation": latest_score.explanation if latest_score else None,
-            "updated_at": latest_score.timestamp.isoformat() if latest_score else None
+            "updated_at": latest_score.timestamp if latest_score else None
         } if latest_score else None,
         "current_metrics": {
             "heart_rate": {
@@ -121,7 +122,7 @@ async def get_dashboard_summary(
                 "baseline": user.baseline_blood_sugar,
                 "unit": "mg/dL"
             },
-            "updated_at": latest_health.timestamp.isoformat() if latest_health else None
+            "updated_at": latest_health.timestamp if latest_health else None
         } if latest_health else None,
         "escalations": [
             {
@@ -129,7 +130,7 @@ async def get_dashboard_summary(
                 "level": e.level,
                 "title": f"Level {e.level} Alert",
                 "message": e.message,
-                "timestamp": e.timestamp.isoformat(),
+                "timestamp": e.timestamp,
                 "acknowledged": e.acknowledged
             }
             for e in active_escalations
@@ -150,60 +151,19 @@ async def get_dashboard_summary(
 # ============================================
 
 @router.get("/trends/{user_id}")
-async def get_health_trends(
+def get_health_trends(
     user_id: int,
     days: int = 7,
     db: Session = Depends(get_db)
 ):
     """Get health data trends for specified number of days"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_user_cached(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     start_date = datetime.utcnow() - timedelta(days=days)
     
-    health_data = db.query(HealthData).filter(
-        HealthData.user_id == user_id,
-        HealthData.timestamp >= start_date
-    ).order_by(HealthData.timestamp.asc()).all()
-    
-    # Aggregate by day
-    daily_data = {}
-    for record in health_data:
-        date_key = record.timestamp.strftime("%Y-%m-%d")
-        if date_key not in daily_data:
-            daily_data[date_key] = {
-                "date": date_key,
-                "heart_rate": [],
-                "hrv": [],
-                "sleep_duration": [],
-                "activity_level": [],
-                "breathing_rate": []
-            }
-        
-        if record.heart_rate:
-            daily_data[date_key]["heart_rate"].append(record.heart_rate)
-        if record.hrv:
-            daily_data[date_key]["hrv"].append(record.hrv)
-        if record.sleep_duration:
-            daily_data[date_key]["sleep_duration"].append(record.sleep_duration)
-        if record.activity_level:
-            daily_data[date_key]["activity_level"].append(record.activity_level)
-        if record.breathing_rate:
-            daily_data[date_key]["breathing_rate"].append(record.breathing_rate)
-    
-    # Calculate daily averages
-    trend_data = []
-    for date_key in sorted(daily_data.keys()):
-        day = daily_data[date_key]
-        trend_data.append({
-            "date": date_key,
-            "heart_rate": sum(day["heart_rate"]) / len(day["heart_rate"]) if day["heart_rate"] else None,
-            "hrv": sum(day["hrv"]) / len(day["hrv"]) if day["hrv"] else None,
-            "sleep_duration": sum(day["sleep_duration"]) / len(day["sleep_duration"]) if day["sleep_duration"] else None,
-            "activity_level": sum(day["activity_level"]) / len(day["activity_level"]) if day["activity_level"] else None,
-            "breathing_rate": sum(day["breathing_rate"]) / len(day["breathing_rate"]) if day["breathing_rate"] else None
-        })
+    trend_data = get_daily_averages(db, user_id, start_date)
     
     return {
         "user_id": user_id,
@@ -224,13 +184,13 @@ async def get_health_trends(
 # ============================================
 
 @router.get("/carescore-history/{user_id}")
-async def get_carescore_history(
+def get_carescore_history(
     user_id: int,
     days: int = 30,
     db: Session = Depends(get_db)
 ):
     """Get CareScore history for specified number of days"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_user_cached(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -247,7 +207,7 @@ async def get_carescore_history(
         "history": [
             {
                 "id": s.id,
-                "timestamp": s.timestamp.isoformat(),
+                "timestamp": s.timestamp,
                 "date": s.timestamp.strftime("%b %d"),
                 "score": s.care_score,
                 "status": s.status,
@@ -270,12 +230,12 @@ async def get_carescore_history(
 # ============================================
 
 @router.get("/insights/{user_id}")
-async def get_insights(
+def get_insights(
     user_id: int,
     db: Session = Depends(get_db)
 ):
     """Get AI-generated insights for a user"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_user_cached(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -359,7 +319,7 @@ async def get_insights(
     return {
         "user_id": user_id,
         "insights": insights,
-        "updated_at": latest_health.timestamp.isoformat()
+        "updated_at": latest_health.timestamp
     }
 
 
@@ -368,13 +328,15 @@ async def get_insights(
 # ============================================
 
 @router.get("/escalations/{user_id}")
-async def get_user_escalations(
+def get_user_escalations(
     user_id: int,
     include_acknowledged: bool = False,
     db: Session = Depends(get_db)
 ):
     """Get all escalations for a user"""
-    query = db.query(Escalation).filter(Escalation.user_id == user_id)
+    query = db.query(Escalation).options(
+        defer(Escalation.health_summary)
+    ).filter(Escalation.user_id == user_id)
     
     if not include_acknowledged:
         query = query.filter(Escalation.acknowledged == 0)
@@ -389,9 +351,9 @@ async def get_user_escalations(
                 "id": e.id,
                 "level": e.level,
                 "message": e.message,
-                "timestamp": e.timestamp.isoformat(),
+                "timestamp": e.timestamp,
                 "acknowledged": e.acknowledged,
-                "acknowledged_at": e.acknowledged_at.isoformat() if e.acknowledged_at else None,
+                "acknowledged_at": e.acknowledged_at,
                 "action_taken": e.action_taken
             }
             for e in escalations
@@ -400,7 +362,7 @@ async def get_user_escalations(
 
 
 @router.post("/escalations/{escalation_id}/acknowledge")
-async def acknowledge_escalation(
+def acknowledge_escalation(
     escalation_id: int,
     action: str = "dismissed",
     db: Session = Depends(get_db)
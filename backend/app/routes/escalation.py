@@ -2,7 +2,6 @@
 Escalation Routes for Pulse AI
 """
 
-import json
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
@@ -53,8 +52,8 @@ def check_escalation(request: EscalateRequest, db: Session = Depends(get_db)):
                 "level": escalation.level,
                 "title": escalation.title,
                 "message": escalation.message,
-                "health_summary": json.loads(escalation.health_summary) if escalation.health_summary else None,
-                "timestamp": escalation.timestamp.isoformat()
+                "health_summary": escalation.health_summary,
+                "timestamp": escalation.timestamp
             }
         }
     
@@ -89,7 +88,7 @@ def get_user_escalations(
                 "message": e.message,
                 "acknowledged": bool(e.acknowledged),
                 "action_taken": e.action_taken,
-                "timestamp": e.timestamp.isoformat()
+                "timestamp": e.timestamp
             }
             for e in escalations
         ]
@@ -136,8 +135,8 @@ def get_escalation(escalation_id: int, db: Session = Depends(get_db)):
         "level": escalation.level,
         "title": escalation.title,
         "message": escalation.message,
-        "health_summary": json.loads(escalation.health_summary) if escalation.health_summary else None,
+        "health_summary": escalation.health_summary,
         "acknowledged": bool(escalation.acknowledged),
         "action_taken": escalation.action_taken,
-        "timestamp": escalation.timestamp.isoformat()
+        "timestamp": escalation.timestamp
     }
@@ -2,21 +2,39 @@
 Health Data Routes for Pulse AI
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from app.database import get_db
-from app.models.user import User
+from app.responses import ORJSONResponse
 from app.models.health_data import HealthData
+from app.models.care_score import CareScore
+from app.models.user_status import UserStatusCache, refresh_user_status
+from app.models.health_daily import refresh_daily_rollup
+from app.services.user_cache import get_user_cached
+from app.services.health_trends import get_daily_averages
+from app.services.pagination import newest_first_page
+from app.services.gemini_health_service import get_health_suggestions_service
+from app.services.response_cache import (
+    cached_response, cached_response_async, mark_health_changed,
+    latest_readings_cache, health_trends_cache, health_suggestions_cache
+)
 
 router = APIRouter(prefix="/health", tags=["Health Data"])
 
+# Upper bound on readings accepted by a single batch ingest request
+MAX_INGEST_BATCH = 5000
 
-class HealthDataInput(BaseModel):
-    user_id: int
+# Upper bound on readings returned by one page of the health data listing
+MAX_HEALTH_DATA_PAGE = 1000
+
+
+class HealthReading(BaseModel):
     source: str = "wearable"
     heart_rate: Optional[float] = None
     hrv: Optional[float] = None
@@ -30,6 +48,19 @@ class HealthDataInput(BaseModel):
     symptoms: Optional[str] = None
 
 
+class HealthDataInput(HealthReading):
+    user_id: int
+
+
+class HealthDataBatchItem(HealthReading):
+    timestamp: Optional[datetime] = None  # When the reading was taken; defaults to now
+
+
+class HealthDataBatch(BaseModel):
+    user_id: int
+    items: List[HealthDataBatchItem] = Field(..., min_length=1, max_length=MAX_INGEST_BATCH)
+
+
 class HealthDataResponse(BaseModel):
     id: int
     user_id: int
@@ -50,14 +81,17 @@ class HealthDataResponse(BaseModel):
         from_attributes = True
 
 
+# Only the columns HealthDataResponse exposes
+_HEALTH_DATA_RESPONSE_COLUMNS = [getattr(HealthData, name) for name in HealthDataResponse.model_fields]
+
+
 @router.post("/ingest", response_model=HealthDataResponse)
 def ingest_health_data(data: HealthDataInput, db: Session = Depends(get_db)):
     """
     Ingest health data from wearables or manual input
     """
     # Verify user exists
-    user = db.query(User).filter(User.id == data.user_id).first()
-    if not user:
+    if not get_user_cached(db, data.user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
     health_data = HealthData(
@@ -75,27 +109,84 @@ def ingest_health_data(data: HealthDataInput, db: Session = Depends(get_db)):
         symptoms=data.symptoms
     )
     
+    # Flush sends the INSERT; detaching before commit keeps the flushed values
+    # so the response is built without a refresh SELECT
     db.add(health_data)
+    db.flush()
+    db.expunge(health_data)
     db.commit()
-    db.refresh(health_data)
     
     return health_data
 
 
+@router.post("/ingest-batch")
+def ingest_health_data_batch(batch: HealthDataBatch, db: Session = Depends(get_db)):
+    """
+    Ingest a buffered batch of readings for one user in a single request
+    """
+    # Verify user exists
+    if not get_user_cached(db, batch.user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    now = datetime.utcnow()
+    rows = [
+        {
+            **item.model_dump(exclude={"timestamp"}),
+            "user_id": batch.user_id,
+            "timestamp": item.timestamp or now
+        }
+        for item in batch.items
+    ]
+    
+    # Executed as a bulk INSERT, which SQLAlchemy batches into multi-row VALUES
+    # statements instead of one round-trip per reading
+    db.execute(insert(HealthData), rows)
+    
+    # Bulk inserts bypass the flush hooks, so refresh the derived tables here
+    refresh_user_status(db.connection(), batch.user_id)
+    refresh_daily_rollup(db.connection(), batch.user_id, {row["timestamp"].date() for row in rows})
+    mark_health_changed(db, batch.user_id)
+    db.commit()
+    
+    return {
+        "success": True,
+        "records_stored": len(rows)
+    }
+
+
 @router.get("/user/{user_id}", response_model=List[HealthDataResponse])
 def get_user_health_data(
     user_id: int, 
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=MAX_HEALTH_DATA_PAGE),
+    before: Optional[datetime] = None,
+    before_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Get health data for a user
+    Get health data for a user, newest first
+    
+    When more rows follow, the X-Next-Before and X-Next-Before-Id headers
+    hold the `before` and `before_id` to pass for the next page.
     """
-    data = db.query(HealthData).filter(
+    query = db.query(*_HEALTH_DATA_RESPONSE_COLUMNS).filter(
         HealthData.user_id == user_id
-    ).order_by(HealthData.timestamp.desc()).limit(limit).all()
+    )
+    
+    # Seeks into the (user_id, timestamp) index instead of skipping rows
+    rows, next_cursor = newest_first_page(
+        query, HealthData.timestamp, HealthData.id, limit, before, before_id
+    )
+    
+    headers = None
+    if next_cursor is not None:
+        headers = {
+            "X-Next-Before": next_cursor["before"].isoformat(),
+            "X-Next-Before-Id": str(next_cursor["before_id"])
+        }
     
-    return data
+    # Rows come straight from our own table, so skip re-validating each one
+    # through HealthDataResponse; response_model still documents the shape
+    return ORJSONResponse([row._asdict() for row in rows], headers=headers)
 
 
 @router.get("/user/{user_id}/latest")
@@ -103,25 +194,17 @@ def get_latest_readings(user_id: int, db: Session = Depends(get_db)):
     """
     Get the latest reading for each signal
     """
-    latest = db.query(HealthData).filter(
-        HealthData.user_id == user_id
-    ).order_by(HealthData.timestamp.desc()).first()
-    
-    if not latest:
-        raise HTTPException(status_code=404, detail="No health data found")
+    def build():
+        # The latest reading is mirrored onto user_status_cache on every write,
+        # so this is a primary-key lookup instead of a sort over health_data
+        status = db.get(UserStatusCache, user_id)
+        
+        if not status or status.latest_reading_at is None:
+            raise HTTPException(status_code=404, detail="No health data found")
+        
+        return {"timestamp": status.latest_reading_at, **status.latest_reading()}
     
-    return {
-        "timestamp": latest.timestamp,
-        "heart_rate": latest.heart_rate,
-        "hrv": latest.hrv,
-        "sleep_duration": latest.sleep_duration,
-        "sleep_quality": latest.sleep_quality,
-        "activity_level": latest.activity_level,
-        "breathing_rate": latest.breathing_rate,
-        "bp_systolic": latest.bp_systolic,
-        "bp_diastolic": latest.bp_diastolic,
-        "blood_sugar": latest.blood_sugar
-    }
+    return cached_response(latest_readings_cache, user_id, build)
 
 
 @router.get("/user/{user_id}/trends")
@@ -133,116 +216,97 @@ def get_health_trends(
     """
     Get health trends over time
     """
-    from datetime import timedelta
-    from sqlalchemy import func
-    
-    cutoff = datetime.utcnow() - timedelta(days=days)
-    
-    data = db.query(HealthData).filter(
-        HealthData.user_id == user_id,
-        HealthData.timestamp >= cutoff
-    ).order_by(HealthData.timestamp).all()
-    
-    if not data:
-        return {"message": "No data found for the specified period"}
-    
-    # Group by day and calculate averages
-    trends = {}
-    for d in data:
-        day_key = d.timestamp.strftime("%Y-%m-%d")
-        if day_key not in trends:
-            trends[day_key] = {
-                "heart_rate": [],
-                "hrv": [],
-                "sleep_duration": [],
-                "activity_level": [],
-                "breathing_rate": []
+    def build():
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        
+        rows = get_daily_averages(db, user_id, cutoff)
+        
+        if not rows:
+            return {"message": "No data found for the specified period"}
+        
+        result = [
+            {
+                "date": row["date"],
+                "heart_rate": round(row["heart_rate"], 1) if row["heart_rate"] is not None else None,
+                "hrv": round(row["hrv"], 1) if row["hrv"] is not None else None,
+                "sleep_duration": round(row["sleep_duration"], 2) if row["sleep_duration"] is not None else None,
+                "activity_level": round(row["activity_level"]) if row["activity_level"] is not None else None,
+                "breathing_rate": round(row["breathing_rate"], 1) if row["breathing_rate"] is not None else None
             }
+            for row in rows
+        ]
         
-        if d.heart_rate:
-            trends[day_key]["heart_rate"].append(d.heart_rate)
-        if d.hrv:
-            trends[day_key]["hrv"].append(d.hrv)
-        if d.sleep_duration:
-            trends[day_key]["sleep_duration"].append(d.sleep_duration)
-        if d.activity_level:
-            trends[day_key]["activity_level"].append(d.activity_level)
-        if d.breathing_rate:
-            trends[day_key]["breathing_rate"].append(d.breathing_rate)
-    
-    # Calculate daily averages
-    result = []
-    for day, signals in sorted(trends.items()):
-        result.append({
-            "date": day,
-            "heart_rate": round(sum(signals["heart_rate"]) / len(signals["heart_rate"]), 1) if signals["heart_rate"] else None,
-            "hrv": round(sum(signals["hrv"]) / len(signals["hrv"]), 1) if signals["hrv"] else None,
-            "sleep_duration": round(sum(signals["sleep_duration"]) / len(signals["sleep_duration"]), 2) if signals["sleep_duration"] else None,
-            "activity_level": round(sum(signals["activity_level"]) / len(signals["activity_level"])) if signals["activity_level"] else None,
-            "breathing_rate": round(sum(signals["breathing_rate"]) / len(signals["breathing_rate"]), 1) if signals["breathing_rate"] else None
-        })
-    
-    return {"trends": result, "days": days}
+        return {"trends": result, "days": days}
+        
+    return cached_response(health_trends_cache, (user_id, days), build)
 
 
 @router.get("/user/{user_id}/suggestions")
-def get_health_suggestions(user_id: int, db: Session = Depends(get_db)):
+async def get_health_suggestions(user_id: int, db: Session = Depends(get_db)):
     """
     Get AI-generated health suggestions based on current CareScore
     Uses Gemini API for personalized lifestyle recommendations
     """
-    from app.models.care_score import CareScore
-    from app.services.gemini_health_service import get_health_suggestions_service
-    
-    # Get latest care score
-    care_score = db.query(CareScore).filter(
-        CareScore.user_id == user_id
-    ).order_by(CareScore.timestamp.desc()).first()
-    
-    if not care_score:
+    def load_context():
+        # Get latest care score
+        care_score = db.query(CareScore).filter(
+            CareScore.user_id == user_id
+        ).order_by(CareScore.timestamp.desc()).first()
+        
+        if not care_score:
+            return None
+        
+        # Get recent health metrics
+        latest_health = db.query(HealthData).filter(
+            HealthData.user_id == user_id
+        ).order_by(HealthData.timestamp.desc()).first()
+        
+        recent_metrics = None
+        if latest_health:
+            recent_metrics = {
+                "heart_rate": latest_health.heart_rate,
+                "hrv": latest_health.hrv,
+                "sleep_duration": latest_health.sleep_duration,
+                "activity_level": latest_health.activity_level
+            }
+        
+        # Get contributing factors from care score components
+        contributing_factors = []
+        if care_score.severity_score and care_score.severity_score > 15:
+            contributing_factors.append("elevated severity in vital signs")
+        if care_score.persistence_score and care_score.persistence_score > 10:
+            contributing_factors.append("sustained patterns over several days")
+        if care_score.cross_signal_score and care_score.cross_signal_score > 5:
+            contributing_factors.append("multiple signals showing changes")
+        
         return {
-            "suggestions": [
-                "Continue monitoring your health metrics",
-                "Stay hydrated and maintain regular sleep patterns",
-                "Consider syncing your wearable data for personalized insights"
-            ],
-            "status": "Unknown",
-            "care_score": None,
-            "disclaimer": "These are general wellness suggestions only and do not constitute medical advice.",
-            "source": "default"
-        }
-    
-    # Get recent health metrics
-    latest_health = db.query(HealthData).filter(
-        HealthData.user_id == user_id
-    ).order_by(HealthData.timestamp.desc()).first()
-    
-    recent_metrics = None
-    if latest_health:
-        recent_metrics = {
-            "heart_rate": latest_health.heart_rate,
-            "hrv": latest_health.hrv,
-            "sleep_duration": latest_health.sleep_duration,
-            "activity_level": latest_health.activity_level
+            "care_score": care_score.care_score,
+            "status": care_score.status,
+            "contributing_factors": contributing_factors if contributing_factors else None,
+            "recent_metrics": recent_metrics
         }
     
-    # Get contributing factors from care score components
-    contributing_factors = []
-    if care_score.severity_component and care_score.severity_component > 15:
-        contributing_factors.append("elevated severity in vital signs")
-    if care_score.persistence_component and care_score.persistence_component > 10:
-        contributing_factors.append("sustained patterns over several days")
-    if care_score.cross_signal_component and care_score.cross_signal_component > 5:
-        contributing_factors.append("multiple signals showing changes")
-    
-    # Generate suggestions
-    service = get_health_suggestions_service()
-    suggestions = service.generate_suggestions(
-        care_score=care_score.care_score,
-        status=care_score.status,
-        contributing_factors=contributing_factors if contributing_factors else None,
-        recent_metrics=recent_metrics
-    )
+    async def build():
+        # Database reads stay on the threadpool; the Gemini call is awaited
+        # so it does not hold a worker thread for its whole round-trip
+        context = await run_in_threadpool(load_context)
+        
+        if context is None:
+            return {
+                "suggestions": [
+                    "Continue monitoring your health metrics",
+                    "Stay hydrated and maintain regular sleep patterns",
+                    "Consider syncing your wearable data for personalized insights"
+                ],
+                "status": "Unknown",
+                "care_score": None,
+                "disclaimer": "These are general wellness suggestions only and do not constitute medical advice.",
+                "source": "default"
+            }
+        
+        # Generate suggestions
+        service = get_health_suggestions_service()
+        return await service.generate_suggestions_async(**context)
     
-    return suggestions
+    return await cached_response_async(health_suggestions_cache, user_id, build)
 
@@ -200,7 +200,7 @@ async def google_oauth_callback(
 
 
 @router.get("/google/status/{user_id}")
-async def check_oauth_status(
+def check_oauth_status(
     user_id: int,
     db: Session = Depends(get_db)
 ):
@@ -498,7 +498,7 @@ async def process_single_file(
 
 
 @router.get("/drive/ingestion-jobs/{user_id}")
-async def list_ingestion_jobs(
+def list_ingestion_jobs(
     user_id: int,
     limit: int = 10,
     db: Session = Depends(get_db)
@@ -522,8 +522,8 @@ async def list_ingestion_jobs(
                 "id": job.id,
                 "job_type": job.job_type,
                 "status": job.status,
-                "started_at": job.started_at.isoformat() if job.started_at else None,
-                "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+                "started_at": job.started_at,
+                "completed_at": job.completed_at,
                 "files_found": job.files_found,
                 "files_processed": job.files_processed,
                 "records_imported": job.records_imported,
@@ -535,7 +535,7 @@ async def list_ingestion_jobs(
 
 
 @router.get("/drive/processed-files/{user_id}")
-async def list_processed_files(
+def list_processed_files(
     user_id: int,
     limit: int = 20,
     db: Session = Depends(get_db)
@@ -564,7 +564,7 @@ async def list_processed_files(
                 "file_size": f.file_size,
                 "status": f.status,
                 "records_imported": f.records_imported,
-                "processed_at": f.processed_at.isoformat() if f.processed_at else None,
+                "processed_at": f.processed_at,
                 "error_message": f.error_message
             }
             for f in files
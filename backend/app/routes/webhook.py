@@ -4,18 +4,27 @@ Handles Health Connect webhook data ingestion from Android devices
 """
 
 import json
+import logging
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Request
+from fastapi.exceptions import RequestValidationError
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
 
-from app.database import get_db
-from app.models.user import User
+from app.database import get_db, SessionLocal
 from app.models.health_data import HealthData
+from app.models.user_status import UserStatusCache, refresh_user_status
+from app.models.health_daily import refresh_daily_rollup
 from app.services.carescore_engine import CareScoreEngine
 from app.services.anomaly_detector import AnomalyDetector
 from app.services.escalation_service import EscalationService
+from app.services.auth_service import AuthService, APIKeyIdentity
+from app.services.response_cache import mark_health_changed
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/webhook", tags=["Webhook"])
 
@@ -67,6 +76,38 @@ class WebhookBatchPayload(BaseModel):
     payloads: List[WebhookPayload]
 
 
+_PAYLOAD_ADAPTER = TypeAdapter(WebhookPayload)
+_BATCH_ADAPTER = TypeAdapter(WebhookBatchPayload)
+
+
+def _json_body(adapter: TypeAdapter):
+    """
+    Dependency validating the raw request body with pydantic-core's JSON
+    parser in one pass, instead of json.loads() followed by validating the
+    resulting Python objects. Hot ingest routes take their payload from it.
+    """
+    async def parse(request: Request):
+        try:
+            return adapter.validate_json(await request.body())
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+            )
+    return parse
+
+
+def _json_body_openapi(model) -> Dict[str, Any]:
+    """Request body schema for routes that parse their body with _json_body()"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {
+                "schema": model.model_json_schema(ref_template="#/components/schemas/{model}")
+            }}
+        }
+    }
+
+
 # ============================================
 # Device Token Model for Auth
 # ============================================
@@ -82,134 +123,223 @@ class DeviceToken(BaseModel):
 # Helper Functions
 # ============================================
 
+@lru_cache(maxsize=4096)
+def _parse_iso(iso_string: str) -> datetime:
+    # Sleep stage start/end times repeat within and across payloads. Failures
+    # raise and are therefore never cached.
+    if iso_string.endswith('Z'):
+        iso_string = iso_string[:-1] + '+00:00'
+    return datetime.fromisoformat(iso_string)
+
+
 def parse_iso_datetime(iso_string: str) -> datetime:
     """Parse ISO datetime string to datetime object"""
     try:
-        # Handle various ISO formats
-        if iso_string.endswith('Z'):
-            iso_string = iso_string[:-1] + '+00:00'
-        return datetime.fromisoformat(iso_string)
+        return _parse_iso(iso_string)
     except Exception:
         return datetime.utcnow()
 
 
-def validate_api_key(api_key: str, db: Session) -> Optional[User]:
-    """Validate API key and return associated user"""
-    if not api_key:
-        return None
-    
-    # API key format: "pulseai_{user_id}_{secret}"
-    # For simplicity, we'll use email-based lookup
-    # In production, use proper API key table
+def validate_api_key(api_key: str, db: Session) -> Optional[APIKeyIdentity]:
+    """
+    Validate API key and return the identity it belongs to. Only issued,
+    active, unexpired keys are accepted; unissued "pulseai_{user_id}_..."
+    keys only with ALLOW_DEV_API_KEYS set.
+    """
+    return AuthService(db).resolve_api_key(api_key)
+
+
+# Every normalized row carries all of these keys so the rows can be written
+# with a single executemany INSERT
+_HEALTH_FIELDS = (
+    'heart_rate', 'hrv', 'sleep_duration', 'sleep_quality', 'activity_level',
+    'breathing_rate', 'bp_systolic', 'bp_diastolic', 'blood_sugar'
+)
+
+
+# Handlers copy one Health Connect record into a health_data row. They get
+# the record, the row and the payload's sleep window as (end, hours) or None,
+# and return whether a signal worth storing was captured.
+
+def _value_handler(field: str):
+    def handler(record, row, sleep_window) -> bool:
+        row[field] = record.get('value')
+        return bool(row[field])
+    return handler
+
+
+def _set_sleep(record, row, sleep_window) -> bool:
+    # Sleep duration from the session window
+    if sleep_window is not None:
+        row['timestamp'], row['sleep_duration'] = sleep_window
     
-    user = db.query(User).filter(
-        User.is_active == True
-    ).first()
+    # Calculate sleep quality from stages if available
+    stages = record.get('stages', [])
+    if stages:
+        # One pass, parsing each stage's bounds once
+        deep_time = 0.0
+        total_time = 0.0
+        for s in stages:
+            stage_time = (parse_iso_datetime(s['endTime']) - parse_iso_datetime(s['startTime'])).total_seconds()
+            total_time += stage_time
+            if s.get('stage') in ('DEEP', 'deep'):
+                deep_time += stage_time
+        if total_time > 0:
+            # Quality based on deep sleep percentage
+            deep_percentage = (deep_time / total_time) * 100
+            row['sleep_quality'] = min(100, deep_percentage * 5)  # Scale to 0-100
     
-    return user
+    # Quality alone is not enough to keep the row
+    return bool(row['sleep_duration'])
+
+
+def _set_steps(record, row, sleep_window) -> bool:
+    row['activity_level'] = record.get('value', record.get('count'))
+    return bool(row['activity_level'])
+
+
+def _set_blood_pressure(record, row, sleep_window) -> bool:
+    row['bp_systolic'] = record.get('systolic')
+    row['bp_diastolic'] = record.get('diastolic')
+    # A diastolic reading without systolic is not kept
+    return bool(row['bp_systolic'])
+
+
+def _set_calories(record, row, sleep_window) -> bool:
+    # Calories can contribute to activity level
+    if record.get('value'):
+        row['activity_level'] = record.get('value')
+        return True
+    return False
+
+
+_set_heart_rate = _value_handler('heart_rate')
+_set_hrv = _value_handler('hrv')
+_set_blood_sugar = _value_handler('blood_sugar')
+_set_breathing_rate = _value_handler('breathing_rate')
+
+
+def _value_normalizer(field: str):
+    """
+    Normalizer specialized for a type that carries a single 'value'. Records
+    without one are skipped before a row is built or a timestamp parsed, and
+    each row is built in one step from a per-payload template.
+    """
+    def normalize(payload: WebhookPayload, user_id: int) -> List[Dict[str, Any]]:
+        template = dict.fromkeys(_HEALTH_FIELDS)
+        template.update(user_id=user_id, source="health_connect")
+        
+        rows = []
+        for record in payload.records:
+            value = record.get('value')
+            if not value:
+                continue
+            time = record['time'] if 'time' in record else (payload.startTime or datetime.utcnow().isoformat())
+            rows.append({**template, 'timestamp': parse_iso_datetime(time), field: value})
+        return rows
+    return normalize
+
+
+# Fast paths for the single-value types that make up most webhook traffic,
+# keyed by handler so every dataType alias shares them
+_FAST_PATHS = {
+    _set_heart_rate: _value_normalizer('heart_rate'),
+    _set_hrv: _value_normalizer('hrv'),
+    _set_blood_sugar: _value_normalizer('blood_sugar'),
+    _set_breathing_rate: _value_normalizer('breathing_rate'),
+}
+
+# Lower-cased dataType -> handler. SpO2 and weight are accepted by the
+# webhook but not stored yet, so they have no entry.
+DATATYPE_DISPATCH = {
+    'heartrate': _set_heart_rate,
+    'heart_rate': _set_heart_rate,
+    'restingheartrate': _set_heart_rate,
+    'resting_heart_rate': _set_heart_rate,
+    'hrv': _set_hrv,
+    'heartrratevariability': _set_hrv,
+    'heart_rate_variability': _set_hrv,
+    'sleepsession': _set_sleep,
+    'sleep_session': _set_sleep,
+    'sleep': _set_sleep,
+    'steps': _set_steps,
+    'bloodpressure': _set_blood_pressure,
+    'blood_pressure': _set_blood_pressure,
+    'bloodglucose': _set_blood_sugar,
+    'blood_glucose': _set_blood_sugar,
+    'bloodsugar': _set_blood_sugar,
+    'blood_sugar': _set_blood_sugar,
+    'respiratoryrate': _set_breathing_rate,
+    'respiratory_rate': _set_breathing_rate,
+    'breathingrate': _set_breathing_rate,
+    'breathing_rate': _set_breathing_rate,
+    'activecalories': _set_calories,
+    'active_calories': _set_calories,
+    'totalcalories': _set_calories,
+    'total_calories': _set_calories,
+}
 
 
 def normalize_health_connect_data(
     payload: WebhookPayload,
     user_id: int
-) -> List[HealthData]:
+) -> List[Dict[str, Any]]:
     """
-    Normalize Health Connect webhook data to internal schema
+    Normalize Health Connect webhook data to internal schema.
+    Returns plain row dicts for a bulk insert into health_data.
     """
-    health_records = []
-    data_type = payload.dataType.lower()
+    handler = DATATYPE_DISPATCH.get(payload.dataType.lower())
+    if handler is None:
+        # Nothing we store, so no record could produce a row
+        return []
+    
+    fast_path = _FAST_PATHS.get(handler)
+    if fast_path is not None:
+        return fast_path(payload, user_id)
+    
+    # The session window is shared by every record, so work it out once
+    sleep_window = None
+    if handler is _set_sleep and payload.startTime and payload.endTime:
+        session_end = parse_iso_datetime(payload.endTime)
+        session_hours = round((session_end - parse_iso_datetime(payload.startTime)).total_seconds() / 3600, 2)
+        sleep_window = (session_end, session_hours)
     
+    health_records = []
     for record in payload.records:
-        health_data = HealthData(
+        health_data = dict.fromkeys(_HEALTH_FIELDS)
+        health_data.update(
             user_id=user_id,
             source="health_connect",
             timestamp=parse_iso_datetime(record.get('time', payload.startTime or datetime.utcnow().isoformat()))
         )
         
-        # Map data types to our schema
-        if data_type in ['heartrate', 'heart_rate']:
-            health_data.heart_rate = record.get('value')
-            
-        elif data_type in ['restingheartrate', 'resting_heart_rate']:
-            health_data.heart_rate = record.get('value')
-            
-        elif data_type in ['hrv', 'heartrratevariability', 'heart_rate_variability']:
-            health_data.hrv = record.get('value')
-            
-        elif data_type in ['sleepsession', 'sleep_session', 'sleep']:
-            # Calculate sleep duration from session
-            if payload.startTime and payload.endTime:
-                start = parse_iso_datetime(payload.startTime)
-                end = parse_iso_datetime(payload.endTime)
-                duration_hours = (end - start).total_seconds() / 3600
-                health_data.sleep_duration = round(duration_hours, 2)
-                health_data.timestamp = end
-                
-            # Calculate sleep quality from stages if available
-            stages = record.get('stages', [])
-            if stages:
-                deep_time = sum(
-                    (parse_iso_datetime(s['endTime']) - parse_iso_datetime(s['startTime'])).total_seconds()
-                    for s in stages if s.get('stage') in ['DEEP', 'deep']
-                )
-                total_time = sum(
-                    (parse_iso_datetime(s['endTime']) - parse_iso_datetime(s['startTime'])).total_seconds()
-                    for s in stages
-                )
-                if total_time > 0:
-                    # Quality based on deep sleep percentage
-                    deep_percentage = (deep_time / total_time) * 100
-                    health_data.sleep_quality = min(100, deep_percentage * 5)  # Scale to 0-100
-                    
-        elif data_type in ['steps']:
-            health_data.activity_level = record.get('value', record.get('count'))
-            
-        elif data_type in ['bloodpressure', 'blood_pressure']:
-            health_data.bp_systolic = record.get('systolic')
-            health_data.bp_diastolic = record.get('diastolic')
-            
-        elif data_type in ['bloodglucose', 'blood_glucose', 'bloodsugar', 'blood_sugar']:
-            health_data.blood_sugar = record.get('value')
-            
-        elif data_type in ['respiratoryrate', 'respiratory_rate', 'breathingrate', 'breathing_rate']:
-            health_data.breathing_rate = record.get('value')
-            
-        elif data_type in ['spo2', 'oxygensaturation', 'oxygen_saturation']:
-            # Store SpO2 in a generic field or add to schema
-            pass
-            
-        elif data_type in ['weight']:
-            # Could extend schema for weight tracking
-            pass
-            
-        elif data_type in ['activecalories', 'active_calories', 'totalcalories', 'total_calories']:
-            # Calories can contribute to activity level
-            if record.get('value'):
-                health_data.activity_level = record.get('value')
-        
         # Only add if we captured some data
-        if any([
-            health_data.heart_rate,
-            health_data.hrv,
-            health_data.sleep_duration,
-            health_data.activity_level,
-            health_data.breathing_rate,
-            health_data.bp_systolic,
-            health_data.blood_sugar
-        ]):
+        if handler(record, health_data, sleep_window):
             health_records.append(health_data)
     
     return health_records
 
 
+def store_health_records(db: Session, user_id: int, rows: List[Dict[str, Any]]) -> None:
+    """
+    Write normalized rows with one Core executemany INSERT, which SQLAlchemy
+    sends as multi-row VALUES batches instead of a statement per ORM object
+    """
+    db.execute(insert(HealthData), rows)
+    # Bulk inserts bypass the flush hooks, so refresh the derived tables here
+    refresh_user_status(db.connection(), user_id)
+    refresh_daily_rollup(db.connection(), user_id, {row['timestamp'].date() for row in rows})
+    mark_health_changed(db, user_id)
+
+
 # ============================================
 # Webhook Endpoints
 # ============================================
 
-@router.post("/ingest")
-async def ingest_webhook(
-    payload: WebhookPayload,
+@router.post("/ingest", openapi_extra=_json_body_openapi(WebhookPayload))
+def ingest_webhook(
     request: Request,
+    payload: WebhookPayload = Depends(_json_body(_PAYLOAD_ADAPTER)),
     x_api_key: Optional[str] = Header(None, alias="X-API-Key"),
     x_device_id: Optional[str] = Header(None, alias="X-Device-ID"),
     db: Session = Depends(get_db)
@@ -235,13 +365,13 @@ async def ingest_webhook(
     if not x_api_key:
         raise HTTPException(status_code=401, detail="Missing API key")
     
-    user = validate_api_key(x_api_key, db)
-    if not user:
+    identity = validate_api_key(x_api_key, db)
+    if not identity:
         raise HTTPException(status_code=401, detail="Invalid API key")
     
     # Normalize and store data
     try:
-        health_records = normalize_health_connect_data(payload, user.id)
+        health_records = normalize_health_connect_data(payload, identity.user_id)
         
         if not health_records:
             return {
@@ -251,7 +381,7 @@ async def ingest_webhook(
             }
         
         # Store records
-        db.add_all(health_records)
+        store_health_records(db, identity.user_id, health_records)
         db.commit()
         
         return {
@@ -259,7 +389,7 @@ async def ingest_webhook(
             "message": f"Ingested {len(health_records)} records",
             "records_stored": len(health_records),
             "data_type": payload.dataType,
-            "user_id": user.id
+            "user_id": identity.user_id
         }
         
     except Exception as e:
@@ -267,9 +397,9 @@ async def ingest_webhook(
         raise HTTPException(status_code=500, detail=f"Failed to process data: {str(e)}")
 
 
-@router.post("/ingest-batch")
-async def ingest_batch_webhook(
-    batch: WebhookBatchPayload,
+@router.post("/ingest-batch", openapi_extra=_json_body_openapi(WebhookBatchPayload))
+def ingest_batch_webhook(
+    batch: WebhookBatchPayload = Depends(_json_body(_BATCH_ADAPTER)),
     x_api_key: Optional[str] = Header(None, alias="X-API-Key"),
     db: Session = Depends(get_db)
 ):
@@ -288,19 +418,18 @@ async def ingest_batch_webhook(
     if not x_api_key:
         raise HTTPException(status_code=401, detail="Missing API key")
     
-    user = validate_api_key(x_api_key, db)
-    if not user:
+    identity = validate_api_key(x_api_key, db)
+    if not identity:
         raise HTTPException(status_code=401, detail="Invalid API key")
     
-    total_records = 0
+    all_records = []
     results = []
     
     for payload in batch.payloads:
         try:
-            health_records = normalize_health_connect_data(payload, user.id)
+            health_records = normalize_health_connect_data(payload, identity.user_id)
             if health_records:
-                db.add_all(health_records)
-                total_records += len(health_records)
+                all_records.extend(health_records)
                 results.append({
                     "dataType": payload.dataType,
                     "records": len(health_records),
@@ -320,99 +449,75 @@ async def ingest_batch_webhook(
                 "error": str(e)
             })
     
-    db.commit()
+    # One bulk insert for every payload in the batch
+    if all_records:
+        store_health_records(db, identity.user_id, all_records)
+        db.commit()
     
     return {
         "success": True,
         "device_id": batch.deviceId,
-        "total_records": total_records,
+        "total_records": len(all_records),
         "results": results
     }
 
 
-@router.post("/ingest-and-analyze")
-async def ingest_and_analyze(
+def analyze_latest_reading(user_id: int) -> None:
+    """Compute a CareScore from the user's latest reading and check for escalation"""
+    db = SessionLocal()
+    try:
+        # Latest reading, as mirrored onto the user's status row by the ingest
+        status = db.get(UserStatusCache, user_id)
+        if not status or status.latest_reading_at is None:
+            return
+        
+        engine = CareScoreEngine(db)
+        care_score = engine.compute_carescore(user_id, status.latest_reading())
+        
+        escalation_service = EscalationService(db)
+        escalation_service.check_escalation(user_id, care_score)
+    except Exception as e:
+        logger.error(f"Analysis failed for user {user_id}: {e}")
+    finally:
+        db.close()
+
+
+@router.post("/ingest-and-analyze", status_code=202)
+def ingest_and_analyze(
     payload: WebhookPayload,
+    background_tasks: BackgroundTasks,
     x_api_key: Optional[str] = Header(None, alias="X-API-Key"),
     x_device_id: Optional[str] = Header(None, alias="X-Device-ID"),
     db: Session = Depends(get_db)
 ):
     """
     Ingest health data AND trigger analysis pipeline
-    Returns updated CareScore
+    The CareScore is computed after the response is sent; poll
+    /analysis/carescore/{user_id} for the result
     """
     if not x_api_key:
         raise HTTPException(status_code=401, detail="Missing API key")
     
-    user = validate_api_key(x_api_key, db)
-    if not user:
+    identity = validate_api_key(x_api_key, db)
+    if not identity:
         raise HTTPException(status_code=401, detail="Invalid API key")
     
     # Store data
-    health_records = normalize_health_connect_data(payload, user.id)
+    health_records = normalize_health_connect_data(payload, identity.user_id)
     if health_records:
-        db.add_all(health_records)
+        store_health_records(db, identity.user_id, health_records)
         db.commit()
     
-    # Get latest data for analysis
-    latest = db.query(HealthData).filter(
-        HealthData.user_id == user.id
-    ).order_by(HealthData.timestamp.desc()).first()
+    # Scoring and escalation checks take hundreds of milliseconds, so they
+    # run once the device has its acknowledgement
+    background_tasks.add_task(analyze_latest_reading, identity.user_id)
     
-    if not latest:
-        return {
-            "success": True,
-            "records_stored": len(health_records),
-            "analysis": None,
-            "message": "Data stored, insufficient data for analysis"
-        }
-    
-    # Build current data dict
-    current_data = {
-        "heart_rate": latest.heart_rate,
-        "hrv": latest.hrv,
-        "sleep_duration": latest.sleep_duration,
-        "sleep_quality": latest.sleep_quality,
-        "activity_level": latest.activity_level,
-        "breathing_rate": latest.breathing_rate,
-        "bp_systolic": latest.bp_systolic,
-        "bp_diastolic": latest.bp_diastolic,
-        "blood_sugar": latest.blood_sugar
+    return {
+        "success": True,
+        "records_stored": len(health_records),
+        "analysis_scheduled": True,
+        "user_id": identity.user_id
     }
-    
-    # Compute CareScore
-    try:
-        engine = CareScoreEngine(db)
-        care_score = engine.compute_carescore(user.id, current_data)
-        
-        # Check for escalation
-        escalation_service = EscalationService(db)
-        escalation = escalation_service.check_escalation(user.id, care_score)
-        
-        return {
-            "success": True,
-            "records_stored": len(health_records),
-            "analysis": {
-                "care_score": care_score.care_score,
-                "status": care_score.status,
-                "drift_score": care_score.drift_score,
-                "confidence": care_score.confidence_score,
-                "explanation": care_score.explanation
-            },
-            "escalation": {
-                "triggered": escalation is not None,
-                "level": escalation.level if escalation else None,
-                "message": escalation.message if escalation else None
-            } if escalation else None
-        }
-        
-    except Exception as e:
-        return {
-            "success": True,
-            "records_stored": len(health_records),
-            "analysis": None,
-            "error": f"Analysis failed: {str(e)}"
-        }
 
 
 # ============================================
@@ -420,28 +525,26 @@ async def ingest_and_analyze(
 # ============================================
 
 @router.post("/generate-api-key")
-async def generate_api_key(
+def generate_api_key(
     user_id: int,
     db: Session = Depends(get_db)
 ):
     """
     Generate API key for a user (for webhook authentication)
     """
-    import secrets
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Generate a secure API key
-    api_key = f"pulseai_{user_id}_{secrets.token_urlsafe(32)}"
-    
-    # In production, store this in a separate API keys table
-    # For now, return it directly
+    # Stored hashed in api_keys so webhook requests resolve it with one
+    # indexed lookup
+    try:
+        raw_key, _ = AuthService(db).generate_api_key(
+            user_id=user_id,
+            name="Health Connect webhook"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     
     return {
         "user_id": user_id,
-        "api_key": api_key,
+        "api_key": raw_key,
         "instructions": "Include this key in the X-API-Key header for webhook requests"
     }
 
@@ -3,8 +3,11 @@ Anomaly Detection Service for Pulse AI
 Implements personalized baseline learning and drift detection
 """
 
+import threading
 import numpy as np
 from typing import Dict, List, Optional, Tuple
+from cachetools import TTLCache
+from sklearn.ensemble import IsolationForest
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import func
@@ -12,6 +15,82 @@ from sqlalchemy import func
 from app.models.user import User
 from app.models.health_data import HealthData
 
+# Learned baselines by (user_id, days). New readings for a user evict that
+# user's entries (see invalidate_baselines), but only in the process that
+# wrote them: other workers keep using the old baseline for up to the TTL.
+# A baseline spans days of readings, so an hour-old one barely differs.
+_baseline_cache = TTLCache(maxsize=10_000, ttl=3600)
+_baseline_cache_lock = threading.Lock()
+
+# Fitted multivariate models by (user_id, days). Fitting is the costly part
+# of an analysis, so new readings do not evict a model: it is refitted at
+# most once per TTL. None is cached for users without enough complete
+# readings, and that entry is evicted by new readings so a model is fitted
+# as soon as there is enough data.
+_joint_model_cache = TTLCache(maxsize=10_000, ttl=3600)
+
+# Readings with every joint signal needed before a multivariate model is fitted
+MIN_JOINT_SAMPLES = 30
+
+# Share of a user's own baseline readings treated as outliers when fitting;
+# sets the zero point of the joint score
+JOINT_CONTAMINATION = 0.01
+
+# Joint score (IsolationForest.decision_function) cut-offs, most severe
+# first. Below 0 the reading is more isolated than all but
+# JOINT_CONTAMINATION of the user's baseline readings.
+JOINT_SEVERITY_THRESHOLDS = ((-0.1, 'severe'), (-0.05, 'moderate'), (0.0, 'mild'))
+
+
+def invalidate_baselines(user_id: int) -> None:
+    """
+    Forget a user's cached baseline windows after new readings, and any
+    cached lack of a joint model. Fitted joint models are kept.
+    """
+    with _baseline_cache_lock:
+        for key in [key for key in _baseline_cache.keys() if key[0] == user_id]:
+            _baseline_cache.pop(key, None)
+        for key in [key for key in _joint_model_cache.keys() if key[0] == user_id]:
+            if _joint_model_cache.get(key, False) is None:
+                _joint_model_cache.pop(key, None)
+
+
+def _signal_matrix(rows: List, width: int) -> np.ndarray:
+    """
+    (readings x signals) float64 matrix from column-select rows, None as NaN.
+    Rows are copied to plain tuples first: NumPy converts Row objects through
+    the generic sequence protocol, which is an order of magnitude slower.
+    """
+    return np.array([tuple(row) for row in rows], dtype=np.float64).reshape(len(rows), width)
+
+
+def _column_percentiles(values: np.ndarray, counts: np.ndarray, quantiles: Tuple[float, ...]) -> np.ndarray:
+    """
+    Linear-interpolation percentiles of every column of `values`, ignoring
+    NaN, from a single sort. `counts` holds the non-NaN count per column.
+    Returns one row per quantile, matching np.nanpercentile.
+    """
+    ordered = np.sort(values, axis=0)  # NaN sorts last in each column
+    positions = np.multiply.outer(quantiles, counts - 1)
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.minimum(lower + 1, counts - 1)
+    low_values = np.take_along_axis(ordered, lower, axis=0)
+    high_values = np.take_along_axis(ordered, upper, axis=0)
+    return low_values + (high_values - low_values) * (positions - lower)
+
+
+def _linear_slope(values: np.ndarray) -> float:
+    """
+    Least-squares slope of `values` against 0..n-1, in closed form. The sums
+    over x are analytic, so no design matrix or lstsq solve is needed.
+    """
+    n = len(values)
+    sum_x = n * (n - 1) / 2
+    sum_xx = n * (n - 1) * (2 * n - 1) / 6
+    sum_y = values.sum()
+    sum_xy = np.dot(np.arange(n), values)
+    return float((n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x * sum_x))
+
 
 class AnomalyDetector:
     """
@@ -27,6 +106,10 @@ class AnomalyDetector:
     
     MANUAL_SIGNALS = ['bp_systolic', 'bp_diastolic', 'blood_sugar']
     
+    # Vitals sampled together in each wearable reading, scored jointly.
+    # Sleep and activity arrive as separate daily rows.
+    JOINT_SIGNALS = ['heart_rate', 'hrv', 'breathing_rate']
+    
     def __init__(self, db: Session):
         self.db = db
     
@@ -36,34 +119,112 @@ class AnomalyDetector:
         Uses median and IQR for robustness against outliers
         """
         cutoff = datetime.utcnow() - timedelta(days=days)
+        signals = self.SIGNALS + self.MANUAL_SIGNALS
         
-        data = self.db.query(HealthData).filter(
+        # Only the signal columns, as plain tuples (no ORM objects)
+        rows = self.db.query(*[getattr(HealthData, signal) for signal in signals]).filter(
             HealthData.user_id == user_id,
             HealthData.timestamp >= cutoff
         ).all()
         
-        if not data:
+        if not rows:
             return {}
         
-        baselines = {}
+        # One (readings x signals) matrix, missing values as NaN, so the
+        # statistics are computed for all signals at once
+        values = _signal_matrix(rows, len(signals))
+        counts = np.count_nonzero(~np.isnan(values), axis=0)
+        keep = counts >= 5  # Minimum data requirement
         
-        for signal in self.SIGNALS + self.MANUAL_SIGNALS:
-            values = [getattr(d, signal) for d in data if getattr(d, signal) is not None]
-            if len(values) >= 5:  # Minimum data requirement
+        baselines = {}
+        if keep.any():
+            kept = values[:, keep]
+            q1s, medians, q3s = _column_percentiles(kept, counts[keep], (0.25, 0.5, 0.75))
+            means = np.nanmean(kept, axis=0)
+            stds = np.nanstd(kept, axis=0)
+            
+            kept_signals = [signal for signal, k in zip(signals, keep) if k]
+            for i, signal in enumerate(kept_signals):
                 baselines[signal] = {
-                    'median': float(np.median(values)),
-                    'mean': float(np.mean(values)),
-                    'std': float(np.std(values)),
-                    'q1': float(np.percentile(values, 25)),
-                    'q3': float(np.percentile(values, 75)),
-                    'iqr': float(np.percentile(values, 75) - np.percentile(values, 25))
+                    'median': float(medians[i]),
+                    'mean': float(means[i]),
+                    'std': float(stds[i]),
+                    'q1': float(q1s[i]),
+                    'q3': float(q3s[i]),
+                    'iqr': float(q3s[i] - q1s[i])
                 }
         
         # Update user baselines
         self._update_user_baselines(user_id, baselines)
         
+        with _baseline_cache_lock:
+            _baseline_cache[(user_id, days)] = baselines
+        
         return baselines
     
+    def get_baselines(self, user_id: int, days: int = 14) -> Dict[str, Dict]:
+        """Learned baselines for the window, relearned only when not cached"""
+        with _baseline_cache_lock:
+            baselines = _baseline_cache.get((user_id, days))
+        if baselines is not None:
+            return baselines
+        return self.learn_baseline(user_id, days)
+    
+    def get_joint_model(self, user_id: int, days: int = 14) -> Optional[IsolationForest]:
+        """
+        IsolationForest over JOINT_SIGNALS in the baseline window, fitted on
+        readings where all of them are present. None when there are too few.
+        """
+        key = (user_id, days)
+        with _baseline_cache_lock:
+            if key in _joint_model_cache:
+                return _joint_model_cache[key]
+        
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        rows = self.db.query(*[getattr(HealthData, signal) for signal in self.JOINT_SIGNALS]).filter(
+            HealthData.user_id == user_id,
+            HealthData.timestamp >= cutoff
+        ).all()
+        
+        values = _signal_matrix(rows, len(self.JOINT_SIGNALS))
+        complete = values[~np.isnan(values).any(axis=1)]
+        
+        model = None
+        if len(complete) >= MIN_JOINT_SAMPLES:
+            # Single-threaded and seeded: fitted inside a request, and the
+            # same data should always give the same scores
+            model = IsolationForest(
+                n_estimators=50,
+                max_samples=min(256, len(complete)),
+                contamination=JOINT_CONTAMINATION,
+                random_state=0
+            ).fit(complete)
+        
+        with _baseline_cache_lock:
+            _joint_model_cache[key] = model
+        return model
+    
+    def _score_joint_anomaly(self, user_id: int, current_data: Dict[str, float], days: int = 14) -> Optional[Dict]:
+        """
+        Score the current wearable readings together, catching combinations
+        (e.g. slightly high heart rate with slightly low HRV) that no single
+        signal's z-score flags. None when a signal is missing or there is no model.
+        """
+        vector = [current_data.get(signal) for signal in self.JOINT_SIGNALS]
+        if any(value is None for value in vector):
+            return None
+        
+        model = self.get_joint_model(user_id, days)
+        if model is None:
+            return None
+        
+        score = float(model.decision_function(np.array([vector], dtype=np.float64))[0])
+        severity = next(
+            (label for threshold, label in JOINT_SEVERITY_THRESHOLDS if score < threshold),
+            'normal'
+        )
+        return {'score': round(score, 3), 'severity': severity}
+    
     def _update_user_baselines(self, user_id: int, baselines: Dict) -> None:
         """Update user baseline values in database"""
         user = self.db.query(User).filter(User.id == user_id).first()
@@ -91,14 +252,15 @@ class AnomalyDetector:
         self, 
         user_id: int,
         current_data: Dict[str, float],
-        baselines: Dict[str, Dict] = None
+        baselines: Dict[str, Dict] = None,
+        days: int = 14
     ) -> Dict:
         """
-        Detect anomalies in current health data
-        Returns anomaly analysis with severity levels
+        Detect anomalies in current health data against the `days` baseline
+        window. Returns anomaly analysis with severity levels
         """
         if baselines is None:
-            baselines = self.learn_baseline(user_id)
+            baselines = self.get_baselines(user_id, days)
         
         if not baselines:
             return {
@@ -132,19 +294,27 @@ class AnomalyDetector:
                     'direction': 'high' if value > baseline['median'] else 'low'
                 })
         
+        # Per-signal z-scores stay as the explanation; the joint score adds
+        # anomalies that only show up across signals
+        joint_anomaly = self._score_joint_anomaly(user_id, current_data, days)
+        severities = [a['severity'] for a in anomalies]
+        if joint_anomaly and joint_anomaly['severity'] != 'normal':
+            severities.append(joint_anomaly['severity'])
+        
         # Calculate overall risk
-        if not anomalies:
+        if not severities:
             overall_risk = 'normal'
-        elif any(a['severity'] == 'severe' for a in anomalies):
+        elif 'severe' in severities:
             overall_risk = 'high'
-        elif any(a['severity'] == 'moderate' for a in anomalies):
+        elif 'moderate' in severities:
             overall_risk = 'moderate'
         else:
             overall_risk = 'mild'
         
         return {
-            'has_anomaly': len(anomalies) > 0,
+            'has_anomaly': len(severities) > 0,
             'anomalies': anomalies,
+            'joint_anomaly': joint_anomaly,
             'overall_risk': overall_risk,
             'num_signals_affected': len(anomalies),
             'analyzed_at': datetime.utcnow().isoformat()
@@ -180,47 +350,58 @@ class AnomalyDetector:
             return 'mild'
         return 'normal'
     
-    def analyze_drift(self, user_id: int, window_days: int = 7) -> Dict:
+    def analyze_drift(
+        self,
+        user_id: int,
+        window_days: int = 7,
+        baselines: Dict[str, Dict] = None
+    ) -> Dict:
         """
         Analyze clinical drift over time
         Detects sustained deviations vs one-time spikes
+        Pass 30-day `baselines` if the caller already has them
         """
         cutoff = datetime.utcnow() - timedelta(days=window_days)
         
-        data = self.db.query(HealthData).filter(
+        rows = self.db.query(*[getattr(HealthData, signal) for signal in self.SIGNALS]).filter(
             HealthData.user_id == user_id,
             HealthData.timestamp >= cutoff
         ).order_by(HealthData.timestamp).all()
         
-        if len(data) < 3:
+        if len(rows) < 3:
             return {
                 'has_drift': False,
                 'drift_signals': [],
                 'message': 'Insufficient recent data for drift analysis'
             }
         
-        baselines = self.learn_baseline(user_id, days=30)
+        if baselines is None:
+            baselines = self.get_baselines(user_id, days=30)
         drift_signals = []
         
-        for signal in self.SIGNALS:
+        # (readings x signals), oldest first, missing values as NaN
+        matrix = _signal_matrix(rows, len(self.SIGNALS))
+        
+        for column, signal in enumerate(self.SIGNALS):
             if signal not in baselines:
                 continue
             
-            values = [getattr(d, signal) for d in data if getattr(d, signal) is not None]
+            values = matrix[:, column]
+            values = values[~np.isnan(values)]
             if len(values) < 3:
                 continue
             
             baseline = baselines[signal]
             
             # Check if recent trend is consistently above/below baseline
-            recent_avg = np.mean(values[-3:])  # Last 3 readings
+            recent_avg = float(np.mean(values[-3:]))  # Last 3 readings
             z_score = self._calculate_modified_z_score(
                 recent_avg, baseline['median'], baseline['iqr']
             )
             
             # Check trend direction
             if len(values) >= 5:
-                trend = np.polyfit(range(len(values)), values, 1)[0]
+                trend = _linear_slope(values)
                 trend_direction = 'increasing' if trend > 0 else 'decreasing'
             else:
                 trend_direction = 'unknown'
@@ -239,5 +420,5 @@ class AnomalyDetector:
             'has_drift': len(drift_signals) > 0,
             'drift_signals': drift_signals,
             'window_days': window_days,
-            'data_points_analyzed': len(data)
+            'data_points_analyzed': len(rows)
         }
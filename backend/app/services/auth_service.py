@@ -3,14 +3,102 @@ Authentication Service for Pulse AI
 Handles API key validation and user authentication
 """
 
+import os
 import secrets
 import hashlib
+import hmac
+import threading
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from cachetools import TTLCache
+from sqlalchemy import bindparam, func, update
 from sqlalchemy.orm import Session
 
 from app.models.user import User
 from app.models.api_key import APIKey, DeviceRegistration
+from app.services.user_cache import get_user_cached
+
+KEY_PREFIX_LENGTH = 16
+
+# Development/demo only: accept keys of the form "pulseai_{user_id}_..." that
+# were never issued, for the user id they name. Off unless explicitly enabled.
+ALLOW_DEV_API_KEYS = os.getenv("ALLOW_DEV_API_KEYS", "").lower() in ("1", "true", "yes")
+
+# API key usage is accumulated in memory and written in batches by
+# flush_api_key_usage(), so validation does not issue an UPDATE per request.
+# Maps key id -> [request count, last used at]
+_pending_usage: Dict[int, List] = {}
+_pending_usage_lock = threading.Lock()
+
+
+class APIKeyIdentity(NamedTuple):
+    """What a validated API key resolves to"""
+    key_id: Optional[int]
+    user_id: int
+    email: str
+    name: str
+    expires_at: Optional[datetime]
+
+
+# Validated keys by SHA-256 digest; revoke_api_key() evicts entries
+_identity_cache: TTLCache = TTLCache(maxsize=50_000, ttl=60)
+_identity_cache_lock = threading.Lock()
+
+
+def get_key_prefix(raw_key: str) -> str:
+    """
+    Non-secret lookup id for an API key: the first characters of the random
+    part of "pulseai_{user_id}_{secret}" (or of the raw key for other formats)
+    """
+    if raw_key.startswith("pulseai_"):
+        parts = raw_key.split("_", 2)
+        if len(parts) == 3:
+            return parts[2][:KEY_PREFIX_LENGTH]
+    return raw_key[:KEY_PREFIX_LENGTH]
+
+
+def hash_api_key(raw_key: str) -> bytes:
+    """Raw 32-byte SHA-256 digest stored for an API key"""
+    return hashlib.sha256(raw_key.encode()).digest()
+
+
+def record_api_key_usage(key_id: int) -> None:
+    """Count one use of an API key; persisted on the next flush"""
+    now = datetime.utcnow()
+    with _pending_usage_lock:
+        usage = _pending_usage.setdefault(key_id, [0, now])
+        usage[0] += 1
+        usage[1] = now
+
+
+def flush_api_key_usage(db: Session) -> int:
+    """
+    Write accumulated usage counters to api_keys.
+    Returns the number of keys updated.
+    """
+    global _pending_usage
+    with _pending_usage_lock:
+        pending, _pending_usage = _pending_usage, {}
+    
+    if not pending:
+        return 0
+    
+    # One statement executed for every key (executemany) in a single transaction
+    api_keys = APIKey.__table__
+    db.execute(
+        update(api_keys)
+        .where(api_keys.c.id == bindparam("key_id"))
+        .values(
+            request_count=func.coalesce(api_keys.c.request_count, 0) + bindparam("count"),
+            last_used_at=bindparam("used_at")
+        ),
+        [
+            {"key_id": key_id, "count": count, "used_at": last_used_at}
+            for key_id, (count, last_used_at) in pending.items()
+        ]
+    )
+    db.commit()
+    return len(pending)
 
 
 class AuthService:
@@ -24,15 +112,19 @@ class AuthService:
         user_id: int,
         name: Optional[str] = None,
         device_id: Optional[str] = None,
-        expires_in_days: Optional[int] = None
+        expires_in_days: Optional[int] = None,
+        commit: bool = True
     ) -> Tuple[str, APIKey]:
         """
         Generate a new API key for a user
         
+        Pass commit=False to leave the key flushed but uncommitted so the
+        caller can write it in the same transaction as other rows
+        
         Returns:
             Tuple of (raw_key, APIKey object)
         """
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = self.db.get(User, user_id)
         if not user:
             raise ValueError("User not found")
         
@@ -40,7 +132,7 @@ class AuthService:
         raw_key = f"pulseai_{user_id}_{secrets.token_urlsafe(32)}"
         
         # Hash the key for storage (we only store the hash)
-        key_hash = hashlib.sha256(raw_key.encode()).hexdigest()
+        key_hash = hash_api_key(raw_key)
         
         # Calculate expiration if specified
         expires_at = None
@@ -51,6 +143,7 @@ class AuthService:
         api_key = APIKey(
             user_id=user_id,
             key=key_hash,
+            key_prefix=get_key_prefix(raw_key),
             name=name or f"API Key for {user.name}",
             device_id=device_id,
             expires_at=expires_at,
@@ -58,65 +151,159 @@ class AuthService:
         )
         
         self.db.add(api_key)
-        self.db.commit()
-        self.db.refresh(api_key)
+        self.db.flush()
+        if commit:
+            # Detach so the flushed values survive the commit without a refresh SELECT
+            self.db.expunge(api_key)
+            self.db.commit()
         
         return raw_key, api_key
     
-    def validate_api_key(self, raw_key: str) -> Optional[User]:
+    def _find_api_key(self, raw_key: str, key_hash: bytes):
         """
-        Validate an API key and return the associated user
+        Active key matching the raw key, joined with its user's identity
+        columns so one round-trip covers both, or None
+        """
+        query = self.db.query(
+            APIKey.id,
+            APIKey.user_id,
+            APIKey.key,
+            APIKey.expires_at,
+            User.email,
+            User.name.label("user_name"),
+            User.is_active.label("user_is_active")
+        ).join(User, User.id == APIKey.user_id)
         
-        Returns:
-            User object if valid, None otherwise
+        # Look up candidates by the short indexed prefix, then verify the
+        # full hash in constant time
+        candidates = query.filter(
+            APIKey.key_prefix == get_key_prefix(raw_key),
+            APIKey.is_active == True
+        ).all()
+        api_key = next(
+            (c for c in candidates if hmac.compare_digest(c.key, key_hash)),
+            None
+        )
+        
+        if api_key is None:
+            # Keys issued before key_prefix existed are matched by hash
+            api_key = query.filter(
+                APIKey.key == key_hash,
+                APIKey.key_prefix.is_(None),
+                APIKey.is_active == True
+            ).first()
+        
+        return api_key
+    
+    def _is_issued_key(self, raw_key: str, key_hash: bytes) -> bool:
+        """Whether any stored key, active or not, shares this key's prefix or hash"""
+        return self.db.query(
+            self.db.query(APIKey).filter(
+                (APIKey.key_prefix == get_key_prefix(raw_key)) | (APIKey.key == key_hash)
+            ).exists()
+        ).scalar()
+    
+    def _dev_key_user_id(self, raw_key: str, key_hash: bytes) -> Optional[int]:
         """
-        if not raw_key:
+        For development/demo, with ALLOW_DEV_API_KEYS set: a key starting with
+        "pulseai_" is accepted for the user id that follows the prefix, unless
+        it matches a stored key (so revoked and expired keys stay rejected)
+        """
+        if not ALLOW_DEV_API_KEYS or self._is_issued_key(raw_key, key_hash):
             return None
-        
-        # For development/demo: accept any key starting with "pulseai_"
-        # and extract user_id from it
         if raw_key.startswith("pulseai_"):
             parts = raw_key.split("_")
             if len(parts) >= 2:
                 try:
-                    user_id = int(parts[1])
-                    user = self.db.query(User).filter(
-                        User.id == user_id,
-                        User.is_active == True
-                    ).first()
-                    if user:
-                        return user
-                except (ValueError, IndexError):
+                    return int(parts[1])
+                except ValueError:
                     pass
+        return None
+    
+    def _authenticate(self, raw_key: str, key_hash: bytes) -> Optional[APIKeyIdentity]:
+        """
+        Match a raw key against the active stored keys, falling back to the
+        dev key format when enabled. Returns None when the key is unknown,
+        revoked or expired or its user is inactive.
+        """
+        api_key = self._find_api_key(raw_key, key_hash)
         
-        # Hash the key for lookup
-        key_hash = hashlib.sha256(raw_key.encode()).hexdigest()
+        if api_key:
+            # Check expiration
+            if api_key.expires_at and api_key.expires_at < datetime.utcnow():
+                return None
+            
+            if not api_key.user_is_active:
+                return None
+            
+            # Usage stats are batched; see flush_api_key_usage()
+            record_api_key_usage(api_key.id)
+            return APIKeyIdentity(
+                key_id=api_key.id,
+                user_id=api_key.user_id,
+                email=api_key.email,
+                name=api_key.user_name,
+                expires_at=api_key.expires_at
+            )
         
-        # Find the API key
-        api_key = self.db.query(APIKey).filter(
-            APIKey.key == key_hash,
-            APIKey.is_active == True
-        ).first()
-        
-        if not api_key:
+        user_id = self._dev_key_user_id(raw_key, key_hash)
+        user = get_user_cached(self.db, user_id) if user_id is not None else None
+        if not user or not user.is_active:
             return None
+        return APIKeyIdentity(
+            key_id=None,
+            user_id=user.id,
+            email=user.email,
+            name=user.name,
+            expires_at=None
+        )
+    
+    def validate_api_key(self, raw_key: str) -> Optional[User]:
+        """
+        Validate an API key and return the associated user
         
-        # Check expiration
-        if api_key.expires_at and api_key.expires_at < datetime.utcnow():
+        Returns:
+            User object if valid, None otherwise
+        """
+        if not raw_key:
             return None
         
-        # Update usage stats
-        api_key.last_used_at = datetime.utcnow()
-        api_key.request_count += 1
-        self.db.commit()
+        identity = self._authenticate(raw_key, hash_api_key(raw_key))
+        if identity is None:
+            return None
         
-        # Get user
-        user = self.db.query(User).filter(
-            User.id == api_key.user_id,
+        return self.db.query(User).filter(
+            User.id == identity.user_id,
             User.is_active == True
         ).first()
+    
+    def resolve_api_key(self, raw_key: str) -> Optional[APIKeyIdentity]:
+        """
+        Validate an API key, serving repeat lookups from a short-lived
+        in-process cache so hot keys skip the database
+        """
+        if not raw_key:
+            return None
+        
+        key_hash = hash_api_key(raw_key)
+        with _identity_cache_lock:
+            identity = _identity_cache.get(key_hash)
         
-        return user
+        if identity is not None:
+            if identity.expires_at and identity.expires_at < datetime.utcnow():
+                return None
+            if identity.key_id is not None:
+                record_api_key_usage(identity.key_id)
+            return identity
+        
+        identity = self._authenticate(raw_key, key_hash)
+        if identity is None:
+            return None
+        
+        with _identity_cache_lock:
+            _identity_cache[key_hash] = identity
+        
+        return identity
     
     def revoke_api_key(self, key_id: int) -> bool:
         """Revoke an API key"""
@@ -126,11 +313,23 @@ class AuthService:
         
         api_key.is_active = False
         self.db.commit()
+        
+        with _identity_cache_lock:
+            _identity_cache.pop(api_key.key, None)
         return True
     
     def get_user_api_keys(self, user_id: int) -> list:
-        """Get all API keys for a user"""
-        return self.db.query(APIKey).filter(
+        """Get all API keys for a user (only the columns needed for listing)"""
+        return self.db.query(
+            APIKey.id,
+            APIKey.name,
+            APIKey.device_id,
+            APIKey.created_at,
+            APIKey.last_used_at,
+            APIKey.expires_at,
+            APIKey.is_active,
+            APIKey.request_count
+        ).filter(
             APIKey.user_id == user_id
         ).all()
     
@@ -139,10 +338,11 @@ class AuthService:
         user_id: int,
         device_id: str,
         device_name: Optional[str] = None,
-        device_type: str = "android"
+        device_type: str = "android",
+        commit: bool = True
     ) -> DeviceRegistration:
         """Register a new device for a user"""
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = self.db.get(User, user_id)
         if not user:
             raise ValueError("User not found")
         
@@ -157,7 +357,10 @@ class AuthService:
             existing.device_name = device_name or existing.device_name
             existing.device_type = device_type
             existing.is_active = True
-            self.db.commit()
+            self.db.flush()
+            if commit:
+                self.db.expunge(existing)
+                self.db.commit()
             return existing
         
         # Create new registration
@@ -170,8 +373,10 @@ class AuthService:
         )
         
         self.db.add(device)
-        self.db.commit()
-        self.db.refresh(device)
+        self.db.flush()
+        if commit:
+            self.db.expunge(device)
+            self.db.commit()
         
         return device
     
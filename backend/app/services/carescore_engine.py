@@ -3,7 +3,6 @@ CareScore Engine for Pulse AI
 Implements the CareScore calculation algorithm
 """
 
-import json
 import numpy as np
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
@@ -12,6 +11,7 @@ from sqlalchemy.orm import Session
 from app.models.user import User
 from app.models.health_data import HealthData
 from app.models.care_score import CareScore
+from app.services.response_cache import carescore_cache
 
 
 class CareScoreEngine:
@@ -263,14 +263,19 @@ class CareScoreEngine:
             drift_score=drift_score,
             confidence_score=confidence,
             stability_score=stability,
-            contributing_signals=json.dumps(deviations),
+            contributing_signals=deviations,
             explanation=explanation,
             status=status
         )
         
+        # Flush populates id and any server defaults from the INSERT itself;
+        # detaching before commit keeps those values instead of expiring them,
+        # so callers can read the record without a refresh SELECT
         self.db.add(care_score_record)
+        self.db.flush()
+        self.db.expunge(care_score_record)
         self.db.commit()
-        self.db.refresh(care_score_record)
+        carescore_cache.invalidate(user_id)
         
         # Trigger notifications if necessary
         # Only notify for moderate or high risk
@@ -288,20 +293,19 @@ class CareScoreEngine:
         """Get historical standard deviation for each signal"""
         cutoff = datetime.utcnow() - timedelta(days=days)
         
-        data = self.db.query(HealthData).filter(
+        signals = ['heart_rate', 'hrv', 'sleep_duration', 'activity_level', 
+                   'breathing_rate', 'bp_systolic', 'bp_diastolic', 'blood_sugar']
+        
+        # Only the signal columns, as plain tuples (no ORM objects)
+        rows = self.db.query(*[getattr(HealthData, signal) for signal in signals]).filter(
             HealthData.user_id == user_id,
             HealthData.timestamp >= cutoff
         ).all()
         
-        if not data:
-            return {}
-        
-        signals = ['heart_rate', 'hrv', 'sleep_duration', 'activity_level', 
-                   'breathing_rate', 'bp_systolic', 'bp_diastolic', 'blood_sugar']
-        
+        # One pass transposes the rows into per-signal columns
         std_devs = {}
-        for signal in signals:
-            values = [getattr(d, signal) for d in data if getattr(d, signal) is not None]
+        for signal, column in zip(signals, zip(*rows)):
+            values = [value for value in column if value is not None]
             if values:
                 std_devs[signal] = float(np.std(values))
         
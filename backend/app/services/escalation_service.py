@@ -3,10 +3,11 @@ Escalation Service for Pulse AI
 Implements smart escalation logic without diagnosis
 """
 
-import json
+import bisect
+import numpy as np
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer
 
 from app.models.user import User
 from app.models.care_score import CareScore, Escalation
@@ -46,6 +47,36 @@ class EscalationService:
         }
     }
     
+    LEVEL_MESSAGES = {
+        1: (
+            "We've noticed some changes in your health data. "
+            "Your body might be adapting to new conditions or activities. "
+            "Continue monitoring and take note of how you feel."
+        ),
+        2: (
+            "Your recent health readings show patterns that differ from your usual baseline. "
+            "This doesn't mean something is wrong, but it's worth paying attention to. "
+            "Consider reviewing your recent activities, sleep, and stress levels."
+        ),
+        3: (
+            "Your health data shows sustained changes that may benefit from "
+            "professional evaluation. We recommend consulting with a healthcare "
+            "provider to review these patterns. This is not a diagnosis - your "
+            "doctor can help determine if any action is needed."
+        )
+    }
+    
+    RECOMMENDATIONS = {
+        'stable': "Continue your current health routine.",
+        'mild': "Monitor your health signals and note any changes in how you feel.",
+        'moderate': "Consider reviewing recent lifestyle changes and monitor closely.",
+        'high': "We recommend scheduling a check-in with your healthcare provider."
+    }
+    
+    # Entry thresholds of levels 1..3 in ascending order; the number of
+    # thresholds a score reaches is its level
+    _LEVEL_THRESHOLDS = tuple(config['threshold'] for _, config in sorted(ESCALATION_LEVELS.items()))
+    
     def __init__(self, db: Session):
         self.db = db
     
@@ -73,15 +104,49 @@ class EscalationService:
         
         return escalation
     
+    def check_escalations_bulk(
+        self,
+        care_scores: List[CareScore],
+        hours: int = 24
+    ) -> List[Escalation]:
+        """
+        check_escalation for many users at once, e.g. a periodic sweep over
+        each user's latest CareScore. Recent escalations of the whole batch
+        are read in one query and new ones are written in one commit.
+        Returns the escalations created.
+        """
+        if not care_scores:
+            return []
+        
+        levels = np.searchsorted(
+            self._LEVEL_THRESHOLDS,
+            [care_score.care_score for care_score in care_scores],
+            side='right'
+        ).tolist()
+        
+        cutoff = datetime.utcnow() - timedelta(hours=hours)
+        recent = set(self.db.query(Escalation.user_id, Escalation.level).filter(
+            Escalation.user_id.in_({care_score.user_id for care_score in care_scores}),
+            Escalation.timestamp >= cutoff
+        ).distinct().all())
+        
+        escalations = []
+        for care_score, level in zip(care_scores, levels):
+            key = (care_score.user_id, level)
+            if level == 0 or key in recent:
+                continue
+            recent.add(key)  # One escalation per user and level per batch
+            escalations.append(self._build_escalation(care_score.user_id, care_score, level))
+        
+        if escalations:
+            self.db.add_all(escalations)
+            self.db.commit()
+        
+        return escalations
+    
     def _determine_level(self, score: float) -> int:
         """Determine escalation level from CareScore"""
-        if score >= self.ESCALATION_LEVELS[3]['threshold']:
-            return 3
-        elif score >= self.ESCALATION_LEVELS[2]['threshold']:
-            return 2
-        elif score >= self.ESCALATION_LEVELS[1]['threshold']:
-            return 1
-        return 0
+        return bisect.bisect_right(self._LEVEL_THRESHOLDS, score)
     
     def _has_recent_escalation(
         self, 
@@ -92,13 +157,15 @@ class EscalationService:
         """Check if user has received this escalation level recently"""
         cutoff = datetime.utcnow() - timedelta(hours=hours)
         
-        recent = self.db.query(Escalation).filter(
-            Escalation.user_id == user_id,
-            Escalation.level == level,
-            Escalation.timestamp >= cutoff
-        ).first()
-        
-        return recent is not None
+        # EXISTS over (user_id, level, timestamp) is answered from the index
+        # without reading the escalation row itself
+        return self.db.query(
+            self.db.query(Escalation).filter(
+                Escalation.user_id == user_id,
+                Escalation.level == level,
+                Escalation.timestamp >= cutoff
+            ).exists()
+        ).scalar()
     
     def _create_escalation(
         self, 
@@ -107,6 +174,21 @@ class EscalationService:
         level: int
     ) -> Escalation:
         """Create escalation record"""
+        escalation = self._build_escalation(user_id, care_score, level)
+        
+        self.db.add(escalation)
+        self.db.commit()
+        self.db.refresh(escalation)
+        
+        return escalation
+    
+    def _build_escalation(
+        self,
+        user_id: int,
+        care_score: CareScore,
+        level: int
+    ) -> Escalation:
+        """Escalation record for a level, not yet added to the session"""
         level_config = self.ESCALATION_LEVELS[level]
         
         # Generate message based on level
@@ -121,45 +203,18 @@ class EscalationService:
             care_score_id=care_score.id,
             title=level_config['title'],
             message=message,
-            health_summary=json.dumps(health_summary)
+            health_summary=health_summary
         )
         
-        self.db.add(escalation)
-        self.db.commit()
-        self.db.refresh(escalation)
-        
         return escalation
     
     def _generate_message(self, level: int, care_score: CareScore) -> str:
         """Generate appropriate message based on escalation level"""
-        
-        if level == 1:
-            return (
-                "We've noticed some changes in your health data. "
-                "Your body might be adapting to new conditions or activities. "
-                "Continue monitoring and take note of how you feel."
-            )
-        
-        elif level == 2:
-            return (
-                "Your recent health readings show patterns that differ from your usual baseline. "
-                "This doesn't mean something is wrong, but it's worth paying attention to. "
-                "Consider reviewing your recent activities, sleep, and stress levels."
-            )
-        
-        elif level == 3:
-            return (
-                "Your health data shows sustained changes that may benefit from "
-                "professional evaluation. We recommend consulting with a healthcare "
-                "provider to review these patterns. This is not a diagnosis - your "
-                "doctor can help determine if any action is needed."
-            )
-        
-        return "Health monitoring update available."
+        return self.LEVEL_MESSAGES.get(level, "Health monitoring update available.")
     
     def _generate_health_summary(self, care_score: CareScore) -> Dict:
         """Generate health summary for escalation"""
-        contributing = json.loads(care_score.contributing_signals) if care_score.contributing_signals else []
+        contributing = care_score.contributing_signals or []
         
         summary = {
             'care_score': care_score.care_score,
@@ -184,13 +239,7 @@ class EscalationService:
     
     def _get_recommendation(self, status: str) -> str:
         """Get recommendation based on status"""
-        recommendations = {
-            'stable': "Continue your current health routine.",
-            'mild': "Monitor your health signals and note any changes in how you feel.",
-            'moderate': "Consider reviewing recent lifestyle changes and monitor closely.",
-            'high': "We recommend scheduling a check-in with your healthcare provider."
-        }
-        return recommendations.get(status, recommendations['stable'])
+        return self.RECOMMENDATIONS.get(status, self.RECOMMENDATIONS['stable'])
     
     def get_user_escalations(
         self, 
@@ -199,7 +248,10 @@ class EscalationService:
         include_acknowledged: bool = False
     ) -> List[Escalation]:
         """Get recent escalations for a user"""
-        query = self.db.query(Escalation).filter(Escalation.user_id == user_id)
+        # Listings never show the health summary, so leave the JSON unloaded
+        query = self.db.query(Escalation).options(
+            defer(Escalation.health_summary)
+        ).filter(Escalation.user_id == user_id)
         
         if not include_acknowledged:
             query = query.filter(Escalation.acknowledged == 0)
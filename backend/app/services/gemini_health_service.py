@@ -4,11 +4,20 @@ Generates conservative, lifestyle-oriented health guidance based on CareScore
 """
 
 import os
+import re
+import json
+import asyncio
 import logging
-from typing import List, Optional
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 import google.generativeai as genai
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
+from app.database import SessionLocal
+from app.models.suggestion_cache import SuggestionCacheEntry
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -18,21 +27,48 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 
+# Suggestions kept from one Gemini reply
+MAX_SUGGESTIONS = 5
 
-class HealthSuggestionsService:
-    """Service to generate health suggestions using Gemini AI"""
-    
-    def __init__(self):
-        self.model = None
-        if GEMINI_API_KEY:
-            try:
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-            except Exception as e:
-                logger.error(f"Failed to initialize Gemini model: {e}")
-    
-    def _get_system_prompt(self) -> str:
-        """Base system prompt for health suggestions"""
-        return """You are a wellness advisor providing general lifestyle suggestions. 
+# Characters of a Gemini reply parsed at most. Replies are capped at 500
+# output tokens, so this only cuts off malformed or runaway responses.
+MAX_RESPONSE_CHARS = 8192
+
+# Leading bullet or list number of a response line, and lines that are
+# disclaimer text rather than suggestions (see _parse_line)
+_BULLET_RE = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s*')
+_SKIP_LINE_RE = re.compile(r'disclaimer|consult', re.IGNORECASE)
+
+# Gemini model shared by every HealthSuggestionsService (see _get_model)
+_model = None
+_model_lock = threading.Lock()
+
+# Gemini suggestions by bucketed prompt inputs (see _suggestion_key). Nearby
+# scores and metrics get the same general wellness advice, so requests that
+# land in the same buckets reuse one generation instead of calling the API.
+# Generations are also persisted to suggestion_cache, so a restarted or
+# different worker reuses them too.
+SUGGESTION_TTL_SECONDS = 6 * 3600
+_suggestion_cache = TTLCache(maxsize=4096, ttl=SUGGESTION_TTL_SECONDS)
+_suggestion_cache_lock = threading.Lock()
+
+# Generations in progress by cache key, so concurrent misses on the same key
+# wait for one Gemini call instead of each making their own
+_suggestion_in_flight: Dict[Tuple, asyncio.Task] = {}
+
+# Bucket width per recent metric when matching cached suggestions
+_METRIC_BUCKETS = {
+    'heart_rate': 5,        # bpm
+    'hrv': 5,               # ms
+    'sleep_duration': 0.5,  # hours
+    'activity_level': 1000  # steps
+}
+
+# Disclaimer attached to every suggestions response and required in Gemini's reply
+_DISCLAIMER = "These are general wellness suggestions only and do not constitute medical advice. Consult your healthcare provider for personalized guidance."
+
+# Base system prompt for health suggestions
+_SYSTEM_PROMPT = f"""You are a wellness advisor providing general lifestyle suggestions. 
         
 CRITICAL RULES:
 1. You are NOT a doctor and cannot provide medical advice or diagnoses
@@ -44,7 +80,185 @@ CRITICAL RULES:
 7. Be encouraging and supportive in tone
 8. Keep responses concise (3-5 suggestions max)
 
-DISCLAIMER you must include: These are general wellness suggestions only and do not constitute medical advice. Consult your healthcare provider for personalized guidance."""
+DISCLAIMER you must include: {_DISCLAIMER}"""
+
+# Fallback suggestions by minimum CareScore, highest band first; scores
+# below every band get the last one
+_FALLBACK_BANDS = (
+    (70, (
+        "Take time to rest and prioritize sleep tonight",
+        "Stay hydrated - aim for 8 glasses of water today",
+        "Consider some gentle stretching or deep breathing exercises",
+        "Reduce caffeine and alcohol intake temporarily",
+        "Reach out to your healthcare provider if you feel unwell"
+    )),
+    (50, (
+        "Ensure you're getting adequate sleep (7-9 hours)",
+        "Take short breaks throughout the day to rest",
+        "Stay hydrated with water and herbal teas",
+        "Try a 10-minute walk or light stretching",
+        "Practice deep breathing when feeling stressed"
+    )),
+    (30, (
+        "Maintain your regular sleep schedule",
+        "Continue staying active with moderate exercise",
+        "Keep hydration levels consistent",
+        "Monitor how you're feeling throughout the day"
+    )),
+    (0, (
+        "Keep up your healthy habits",
+        "Stay consistent with your sleep and activity routines",
+        "Continue monitoring your health metrics"
+    ))
+)
+
+# Recent metrics included in the prompt: (key, label, unit)
+_PROMPT_METRICS = (
+    ('heart_rate', 'Heart Rate', 'bpm'),
+    ('hrv', 'Heart Rate Variability', 'ms'),
+    ('sleep_duration', 'Sleep Duration', 'hours'),
+    ('activity_level', 'Activity Level', 'steps')
+)
+
+_PROMPT_INSTRUCTIONS = """
+Based on this health status, provide 3-5 specific, actionable wellness suggestions. 
+Format each suggestion as a short, clear sentence.
+Focus on hydration, rest, gentle activity, and stress management.
+"""
+
+
+def _get_model() -> Optional["genai.GenerativeModel"]:
+    """Shared Gemini model handle, created on first use; None without an API key"""
+    global _model
+    if _model is None and GEMINI_API_KEY:
+        with _model_lock:
+            if _model is None:
+                try:
+                    _model = genai.GenerativeModel('gemini-1.5-flash')
+                except Exception as e:
+                    logger.error(f"Failed to initialize Gemini model: {e}")
+    return _model
+
+
+def _parse_line(line: str) -> Optional[str]:
+    """Suggestion text of one response line, or None for disclaimers and fragments"""
+    # Skip disclaimer text
+    if _SKIP_LINE_RE.search(line):
+        return None
+    # Remove bullet points or numbers
+    line = _BULLET_RE.sub('', line, count=1).strip()
+    return line if len(line) > 10 else None  # Ensure it's a meaningful suggestion
+
+
+def _load_persisted_suggestions(key: Tuple) -> Optional[List[str]]:
+    """Suggestions persisted for key within the TTL, or None"""
+    cutoff = datetime.utcnow() - timedelta(seconds=SUGGESTION_TTL_SECONDS)
+    db = SessionLocal()
+    try:
+        row = db.query(SuggestionCacheEntry.suggestions).filter(
+            SuggestionCacheEntry.key == json.dumps(key),
+            SuggestionCacheEntry.created_at >= cutoff
+        ).first()
+        return row.suggestions if row else None
+    except Exception as e:
+        logger.warning(f"Failed to load persisted suggestions: {e}")
+        return None
+    finally:
+        db.close()
+
+
+def _persist_suggestions(key: Tuple, suggestions: List[str]) -> None:
+    """
+    Store suggestions for key, replacing any older entry. Expired entries are
+    swept in the same transaction; this only runs after a Gemini generation,
+    so the extra DELETE is rare and cheap next to the API call.
+    """
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.query(SuggestionCacheEntry).filter(
+            SuggestionCacheEntry.created_at < now - timedelta(seconds=SUGGESTION_TTL_SECONDS)
+        ).delete(synchronize_session=False)
+        db.merge(SuggestionCacheEntry(key=json.dumps(key), suggestions=suggestions, created_at=now))
+        db.commit()
+    except Exception as e:
+        logger.warning(f"Failed to persist suggestions: {e}")
+    finally:
+        db.close()
+
+
+class _SuggestionStream:
+    """
+    Parses suggestions line by line from streamed chunks of a Gemini reply,
+    reading at most MAX_RESPONSE_CHARS of it
+    """
+    
+    def __init__(self, max_suggestions: int = MAX_SUGGESTIONS):
+        self.max_suggestions = max_suggestions
+        self.suggestions: List[str] = []
+        self._partial = ''
+        self._remaining = MAX_RESPONSE_CHARS
+    
+    def feed(self, text: str) -> bool:
+        """
+        Parse the complete lines received so far; True once enough
+        suggestions are in or the character budget is used up
+        """
+        text = text[:self._remaining]
+        self._remaining -= len(text)
+        
+        # Walk the lines in place rather than splitting the whole buffer
+        buffer = self._partial + text
+        start = 0
+        while True:
+            end = buffer.find('\n', start)
+            if end == -1:
+                break
+            if self._add(buffer[start:end]):
+                return True
+            start = end + 1
+        
+        self._partial = buffer[start:]
+        return self._remaining <= 0
+    
+    def finish(self) -> List[str]:
+        """Parse the unterminated last line, if still needed, and return the suggestions"""
+        if len(self.suggestions) < self.max_suggestions:
+            self._add(self._partial)
+        return self.suggestions
+    
+    def _add(self, line: str) -> bool:
+        suggestion = _parse_line(line)
+        if suggestion:
+            self.suggestions.append(suggestion)
+        return len(self.suggestions) >= self.max_suggestions
+
+
+def _suggestion_key(
+    care_score: float,
+    status: str,
+    contributing_factors: Optional[List[str]],
+    recent_metrics: Optional[dict]
+) -> Tuple:
+    """Cache key: 5-point score band, status, factors and bucketed metrics"""
+    metrics = tuple(
+        int(recent_metrics[name] // width) if recent_metrics and recent_metrics.get(name) else None
+        for name, width in _METRIC_BUCKETS.items()
+    )
+    return (
+        int(care_score // 5),
+        status,
+        tuple(sorted(contributing_factors or ())),
+        metrics
+    )
+
+
+class HealthSuggestionsService:
+    """Service to generate health suggestions using Gemini AI"""
+    
+    def __init__(self):
+        self.model = _get_model()
+        self.timeout = 30.0  # Upper bound on one Gemini generation, in seconds
     
     def generate_suggestions(
         self,
@@ -70,34 +284,129 @@ DISCLAIMER you must include: These are general wellness suggestions only and do
         if not self.model:
             return self._get_fallback_suggestions(care_score, status)
         
+        key = _suggestion_key(care_score, status, contributing_factors, recent_metrics)
+        with _suggestion_cache_lock:
+            suggestions = _suggestion_cache.get(key)
+        if suggestions is not None:
+            return self._build_result(suggestions, care_score, status)
+        
         try:
             # Build the prompt
             prompt = self._build_prompt(care_score, status, contributing_factors, recent_metrics)
             
-            # Generate response
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=500,
-                    temperature=0.3  # Lower temperature for more consistent, safe responses
+            suggestions = _load_persisted_suggestions(key)
+            if suggestions is None:
+                # Stream the response and stop once enough suggestions are parsed
+                response = self.model.generate_content(
+                    prompt,
+                    stream=True,
+                    generation_config=self._generation_config()
                 )
-            )
+                
+                parser = _SuggestionStream()
+                for chunk in response:
+                    if parser.feed(chunk.text):
+                        break
+                
+                suggestions = parser.finish()
+                if suggestions:
+                    _persist_suggestions(key, suggestions)
             
-            # Parse and return suggestions
-            suggestions = self._parse_response(response.text)
+            return self._build_result(self._remember(key, suggestions), care_score, status)
             
-            return {
-                "suggestions": suggestions,
-                "status": status,
-                "care_score": care_score,
-                "disclaimer": "These are general wellness suggestions only and do not constitute medical advice. Consult your healthcare provider for personalized guidance.",
-                "source": "gemini"
-            }
+        except Exception as e:
+            logger.error(f"Gemini API error: {e}")
+            return self._get_fallback_suggestions(care_score, status)
+    
+    async def generate_suggestions_async(
+        self,
+        care_score: int,
+        status: str,
+        contributing_factors: Optional[List[str]] = None,
+        recent_metrics: Optional[dict] = None
+    ) -> dict:
+        """
+        Non-blocking variant of generate_suggestions() for async endpoints,
+        so the Gemini round-trip does not hold a worker thread
+        """
+        if not self.model:
+            return self._get_fallback_suggestions(care_score, status)
+        
+        key = _suggestion_key(care_score, status, contributing_factors, recent_metrics)
+        with _suggestion_cache_lock:
+            suggestions = _suggestion_cache.get(key)
+        if suggestions is not None:
+            return self._build_result(suggestions, care_score, status)
+        
+        try:
+            task = _suggestion_in_flight.get(key)
+            if task is None:
+                prompt = self._build_prompt(care_score, status, contributing_factors, recent_metrics)
+                task = asyncio.ensure_future(self._generate_async(key, prompt))
+                _suggestion_in_flight[key] = task
+                task.add_done_callback(lambda _: _suggestion_in_flight.pop(key, None))
+            
+            # Shielded so one caller going away does not cancel it for the others
+            suggestions = await asyncio.shield(task)
+            return self._build_result(suggestions, care_score, status)
             
         except Exception as e:
             logger.error(f"Gemini API error: {e}")
             return self._get_fallback_suggestions(care_score, status)
     
+    async def _generate_async(self, key: Tuple, prompt: str) -> List[str]:
+        """
+        Suggestions for one prompt, persisted ones if still fresh, otherwise
+        generated and persisted; cached in memory under key either way
+        """
+        suggestions = await asyncio.to_thread(_load_persisted_suggestions, key)
+        if suggestions is None:
+            # Bounded so a stalled generation falls back instead of hanging the request
+            suggestions = await asyncio.wait_for(self._stream_suggestions(prompt), timeout=self.timeout)
+            if suggestions:
+                await asyncio.to_thread(_persist_suggestions, key, suggestions)
+        return self._remember(key, suggestions)
+    
+    async def _stream_suggestions(self, prompt: str) -> List[str]:
+        """
+        Stream Gemini's reply and stop reading once MAX_SUGGESTIONS are
+        parsed, rather than waiting for the whole generation
+        """
+        response = await self.model.generate_content_async(
+            prompt,
+            stream=True,
+            generation_config=self._generation_config()
+        )
+        
+        parser = _SuggestionStream()
+        async for chunk in response:
+            if parser.feed(chunk.text):
+                break
+        return parser.finish()
+    
+    def _generation_config(self):
+        return genai.types.GenerationConfig(
+            max_output_tokens=500,
+            temperature=0.3  # Lower temperature for more consistent, safe responses
+        )
+    
+    def _remember(self, key: Tuple, suggestions: List[str]) -> List[str]:
+        """Cache parsed suggestions unless Gemini's reply had none"""
+        if suggestions:
+            with _suggestion_cache_lock:
+                _suggestion_cache[key] = suggestions
+        return suggestions
+    
+    def _build_result(self, suggestions: List[str], care_score: int, status: str) -> dict:
+        """Suggestions response for Gemini's parsed suggestions"""
+        return {
+            "suggestions": list(suggestions),
+            "status": status,
+            "care_score": care_score,
+            "disclaimer": _DISCLAIMER,
+            "source": "gemini"
+        }
+    
     def _build_prompt(
         self,
         care_score: int,
@@ -106,110 +415,63 @@ DISCLAIMER you must include: These are general wellness suggestions only and do
         recent_metrics: Optional[dict]
     ) -> str:
         """Build the prompt for Gemini"""
-        
-        prompt = f"""
-{self._get_system_prompt()}
+        parts = [
+            f"""
+{_SYSTEM_PROMPT}
 
 Current Health Status:
 - Health Score: {care_score}/100 (higher = more attention needed)
 - Status: {status}
 """
+        ]
         
         if contributing_factors:
-            prompt += f"- Contributing Factors: {', '.join(contributing_factors)}\n"
+            parts.append(f"- Contributing Factors: {', '.join(contributing_factors)}\n")
         
         if recent_metrics:
-            prompt += "\nRecent Metrics:\n"
-            if recent_metrics.get('heart_rate'):
-                prompt += f"- Heart Rate: {recent_metrics['heart_rate']} bpm\n"
-            if recent_metrics.get('hrv'):
-                prompt += f"- Heart Rate Variability: {recent_metrics['hrv']} ms\n"
-            if recent_metrics.get('sleep_duration'):
-                prompt += f"- Sleep Duration: {recent_metrics['sleep_duration']} hours\n"
-            if recent_metrics.get('activity_level'):
-                prompt += f"- Activity Level: {recent_metrics['activity_level']} steps\n"
-        
-        prompt += """
-Based on this health status, provide 3-5 specific, actionable wellness suggestions. 
-Format each suggestion as a short, clear sentence.
-Focus on hydration, rest, gentle activity, and stress management.
-"""
+            parts.append("\nRecent Metrics:\n")
+            parts.extend(
+                f"- {label}: {recent_metrics[key]} {unit}\n"
+                for key, label, unit in _PROMPT_METRICS
+                if recent_metrics.get(key)
+            )
         
-        return prompt
+        parts.append(_PROMPT_INSTRUCTIONS)
+        return "".join(parts)
     
-    def _parse_response(self, text: str) -> List[str]:
-        """Parse Gemini response into a list of suggestions"""
-        
-        # Split by newlines and filter
-        lines = text.strip().split('\n')
-        suggestions = []
-        
-        for line in lines:
-            line = line.strip()
-            # Skip empty lines or disclaimer text
-            if not line:
-                continue
-            if 'disclaimer' in line.lower() or 'consult' in line.lower():
-                continue
-            # Remove bullet points or numbers
-            if line.startswith(('-', '*', '•')):
-                line = line[1:].strip()
-            elif line[0].isdigit() and (line[1] == '.' or line[1] == ')'):
-                line = line[2:].strip()
-            
-            if line and len(line) > 10:  # Ensure it's a meaningful suggestion
-                suggestions.append(line)
-        
-        return suggestions[:5]  # Limit to 5 suggestions
+    def _parse_response(self, text: str, max_suggestions: int = MAX_SUGGESTIONS) -> List[str]:
+        """Parse a complete Gemini response into a list of suggestions"""
+        parser = _SuggestionStream(max_suggestions)
+        parser.feed(text)
+        return parser.finish()
     
     def _get_fallback_suggestions(self, care_score: int, status: str) -> dict:
         """Provide fallback suggestions when Gemini is unavailable"""
-        
-        if care_score >= 70:
-            suggestions = [
-                "Take time to rest and prioritize sleep tonight",
-                "Stay hydrated - aim for 8 glasses of water today",
-                "Consider some gentle stretching or deep breathing exercises",
-                "Reduce caffeine and alcohol intake temporarily",
-                "Reach out to your healthcare provider if you feel unwell"
-            ]
-        elif care_score >= 50:
-            suggestions = [
-                "Ensure you're getting adequate sleep (7-9 hours)",
-                "Take short breaks throughout the day to rest",
-                "Stay hydrated with water and herbal teas",
-                "Try a 10-minute walk or light stretching",
-                "Practice deep breathing when feeling stressed"
-            ]
-        elif care_score >= 30:
-            suggestions = [
-                "Maintain your regular sleep schedule",
-                "Continue staying active with moderate exercise",
-                "Keep hydration levels consistent",
-                "Monitor how you're feeling throughout the day"
-            ]
-        else:
-            suggestions = [
-                "Keep up your healthy habits",
-                "Stay consistent with your sleep and activity routines",
-                "Continue monitoring your health metrics"
-            ]
+        suggestions = next(
+            (band for threshold, band in _FALLBACK_BANDS if care_score >= threshold),
+            _FALLBACK_BANDS[-1][1]
+        )
         
         return {
-            "suggestions": suggestions,
+            "suggestions": list(suggestions),
             "status": status,
             "care_score": care_score,
-            "disclaimer": "These are general wellness suggestions only and do not constitute medical advice. Consult your healthcare provider for personalized guidance.",
+            "disclaimer": _DISCLAIMER,
             "source": "fallback"
         }
 
 
 # Singleton instance
 _health_suggestions_service = None
+_health_suggestions_service_lock = threading.Lock()
 
 def get_health_suggestions_service() -> HealthSuggestionsService:
     """Get singleton instance of HealthSuggestionsService"""
     global _health_suggestions_service
+    # Checked again under the lock so threadpool requests racing on the
+    # first call construct a single instance
     if _health_suggestions_service is None:
-        _health_suggestions_service = HealthSuggestionsService()
+        with _health_suggestions_service_lock:
+            if _health_suggestions_service is None:
+                _health_suggestions_service = HealthSuggestionsService()
     return _health_suggestions_service
@@ -4,6 +4,7 @@ Proxies requests to the hosted Gemini API
 """
 
 import os
+import asyncio
 import httpx
 from typing import Dict, Optional
 from dotenv import load_dotenv
@@ -19,6 +20,24 @@ class GeminiService:
     def __init__(self):
         self.api_url = os.getenv("GEMINI_API_URL", "http://localhost:8001")
         self.timeout = 30.0
+        # One pooled client for the service's lifetime, so back-to-back calls
+        # reuse kept-alive connections instead of reconnecting every time
+        self._client = httpx.AsyncClient(
+            base_url=self.api_url,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=50,
+                keepalive_expiry=30.0
+            )
+        )
+    
+        # Requests in progress by prompt; identical concurrent prompts share one
+        self._in_flight: Dict[str, asyncio.Task] = {}
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client"""
+        await self._client.aclose()
     
     async def generate(self, prompt: str) -> Dict:
         """
@@ -29,49 +48,58 @@ class GeminiService:
         
         Returns:
             Dict with generated response
+        
+        Concurrent calls with the same prompt are coalesced into a single
+        request and all receive its result.
         """
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.post(
-                    f"{self.api_url}/generate",
-                    json={"text": prompt}
-                )
-                response.raise_for_status()
-                return {
-                    "success": True,
-                    "data": response.json()
-                }
-            except httpx.HTTPStatusError as e:
-                return {
-                    "success": False,
-                    "error": f"HTTP error: {e.response.status_code}",
-                    "detail": str(e)
-                }
-            except httpx.RequestError as e:
-                return {
-                    "success": False,
-                    "error": "Request failed",
-                    "detail": str(e)
-                }
+        task = self._in_flight.get(prompt)
+        if task is None:
+            task = asyncio.ensure_future(self._post_generate(prompt))
+            self._in_flight[prompt] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(prompt, None))
+        
+        # Shielded so one caller going away does not cancel it for the others
+        return await asyncio.shield(task)
+    
+    async def _post_generate(self, prompt: str) -> Dict:
+        """Send one prompt to the Gemini API"""
+        try:
+            response = await self._client.post("/generate", json={"text": prompt})
+            response.raise_for_status()
+            return {
+                "success": True,
+                "data": response.json()
+            }
+        except httpx.HTTPStatusError as e:
+            return {
+                "success": False,
+                "error": f"HTTP error: {e.response.status_code}",
+                "detail": str(e)
+            }
+        except httpx.RequestError as e:
+            return {
+                "success": False,
+                "error": "Request failed",
+                "detail": str(e)
+            }
     
     async def health_check(self) -> Dict:
         """
         Check Gemini API health
         """
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
-                response = await client.get(f"{self.api_url}/health")
-                response.raise_for_status()
-                return {
-                    "status": "healthy",
-                    "gemini_api": "connected"
-                }
-            except Exception as e:
-                return {
-                    "status": "unhealthy",
-                    "gemini_api": "disconnected",
-                    "error": str(e)
-                }
+        try:
+            response = await self._client.get("/health", timeout=10.0)
+            response.raise_for_status()
+            return {
+                "status": "healthy",
+                "gemini_api": "connected"
+            }
+        except Exception as e:
+            return {
+                "status": "unhealthy",
+                "gemini_api": "disconnected",
+                "error": str(e)
+            }
     
     async def generate_health_insight(
         self, 
@@ -109,3 +137,20 @@ class GeminiService:
             return result["data"].get("response", result["data"])
         else:
             return "We're analyzing your health data. Continue monitoring your signals for personalized insights."
+
+
+# Singleton instance
+_gemini_service = None
+
+def get_gemini_service() -> GeminiService:
+    """Get singleton instance of GeminiService"""
+    global _gemini_service
+    if _gemini_service is None:
+        _gemini_service = GeminiService()
+    return _gemini_service
+
+
+async def close_gemini_service() -> None:
+    """Close the singleton's HTTP client, if it was ever created"""
+    if _gemini_service is not None:
+        await _gemini_service.aclose()
@@ -0,0 +1,30 @@
+"""
+Health Trends Service for Pulse AI
+Daily signal averages served from the health_data_daily rollup
+"""
+
+from typing import Dict, List, Optional
+from datetime import datetime
+from sqlalchemy.orm import Session
+
+from app.models.health_daily import HealthDataDaily, ROLLUP_SIGNALS
+
+
+def get_daily_averages(db: Session, user_id: int, since: datetime) -> List[Dict[str, Optional[float]]]:
+    """
+    Average each trend signal per calendar day from the day of `since`,
+    oldest first. Reads one pre-aggregated rollup row per day, found by a
+    primary-key range scan. Zero readings are excluded from the averages.
+    """
+    days = db.query(HealthDataDaily).filter(
+        HealthDataDaily.user_id == user_id,
+        HealthDataDaily.day >= since.date()
+    ).order_by(HealthDataDaily.day).all()
+
+    return [
+        {
+            "date": day.day.isoformat(),
+            **{signal: day.average(signal) for signal in ROLLUP_SIGNALS}
+        }
+        for day in days
+    ]
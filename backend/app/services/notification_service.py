@@ -169,10 +169,16 @@ class NotificationService:
         to_user_id: int,
         from_user_id: int,
         connection_type: str,  # doctor_request, caretaker_invite
-        action: str  # request, accept, reject
+        action: str,  # request, accept, reject
+        from_user: Optional[User] = None
     ):
-        """Send notification about connection status changes"""
-        from_user = self.db.query(User).filter(User.id == from_user_id).first()
+        """
+        Send notification about connection status changes.
+        The notification is only added to the session; the caller commits it
+        together with the connection change.
+        """
+        if from_user is None:
+            from_user = self.db.query(User).filter(User.id == from_user_id).first()
         if not from_user:
             return
         
@@ -205,8 +211,6 @@ class NotificationService:
             related_user_id=from_user_id,
             priority="normal"
         )
-        
-        self.db.commit()
 
 
 def get_health_suggestions(care_score: CareScore, patient: User) -> List[str]:
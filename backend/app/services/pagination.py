@@ -0,0 +1,39 @@
+"""
+Pagination for Pulse AI
+Newest-first keyset pages over (timestamp, id) for the history listings
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+
+def newest_first_page(
+    query: Query,
+    timestamp_column,
+    id_column,
+    limit: int,
+    before: Optional[datetime] = None,
+    before_id: Optional[int] = None
+) -> Tuple[List[Any], Optional[Dict[str, Any]]]:
+    """
+    One page of `query` ordered by (timestamp, id) descending, and the cursor
+    for the next page (None on the last page). Rows must expose `timestamp`
+    and `id`. The id breaks ties, so rows sharing the boundary timestamp are
+    not skipped; `before` without `before_id` compares timestamps only.
+    """
+    if before is not None:
+        if before_id is not None:
+            query = query.filter(tuple_(timestamp_column, id_column) < tuple_(before, before_id))
+        else:
+            query = query.filter(timestamp_column < before)
+
+    # One extra row tells whether another page follows
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, {"before": rows[-1].timestamp, "before_id": rows[-1].id}
@@ -0,0 +1,156 @@
+"""
+Response Cache for Pulse AI
+In-process TTL cache for hot read endpoints polled by the dashboard
+"""
+
+import threading
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from cachetools import TTLCache
+from fastapi import Response
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.database import WEB_CONCURRENCY
+from app.models.health_data import HealthData
+from app.models.care_score import CareScore
+from app.responses import ORJSONResponse
+from app.services.anomaly_detector import invalidate_baselines
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL cache holding pre-serialized JSON response bodies.
+    Sync endpoints run on a threadpool, so every access goes through a lock.
+
+    With `stale_ttl` set, bodies are also kept for that long after they stop
+    being fresh, to be served while the database is unreachable.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 30, stale_ttl: Optional[float] = None):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._stale = TTLCache(maxsize=maxsize, ttl=stale_ttl) if stale_ttl else None
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            return self._cache.get(key)
+
+    def get_stale(self, key: Hashable) -> Optional[bytes]:
+        if self._stale is None:
+            return None
+        with self._lock:
+            return self._stale.get(key)
+
+    def set(self, key: Hashable, value: bytes) -> None:
+        with self._lock:
+            self._cache[key] = value
+            if self._stale is not None:
+                self._stale[key] = value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop fresh entries keyed by `user_id` or by a tuple starting with it"""
+        with self._lock:
+            for key in list(self._cache.keys()):
+                if key == user_id or (isinstance(key, tuple) and key and key[0] == user_id):
+                    self._cache.pop(key, None)
+
+
+def cached_response(cache: ResponseCache, key: Hashable, build: Callable[[], Any]) -> Response:
+    """
+    Read-through helper: serve the cached body for `key`, otherwise render
+    `build()` and cache it. Falls back to the last known body if the
+    database is down.
+    """
+    body = cache.get(key)
+    if body is None:
+        try:
+            body = ORJSONResponse(build()).body
+        except OperationalError:
+            body = cache.get_stale(key)
+            if body is None:
+                raise
+        else:
+            cache.set(key, body)
+    return Response(content=body, media_type="application/json")
+
+
+async def cached_response_async(
+    cache: ResponseCache, key: Hashable, build: Callable[[], Awaitable[Any]]
+) -> Response:
+    """cached_response() for async endpoints whose payload is built by a coroutine"""
+    body = cache.get(key)
+    if body is None:
+        try:
+            body = ORJSONResponse(await build()).body
+        except OperationalError:
+            body = cache.get_stale(key)
+            if body is None:
+                raise
+        else:
+            cache.set(key, body)
+    return Response(content=body, media_type="application/json")
+
+
+# Invalidation only reaches the writing process, so with several workers a
+# fresh TTL is how long another worker may serve a body from before a write.
+CROSS_WORKER_MAX_TTL = 60
+
+
+def _fresh_ttl(ttl: float) -> float:
+    return min(ttl, CROSS_WORKER_MAX_TTL) if WEB_CONCURRENCY > 1 else ttl
+
+
+# Latest CareScore per user, keyed by user_id
+carescore_cache = ResponseCache(maxsize=10_000, ttl=30)
+
+# Views derived from a user's readings and scores. Writes invalidate them
+# on commit in this process; other workers see the write within the fresh TTL
+# (capped at CROSS_WORKER_MAX_TTL). Stale bodies are only served while the
+# database is unreachable.
+latest_readings_cache = ResponseCache(maxsize=10_000, ttl=_fresh_ttl(30), stale_ttl=3600)     # keyed by user_id
+health_trends_cache = ResponseCache(maxsize=10_000, ttl=_fresh_ttl(300), stale_ttl=3600)      # keyed by (user_id, days)
+health_suggestions_cache = ResponseCache(maxsize=10_000, ttl=_fresh_ttl(900), stale_ttl=3600) # keyed by user_id
+
+
+def invalidate_health_views(user_id: int) -> None:
+    latest_readings_cache.invalidate_user(user_id)
+    health_trends_cache.invalidate_user(user_id)
+    health_suggestions_cache.invalidate_user(user_id)
+
+
+def mark_health_changed(session: Session, user_id: int, readings: bool = True) -> None:
+    """
+    Invalidate the user's health views once the session commits (for bulk
+    writes that skip the ORM). Changed readings also drop learned baselines.
+    """
+    session.info.setdefault("changed_health_user_ids", set()).add(user_id)
+    if readings:
+        session.info.setdefault("changed_reading_user_ids", set()).add(user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_health(session, flush_context):
+    """Remember users whose readings or scores were written in this transaction"""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (HealthData, CareScore)) and obj.user_id is not None:
+            mark_health_changed(session, obj.user_id, readings=isinstance(obj, HealthData))
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_changed_health(session):
+    for user_id in session.info.pop("changed_health_user_ids", ()):
+        invalidate_health_views(user_id)
+    for user_id in session.info.pop("changed_reading_user_ids", ()):
+        invalidate_baselines(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_health(session):
+    session.info.pop("changed_health_user_ids", None)
+    session.info.pop("changed_reading_user_ids", None)
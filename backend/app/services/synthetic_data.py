@@ -3,14 +3,41 @@ Synthetic Data Generator for Pulse AI
 Generates realistic health data with gradual degradation for demo
 """
 
-import random
 import json
+import numpy as np
+from itertools import combinations
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.models.user import User
 from app.models.health_data import HealthData
+from app.models.health_daily import HealthDataDaily, refresh_daily_rollup
+from app.models.user_status import refresh_user_status
+from app.services.response_cache import mark_health_changed
+
+
+# Most symptoms reported on one reading
+MAX_SYMPTOMS = 3
+
+
+def _symptom_sets_json(pool: List[str]) -> Dict[int, List[str]]:
+    """JSON of every set of 1..MAX_SYMPTOMS symptoms from pool, by set size"""
+    return {
+        count: [json.dumps(list(symptoms)) for symptoms in combinations(pool, count)]
+        for count in range(1, MAX_SYMPTOMS + 1)
+    }
+
+
+def _signal_vectors(signals: Tuple[str, ...], table: Dict[str, float], default: float) -> np.ndarray:
+    """Values of table as an array over signals, default where a signal is absent"""
+    return np.array([table.get(signal, default) for signal in signals], dtype=float)
+
+
+def _pattern_vectors(signals: Tuple[str, ...], patterns: Dict[str, Dict[str, float]]) -> Dict[str, np.ndarray]:
+    """Per-day coefficients of each degradation pattern as arrays over signals"""
+    return {pattern: _signal_vectors(signals, coeffs, 0.0) for pattern, coeffs in patterns.items()}
 
 
 class SyntheticDataGenerator:
@@ -52,13 +79,34 @@ class SyntheticDataGenerator:
         }
     }
     
+    # Lowest values degradation can push a signal to
+    DEGRADATION_FLOORS = {
+        'hrv': 10,
+        'sleep_duration': 4,
+        'sleep_quality': 30,
+        'activity_level': 2000
+    }
+    
+    # The tables above as arrays over SIGNALS (column order of the signal
+    # matrices), so all signals are drawn and degraded in single operations
+    SIGNALS = tuple(BASELINE_RANGES)
+    SIGNAL_INDEX = {signal: index for index, signal in enumerate(SIGNALS)}
+    SIGNAL_LOW, SIGNAL_HIGH = np.array(list(BASELINE_RANGES.values()), dtype=float).T
+    DEGRADATION_COEFFS = _pattern_vectors(SIGNALS, DEGRADATION_PATTERNS)
+    SIGNAL_FLOORS = _signal_vectors(SIGNALS, DEGRADATION_FLOORS, -np.inf)
+    
     SYMPTOM_POOL = [
         'fatigue', 'headache', 'dizziness', 'gas', 'bloating',
         'poor_concentration', 'muscle_aches', 'mild_nausea'
     ]
     
-    def __init__(self, db: Session):
+    # Serialized once, so readings pick a prebuilt symptoms value
+    SYMPTOM_SETS_JSON = _symptom_sets_json(SYMPTOM_POOL)
+    
+    def __init__(self, db: Session, seed: Optional[int] = None):
         self.db = db
+        # One generator for all randomness; pass a seed for a reproducible dataset
+        self.rng = np.random.default_rng(seed)
     
     def create_demo_user(self, email: str = "demo@pulseai.com", name: str = "Demo User") -> User:
         """Create or get demo user"""
@@ -88,39 +136,39 @@ class SyntheticDataGenerator:
     def generate_healthy_data(
         self, 
         user_id: int, 
-        days: int = 14
-    ) -> List[HealthData]:
+        days: int = 14,
+        commit: bool = True
+    ) -> List[Dict]:
         """Generate initial healthy baseline data"""
-        data_points = []
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        for day in range(days):
-            current_date = start_date + timedelta(days=day)
-            
-            # Generate 2-4 data points per day
-            num_readings = random.randint(2, 4)
-            
-            for i in range(num_readings):
-                reading_time = current_date + timedelta(hours=random.randint(6, 22))
-                
-                data = HealthData(
-                    user_id=user_id,
-                    timestamp=reading_time,
-                    source='wearable',
-                    heart_rate=self._random_in_range('heart_rate'),
-                    hrv=self._random_in_range('hrv'),
-                    sleep_duration=self._random_in_range('sleep_duration') if i == 0 else None,
-                    sleep_quality=self._random_in_range('sleep_quality') if i == 0 else None,
-                    activity_level=self._random_in_range('activity_level') if i == num_readings - 1 else None,
-                    breathing_rate=self._random_in_range('breathing_rate'),
-                    is_anomaly=0
-                )
-                
-                data_points.append(data)
+        day_of, is_first, is_last, hours = self._reading_layout(days)
+        count = len(day_of)
+        timestamps = self._timestamps(start_date, day_of, hours)
         
-        # Bulk insert
-        self.db.add_all(data_points)
-        self.db.commit()
+        values = self._random_signals(count)
+        heart_rate, hrv, sleep_dur, sleep_qual, activity, breathing = (
+            values[:, self.SIGNAL_INDEX[signal]].tolist()
+            for signal in ('heart_rate', 'hrv', 'sleep_duration', 'sleep_quality', 'activity_level', 'breathing_rate')
+        )
+        
+        data_points = [
+            {
+                'user_id': user_id,
+                'timestamp': timestamp,
+                'source': 'wearable',
+                'heart_rate': heart_rate[i],
+                'hrv': hrv[i],
+                'sleep_duration': sleep_dur[i] if is_first[i] else None,
+                'sleep_quality': sleep_qual[i] if is_first[i] else None,
+                'activity_level': activity[i] if is_last[i] else None,
+                'breathing_rate': breathing[i],
+                'is_anomaly': 0
+            }
+            for i, timestamp in enumerate(timestamps)
+        ]
+        
+        self._insert_readings(user_id, data_points, commit)
         
         return data_points
     
@@ -129,64 +177,62 @@ class SyntheticDataGenerator:
         user_id: int,
         days: int = 30,
         pattern: str = 'sleep_decline',
-        start_day: int = 14
-    ) -> List[HealthData]:
+        start_day: int = 14,
+        commit: bool = True
+    ) -> List[Dict]:
         """Generate data with gradual health degradation"""
-        data_points = []
-        degradation = self.DEGRADATION_PATTERNS.get(pattern, {})
+        coeffs = self.DEGRADATION_COEFFS.get(pattern, np.zeros(len(self.SIGNALS)))
         
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        for day in range(days):
-            current_date = start_date + timedelta(days=day)
-            degradation_factor = max(0, day - start_day) if day >= start_day else 0
-            
-            num_readings = random.randint(2, 4)
+        day_of, is_first, is_last, hours = self._reading_layout(days)
+        count = len(day_of)
+        timestamps = self._timestamps(start_date, day_of, hours)
+        degradation_factor = np.maximum(0, day_of - start_day)
+        
+        # Every signal of every reading, shifted by the pattern's per-day
+        # coefficients times days into the degradation, then floored
+        values = np.maximum(
+            self._random_signals(count) + np.outer(degradation_factor, coeffs),
+            self.SIGNAL_FLOORS
+        )
+        
+        def column(signal: str, decimals: int) -> np.ndarray:
+            return np.round(values[:, self.SIGNAL_INDEX[signal]], decimals)
+        
+        heart_rate = column('heart_rate', 1).tolist()
+        hrv = column('hrv', 1).tolist()
+        sleep_dur = column('sleep_duration', 2).tolist()
+        sleep_qual = column('sleep_quality', 1).tolist()
+        activity = column('activity_level', 0).astype(int).tolist()
+        breathing = column('breathing_rate', 1).tolist()
+        
+        # Anomaly level 0-3 as degradation passes 5, 10 and 15 days
+        is_anomaly = ((degradation_factor > 5).astype(int) + (degradation_factor > 10) + (degradation_factor > 15)).tolist()
+        
+        data_points = []
+        for i, factor in enumerate(degradation_factor.tolist()):
+            # Add symptoms for later days
+            symptoms = None
+            if factor > 7 and is_first[i]:
+                symptom_sets = self.SYMPTOM_SETS_JSON[min(MAX_SYMPTOMS, factor // 5)]
+                symptoms = symptom_sets[self.rng.integers(len(symptom_sets))]
             
-            for i in range(num_readings):
-                reading_time = current_date + timedelta(hours=random.randint(6, 22))
-                
-                # Apply degradation
-                heart_rate = self._random_in_range('heart_rate') + degradation.get('heart_rate', 0) * degradation_factor
-                hrv = max(10, self._random_in_range('hrv') + degradation.get('hrv', 0) * degradation_factor)
-                sleep_dur = max(4, self._random_in_range('sleep_duration') + degradation.get('sleep_duration', 0) * degradation_factor) if i == 0 else None
-                sleep_qual = max(30, self._random_in_range('sleep_quality') + degradation.get('sleep_quality', 0) * degradation_factor) if i == 0 else None
-                activity = max(2000, self._random_in_range('activity_level') + degradation.get('activity_level', 0) * degradation_factor) if i == num_readings - 1 else None
-                breathing = self._random_in_range('breathing_rate')
-                
-                # Determine if anomaly
-                is_anomaly = 0
-                if degradation_factor > 5:
-                    is_anomaly = 1
-                if degradation_factor > 10:
-                    is_anomaly = 2
-                if degradation_factor > 15:
-                    is_anomaly = 3
-                
-                # Add symptoms for later days
-                symptoms = None
-                if degradation_factor > 7 and i == 0:
-                    num_symptoms = min(3, degradation_factor // 5)
-                    symptoms = json.dumps(random.sample(self.SYMPTOM_POOL, num_symptoms))
-                
-                data = HealthData(
-                    user_id=user_id,
-                    timestamp=reading_time,
-                    source='wearable',
-                    heart_rate=round(heart_rate, 1),
-                    hrv=round(hrv, 1),
-                    sleep_duration=round(sleep_dur, 2) if sleep_dur else None,
-                    sleep_quality=round(sleep_qual, 1) if sleep_qual else None,
-                    activity_level=round(activity) if activity else None,
-                    breathing_rate=round(breathing, 1),
-                    symptoms=symptoms,
-                    is_anomaly=is_anomaly
-                )
-                
-                data_points.append(data)
+            data_points.append({
+                'user_id': user_id,
+                'timestamp': timestamps[i],
+                'source': 'wearable',
+                'heart_rate': heart_rate[i],
+                'hrv': hrv[i],
+                'sleep_duration': sleep_dur[i] if is_first[i] else None,
+                'sleep_quality': sleep_qual[i] if is_first[i] else None,
+                'activity_level': activity[i] if is_last[i] else None,
+                'breathing_rate': breathing[i],
+                'symptoms': symptoms,
+                'is_anomaly': is_anomaly[i]
+            })
         
-        self.db.add_all(data_points)
-        self.db.commit()
+        self._insert_readings(user_id, data_points, commit)
         
         return data_points
     
@@ -194,48 +240,83 @@ class SyntheticDataGenerator:
         self, 
         user_id: int, 
         days: int = 30,
-        with_degradation: bool = True
-    ) -> List[HealthData]:
+        with_degradation: bool = True,
+        commit: bool = True
+    ) -> List[Dict]:
         """Generate manual health inputs (BP, sugar)"""
-        data_points = []
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        for day in range(days):
-            # Manual inputs every 2-3 days
-            if day % random.randint(2, 3) != 0:
-                continue
-            
-            current_date = start_date + timedelta(days=day)
-            reading_time = current_date + timedelta(hours=random.randint(8, 20))
-            
-            degradation_factor = day / 30 if with_degradation else 0
-            
-            bp_sys = self._random_in_range('bp_systolic') + (15 * degradation_factor)
-            bp_dia = self._random_in_range('bp_diastolic') + (8 * degradation_factor)
-            sugar = self._random_in_range('blood_sugar') + (20 * degradation_factor)
-            
-            data = HealthData(
-                user_id=user_id,
-                timestamp=reading_time,
-                source='manual',
-                bp_systolic=round(bp_sys, 1),
-                bp_diastolic=round(bp_dia, 1),
-                blood_sugar=round(sugar, 1)
-            )
-            
-            data_points.append(data)
+        # Manual inputs every 2-3 days
+        day_numbers = np.arange(days)
+        input_days = day_numbers[day_numbers % self.rng.integers(2, 4, size=days) == 0]
+        count = len(input_days)
+        timestamps = self._timestamps(start_date, input_days, self.rng.integers(8, 21, size=count))
         
-        self.db.add_all(data_points)
-        self.db.commit()
+        degradation_factor = input_days / 30 if with_degradation else 0
+        
+        values = self._random_signals(count)
+        bp_sys = np.round(values[:, self.SIGNAL_INDEX['bp_systolic']] + (15 * degradation_factor), 1).tolist()
+        bp_dia = np.round(values[:, self.SIGNAL_INDEX['bp_diastolic']] + (8 * degradation_factor), 1).tolist()
+        sugar = np.round(values[:, self.SIGNAL_INDEX['blood_sugar']] + (20 * degradation_factor), 1).tolist()
+        
+        data_points = [
+            {
+                'user_id': user_id,
+                'timestamp': timestamp,
+                'source': 'manual',
+                'bp_systolic': bp_sys[i],
+                'bp_diastolic': bp_dia[i],
+                'blood_sugar': sugar[i]
+            }
+            for i, timestamp in enumerate(timestamps)
+        ]
+        
+        self._insert_readings(user_id, data_points, commit)
         
         return data_points
     
-    def _random_in_range(self, signal: str) -> float:
-        """Get random value within baseline range with natural variation"""
-        low, high = self.BASELINE_RANGES[signal]
-        value = random.uniform(low, high)
+    def _insert_readings(self, user_id: int, rows: List[Dict], commit: bool) -> None:
+        """
+        Insert generated readings as one bulk INSERT (no ORM objects), then
+        refresh what the flush hooks would have: the user's status row,
+        daily rollups and cached health views
+        """
+        if rows:
+            self.db.execute(insert(HealthData), rows)
+            refresh_daily_rollup(self.db.connection(), user_id, {row['timestamp'].date() for row in rows})
+        refresh_user_status(self.db.connection(), user_id)
+        mark_health_changed(self.db, user_id)
+        if commit:
+            self.db.commit()
+    
+    def _reading_layout(self, days: int):
+        """
+        Lay out 2-4 wearable readings per day for all days at once: each
+        reading's day, whether it is the first/last of its day, and its hour
+        """
+        readings_per_day = self.rng.integers(2, 5, size=days)
+        day_of = np.repeat(np.arange(days), readings_per_day)
+        index_in_day = np.arange(len(day_of)) - np.repeat(np.cumsum(readings_per_day) - readings_per_day, readings_per_day)
+        is_first = (index_in_day == 0).tolist()
+        is_last = (index_in_day == readings_per_day[day_of] - 1).tolist()
+        hours = self.rng.integers(6, 23, size=len(day_of))
+        return day_of, is_first, is_last, hours
+    
+    @staticmethod
+    def _timestamps(start_date: datetime, days: np.ndarray, hours: np.ndarray) -> List[datetime]:
+        """start_date plus each reading's day and hour offset, computed as one array"""
+        timestamps = np.datetime64(start_date, 'us') + days.astype('timedelta64[D]') + hours.astype('timedelta64[h]')
+        return timestamps.tolist()
+    
+    def _random_signals(self, size: int) -> np.ndarray:
+        """
+        Random values within baseline range with natural variation, as a
+        (size, len(SIGNALS)) matrix
+        """
+        shape = (size, len(self.SIGNALS))
+        value = self.rng.uniform(self.SIGNAL_LOW, self.SIGNAL_HIGH, shape)
         # Add small random noise
-        noise = random.gauss(0, (high - low) * 0.05)
+        noise = self.rng.normal(0, (self.SIGNAL_HIGH - self.SIGNAL_LOW) * 0.05, shape)
         return value + noise
     
     def generate_complete_demo(self, email: str = "demo@pulseai.com") -> Dict:
@@ -243,23 +324,31 @@ class SyntheticDataGenerator:
         user = self.create_demo_user(email)
         
         # Clear existing data for user
-        self.db.query(HealthData).filter(HealthData.user_id == user.id).delete()
-        self.db.commit()
+        # Bulk deletes skip the flush hooks, so clear the daily rollup as well.
+        # No readings are loaded in this session, so there is nothing to
+        # reconcile in memory after the DELETEs
+        self.db.query(HealthData).filter(HealthData.user_id == user.id).delete(synchronize_session=False)
+        self.db.query(HealthDataDaily).filter(HealthDataDaily.user_id == user.id).delete(synchronize_session=False)
         
         # Generate 45 days of data with degradation starting at day 15
         wearable_data = self.generate_degradation_data(
             user.id, 
             days=45, 
             pattern='sleep_decline',
-            start_day=15
+            start_day=15,
+            commit=False
         )
         
         manual_data = self.generate_manual_inputs(
             user.id, 
             days=45, 
-            with_degradation=True
+            with_degradation=True,
+            commit=False
         )
         
+        # Clearing and regenerating commit together
+        self.db.commit()
+        
         return {
             'user_id': user.id,
             'email': user.email,
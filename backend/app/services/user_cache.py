@@ -0,0 +1,86 @@
+"""
+User Cache for Pulse AI
+In-process TTL cache of user rows for the existence checks and baseline
+reads that open most per-user endpoints
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from cachetools import TTLCache
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Detached snapshot of a user row, safe to share across sessions"""
+    id: int
+    email: str
+    name: str
+    role: Optional[str]
+    is_active: Optional[bool]
+    baseline_heart_rate: Optional[float]
+    baseline_hrv: Optional[float]
+    baseline_sleep_hours: Optional[float]
+    baseline_activity_level: Optional[float]
+    baseline_breathing_rate: Optional[float]
+    baseline_bp_systolic: Optional[float]
+    baseline_bp_diastolic: Optional[float]
+    baseline_blood_sugar: Optional[float]
+
+
+_CACHED_COLUMNS = [getattr(User, name) for name in CachedUser.__dataclass_fields__]
+
+_user_cache = TTLCache(maxsize=10_000, ttl=60)
+_lock = threading.Lock()
+
+
+def get_user_cached(db: Session, user_id: int) -> Optional[CachedUser]:
+    """Return a snapshot of the user, querying the database only on a cache miss"""
+    with _lock:
+        cached = _user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    row = db.query(*_CACHED_COLUMNS).filter(User.id == user_id).first()
+    if not row:
+        # Misses are not cached so newly created users are visible immediately
+        return None
+
+    user = CachedUser(**row._asdict())
+    with _lock:
+        _user_cache[user_id] = user
+    return user
+
+
+def invalidate_user(user_id: int) -> None:
+    with _lock:
+        _user_cache.pop(user_id, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    """Remember users updated or deleted in this transaction"""
+    changed = {
+        obj.id
+        for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, User) and obj.id is not None
+    }
+    if changed:
+        session.info.setdefault("changed_user_ids", set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_changed_users(session):
+    """Evict only once the change is committed, so a concurrent miss can't re-cache old values"""
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_ids", None)
@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration for Pulse AI
+
+Run with:  gunicorn app.main:app -c gunicorn.conf.py
+"""
+
+import multiprocessing
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+
+# Requests mix CPU work (scoring, prompt building, JSON) with blocking DB
+# calls and outbound Gemini requests, so default to the usual 2 * cores + 1
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count() * 2 + 1)
+
+# The app sizes each worker's DB pool from its share of DB_MAX_CONNECTIONS
+# (see app/database.py), so it must see the worker count chosen here. This
+# file is read before the app is imported.
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Import the app once in the master and fork workers from it, so module-level
+# state (models, prompt constants, scoring tables) is shared copy-on-write
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_fork(server, worker):
+    # Connections opened in the master while picking the database must not be
+    # shared with the children; drop them without closing the master's sockets
+    from app.database import engine
+    engine.dispose(close=False)
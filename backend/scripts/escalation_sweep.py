@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Escalation sweep for Pulse AI
+Checks every user's latest CareScore for escalation in batches, for use as a
+periodic (e.g. nightly) job
+"""
+
+import sys
+import os
+
+# Add parent to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+
+from app.database import SessionLocal
+from app.models.care_score import CareScore
+from app.services.escalation_service import EscalationService
+
+# Users checked per batch (one recent-escalation query and one commit each)
+BATCH_SIZE = 1000
+
+
+def latest_care_scores(db, after_user_id: int, limit: int):
+    """Latest CareScore of the next `limit` users with id above after_user_id"""
+    latest = db.query(
+        CareScore.user_id,
+        func.max(CareScore.timestamp).label("timestamp")
+    ).filter(
+        CareScore.user_id > after_user_id
+    ).group_by(CareScore.user_id).order_by(CareScore.user_id).limit(limit).subquery()
+
+    return db.query(CareScore).join(
+        latest,
+        (CareScore.user_id == latest.c.user_id) & (CareScore.timestamp == latest.c.timestamp)
+    ).order_by(CareScore.user_id).all()
+
+
+def main():
+    db = SessionLocal()
+    try:
+        service = EscalationService(db)
+        checked = escalated = 0
+        last_user_id = 0
+
+        while True:
+            care_scores = latest_care_scores(db, last_user_id, BATCH_SIZE)
+            if not care_scores:
+                break
+            last_user_id = care_scores[-1].user_id
+            checked += len({care_score.user_id for care_score in care_scores})
+            escalated += len(service.check_escalations_bulk(care_scores))
+
+        print(f"Checked {checked} users, created {escalated} escalations")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
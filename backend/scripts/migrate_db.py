@@ -5,13 +5,15 @@ Adds missing columns to existing tables and creates new tables
 
 import os
 import sys
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import create_engine, text, inspect, LargeBinary
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database import DATABASE_URL, Base
 from app.models import *  # Import all models to register them
+from app.models.health_daily import ROLLUP_SIGNALS
+from app.models.user_status import LATEST_READING_FIELDS
 
 def run_migration():
     """Run database migrations to sync schema with models"""
@@ -169,6 +171,39 @@ def run_migration():
             """))
             conn.commit()
             print("✓ Created 'api_keys' table")
+        else:
+            existing_cols = [col['name'] for col in inspector.get_columns('api_keys')]
+            if 'key_prefix' not in existing_cols:
+                print("Adding 'key_prefix' column to api_keys...")
+                conn.execute(text("ALTER TABLE api_keys ADD COLUMN key_prefix VARCHAR(16)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_api_keys_key_prefix ON api_keys (key_prefix)"))
+                conn.commit()
+                print("✓ Added 'key_prefix' column")
+
+            # Keys used to be stored as 64-character SHA-256 hex digests;
+            # convert them to the raw 32-byte digest
+            if 'key' in existing_cols:
+                if engine.dialect.name == 'postgresql':
+                    key_type = next(col['type'] for col in inspector.get_columns('api_keys') if col['name'] == 'key')
+                    if not isinstance(key_type, LargeBinary):
+                        print("Converting api_keys.key to binary digests...")
+                        conn.execute(text(
+                            "ALTER TABLE api_keys ALTER COLUMN key TYPE BYTEA USING decode(key, 'hex')"
+                        ))
+                        conn.commit()
+                        print("✓ Converted api_keys.key")
+                else:
+                    hex_keys = conn.execute(text(
+                        "SELECT id, key FROM api_keys WHERE typeof(key) = 'text'"
+                    )).fetchall()
+                    if hex_keys:
+                        print(f"Converting {len(hex_keys)} api_keys.key values to binary digests...")
+                        conn.execute(
+                            text("UPDATE api_keys SET key = :key WHERE id = :id"),
+                            [{"id": row.id, "key": bytes.fromhex(row.key)} for row in hex_keys]
+                        )
+                        conn.commit()
+                        print("✓ Converted api_keys.key")
         
         # Device Registrations table
         if 'device_registrations' not in existing_tables:
@@ -438,6 +473,170 @@ def run_migration():
             conn.commit()
             print("✓ Created 'notifications' table")
     
+    # ============================================
+    # Server-side timestamp defaults
+    # ============================================
+    # Tables created by create_all() only had a Python-side default for
+    # these columns. SQLite cannot alter a column default, so a local
+    # fallback database has to be recreated instead.
+    if engine.dialect.name == "postgresql":
+        timestamp_defaults = [
+            ('users', 'created_at'),
+            ('api_keys', 'created_at'),
+            ('device_registrations', 'registered_at'),
+        ]
+        with engine.connect() as conn:
+            for table_name, col_name in timestamp_defaults:
+                if table_name not in existing_tables:
+                    continue
+                conn.execute(text(
+                    f"ALTER TABLE {table_name} ALTER COLUMN {col_name} SET DEFAULT CURRENT_TIMESTAMP"
+                ))
+                conn.commit()
+                print(f"✓ Set server default on '{table_name}.{col_name}'")
+    
+    # ============================================
+    # User status summary table
+    # ============================================
+    latest_columns = ", ".join(f"latest_{field}" for field in LATEST_READING_FIELDS)
+    if 'user_status_cache' not in existing_tables:
+        print("Creating 'user_status_cache' table...")
+        UserStatusCache.__table__.create(engine)
+        
+        # Backfill from the latest score and reading of every user
+        reading_columns = ", ".join(f"hd.{field}" for field in LATEST_READING_FIELDS)
+        with engine.connect() as conn:
+            conn.execute(text(f"""
+                INSERT INTO user_status_cache (
+                    user_id, care_score, status, score_timestamp,
+                    {latest_columns}, latest_reading_at, updated_at
+                )
+                SELECT u.id, cs.care_score, cs.status, cs.timestamp,
+                       {reading_columns}, hd.timestamp, CURRENT_TIMESTAMP
+                FROM users u
+                LEFT JOIN care_scores cs ON cs.id = (
+                    SELECT id FROM care_scores WHERE user_id = u.id
+                    ORDER BY timestamp DESC LIMIT 1
+                )
+                LEFT JOIN health_data hd ON hd.id = (
+                    SELECT id FROM health_data WHERE user_id = u.id
+                    ORDER BY timestamp DESC LIMIT 1
+                )
+                WHERE cs.id IS NOT NULL OR hd.id IS NOT NULL
+            """))
+            conn.commit()
+        print("✓ Created and backfilled 'user_status_cache' table")
+    else:
+        existing_columns = [col['name'] for col in inspector.get_columns('user_status_cache')]
+        missing = [
+            field for field in LATEST_READING_FIELDS
+            if f"latest_{field}" not in existing_columns
+        ]
+        if missing:
+            with engine.connect() as conn:
+                for field in missing:
+                    conn.execute(text(f"ALTER TABLE user_status_cache ADD COLUMN latest_{field} FLOAT"))
+                
+                # Copy the new signals from each user's latest reading
+                assignments = ", ".join(
+                    f"""latest_{field} = (
+                        SELECT {field} FROM health_data
+                        WHERE health_data.user_id = user_status_cache.user_id
+                        ORDER BY timestamp DESC LIMIT 1
+                    )"""
+                    for field in missing
+                )
+                conn.execute(text(f"UPDATE user_status_cache SET {assignments}"))
+                conn.commit()
+            print(f"✓ Added latest reading columns to 'user_status_cache': {missing}")
+    
+    # ============================================
+    # Daily health rollup table
+    # ============================================
+    if 'health_data_daily' not in existing_tables:
+        print("Creating 'health_data_daily' table...")
+        HealthDataDaily.__table__.create(engine)
+        
+        # Backfill one row per user and day from the raw readings
+        sums = ", ".join(
+            f"SUM(NULLIF({signal}, 0)), COUNT(NULLIF({signal}, 0))"
+            for signal in ROLLUP_SIGNALS
+        )
+        columns = ", ".join(
+            f"{signal}_sum, {signal}_count" for signal in ROLLUP_SIGNALS
+        )
+        with engine.connect() as conn:
+            conn.execute(text(f"""
+                INSERT INTO health_data_daily (user_id, day, {columns}, reading_count, updated_at)
+                SELECT user_id, DATE(timestamp), {sums}, COUNT(*), CURRENT_TIMESTAMP
+                FROM health_data
+                WHERE timestamp IS NOT NULL
+                GROUP BY user_id, DATE(timestamp)
+            """))
+            conn.commit()
+        print("✓ Created and backfilled 'health_data_daily' table")
+    
+    # ============================================
+    # Persisted Gemini suggestion cache
+    # ============================================
+    if 'suggestion_cache' not in existing_tables:
+        print("Creating 'suggestion_cache' table...")
+        SuggestionCacheEntry.__table__.create(engine)
+        print("✓ Created 'suggestion_cache' table")
+    
+    # ============================================
+    # JSON columns (TEXT -> JSONB on PostgreSQL)
+    # ============================================
+    if engine.dialect.name == "postgresql":
+        json_columns = [
+            ('care_scores', 'contributing_signals'),
+            ('escalations', 'health_summary'),
+        ]
+        with engine.connect() as conn:
+            for table_name, col_name in json_columns:
+                if table_name not in existing_tables:
+                    continue
+                columns = {col['name']: col for col in inspector.get_columns(table_name)}
+                if col_name not in columns:
+                    print(f"Adding '{col_name}' column to {table_name}...")
+                    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {col_name} JSONB"))
+                    conn.commit()
+                    print(f"✓ Added '{col_name}' column")
+                elif 'JSON' not in str(columns[col_name]['type']).upper():
+                    print(f"Converting '{table_name}.{col_name}' to JSONB...")
+                    conn.execute(text(
+                        f"ALTER TABLE {table_name} ALTER COLUMN {col_name} TYPE JSONB USING {col_name}::jsonb"
+                    ))
+                    conn.commit()
+                    print(f"✓ Converted '{col_name}' to JSONB")
+    
+    # ============================================
+    # Composite indexes for hot lookups
+    # ============================================
+    # CONCURRENTLY cannot run inside a transaction, so use an autocommit
+    # connection and only request it on PostgreSQL
+    concurrently = "CONCURRENTLY " if engine.dialect.name == "postgresql" else ""
+    composite_indexes = [
+        ('ix_health_data_user_timestamp', 'health_data', 'user_id, timestamp DESC'),
+        ('ix_care_scores_user_timestamp', 'care_scores', 'user_id, timestamp DESC'),
+        ('ix_escalations_user_timestamp', 'escalations', 'user_id, timestamp DESC'),
+        ('ix_escalations_user_level_timestamp', 'escalations', 'user_id, level, timestamp'),
+        ('ix_patient_doctors_patient_doctor', 'patient_doctors', 'patient_id, doctor_id'),
+        ('ix_api_keys_user_active', 'api_keys', 'user_id, is_active'),
+    ]
+    
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index_name, table_name, columns in composite_indexes:
+            if table_name not in existing_tables:
+                continue
+            existing_indexes = [ix['name'] for ix in inspector.get_indexes(table_name)]
+            if index_name not in existing_indexes:
+                print(f"Creating index '{index_name}' on {table_name}...")
+                conn.execute(text(
+                    f"CREATE INDEX {concurrently}IF NOT EXISTS {index_name} ON {table_name} ({columns})"
+                ))
+                print(f"✓ Created index '{index_name}'")
+    
     print("\n✓ Database migration completed successfully!")
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+"""
+Shared fixtures for the backend tests
+Each test gets its own in-memory SQLite database with every table created
+"""
+
+import os
+import sys
+
+# Keep app.database off the local SQLite file; tests bind their own engine
+os.environ["DATABASE_URL"] = "sqlite://"
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  Register every model with Base
+from app.database import Base, get_db
+from app.main import app
+from app.models.user import User
+from app.services import anomaly_detector, auth_service, response_cache, user_cache
+
+
+@pytest.fixture
+def engine():
+    # One shared connection, so every session sees the same in-memory database
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="patient@example.com", name="Test Patient")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def client(db):
+    app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """In-process caches outlive a test's database, so start every test empty"""
+    with auth_service._identity_cache_lock:
+        auth_service._identity_cache.clear()
+    with auth_service._pending_usage_lock:
+        auth_service._pending_usage.clear()
+    with user_cache._lock:
+        user_cache._user_cache.clear()
+    with anomaly_detector._baseline_cache_lock:
+        anomaly_detector._baseline_cache.clear()
+        anomaly_detector._joint_model_cache.clear()
+    for cache in (
+        response_cache.carescore_cache,
+        response_cache.latest_readings_cache,
+        response_cache.health_trends_cache,
+        response_cache.health_suggestions_cache,
+    ):
+        with cache._lock:
+            cache._cache.clear()
+            if cache._stale is not None:
+                cache._stale.clear()
+    yield
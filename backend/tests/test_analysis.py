@@ -0,0 +1,44 @@
+"""
+Tests for the analysis routes
+"""
+
+from datetime import datetime, timedelta
+
+from app.models.care_score import CareScore
+
+
+def add_scores(db, user, timestamps):
+    for timestamp in timestamps:
+        db.add(CareScore(user_id=user.id, timestamp=timestamp, care_score=10, status="stable"))
+    db.commit()
+
+
+def page_through(client, url, limit):
+    params, pages = {"limit": limit}, []
+    while True:
+        body = client.get(url, params=params).json()
+        pages.append(body["history"])
+        if body["next_cursor"] is None:
+            return pages
+        params = {"limit": limit, **body["next_cursor"]}
+
+
+def test_history_pages_across_shared_timestamps(client, db, user):
+    now = datetime(2026, 1, 28, 10, 0)
+    add_scores(db, user, [now, now, now, now - timedelta(hours=1), now - timedelta(hours=2)])
+
+    pages = page_through(client, f"/analysis/carescore/{user.id}/history", limit=2)
+
+    timestamps = [row["timestamp"] for page in pages for row in page]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert len(timestamps) == 5
+    assert timestamps == sorted(timestamps, reverse=True)
+
+
+def test_history_full_last_page_has_no_cursor(client, db, user):
+    now = datetime(2026, 1, 28, 10, 0)
+    add_scores(db, user, [now - timedelta(hours=hours) for hours in range(4)])
+
+    pages = page_through(client, f"/analysis/carescore/{user.id}/history", limit=2)
+
+    assert [len(page) for page in pages] == [2, 2]
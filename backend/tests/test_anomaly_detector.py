@@ -0,0 +1,93 @@
+"""
+Tests for the joint (multivariate) anomaly score
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.models.health_data import HealthData
+from app.services import anomaly_detector
+from app.services.anomaly_detector import AnomalyDetector, MIN_JOINT_SAMPLES
+
+TYPICAL = {"heart_rate": 70, "hrv": 45, "breathing_rate": 15}
+
+# Each vital within its own normal range (|modified z| < 2), but all three
+# off at once
+COMBINED_DRIFT = {"heart_rate": 79, "hrv": 36, "breathing_rate": 17.5}
+
+OVERALL_RISK = {"mild": "mild", "moderate": "moderate", "severe": "high"}
+
+
+def add_vitals(db, user, count, seed=2):
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow()
+    for i in range(count):
+        db.add(HealthData(
+            user_id=user.id,
+            timestamp=now - timedelta(hours=i + 1),
+            heart_rate=float(70 + rng.normal(0, 4)),
+            hrv=float(45 + rng.normal(0, 4)),
+            breathing_rate=float(15 + rng.normal(0, 1))
+        ))
+    db.commit()
+
+
+def test_typical_reading_is_normal(db, user):
+    add_vitals(db, user, 60)
+
+    result = AnomalyDetector(db).detect_anomalies(user.id, TYPICAL)
+
+    assert result["joint_anomaly"]["severity"] == "normal"
+    assert result["has_anomaly"] is False
+    assert result["overall_risk"] == "normal"
+
+
+def test_joint_score_raises_overall_risk(db, user):
+    add_vitals(db, user, 60)
+
+    result = AnomalyDetector(db).detect_anomalies(user.id, COMBINED_DRIFT)
+
+    joint = result["joint_anomaly"]
+    assert joint["score"] < 0
+    assert result["anomalies"] == []
+    assert result["has_anomaly"] is True
+    assert result["overall_risk"] == OVERALL_RISK[joint["severity"]]
+
+
+def test_no_joint_score_without_enough_readings(db, user):
+    add_vitals(db, user, MIN_JOINT_SAMPLES - 1)
+
+    result = AnomalyDetector(db).detect_anomalies(user.id, COMBINED_DRIFT)
+
+    assert result["joint_anomaly"] is None
+
+
+def test_joint_model_uses_callers_window(db, user):
+    add_vitals(db, user, 60)
+
+    AnomalyDetector(db).detect_anomalies(user.id, TYPICAL, days=30)
+
+    assert (user.id, 30) in anomaly_detector._joint_model_cache
+    assert (user.id, 14) not in anomaly_detector._joint_model_cache
+
+
+def test_new_readings_do_not_refit_joint_model(db, user):
+    add_vitals(db, user, 60)
+    detector = AnomalyDetector(db)
+    model = detector.get_joint_model(user.id)
+
+    add_vitals(db, user, 1, seed=3)
+
+    assert detector.get_joint_model(user.id) is model
+
+
+def test_model_is_fitted_once_enough_readings_arrive(db, user):
+    add_vitals(db, user, MIN_JOINT_SAMPLES - 1)
+    detector = AnomalyDetector(db)
+    assert detector.get_joint_model(user.id) is None
+
+    add_vitals(db, user, 1, seed=3)
+
+    assert detector.get_joint_model(user.id) is not None
@@ -0,0 +1,119 @@
+"""
+Tests for API key authentication
+"""
+
+from datetime import datetime, timedelta
+
+from app.models.api_key import APIKey
+from app.services import auth_service
+from app.services.auth_service import AuthService, get_key_prefix, hash_api_key
+
+
+def test_revoked_key_is_rejected(db, user):
+    raw_key, api_key = AuthService(db).generate_api_key(user.id)
+    assert AuthService(db).resolve_api_key(raw_key).key_id == api_key.id
+
+    assert AuthService(db).revoke_api_key(api_key.id)
+
+    assert AuthService(db).resolve_api_key(raw_key) is None
+    assert AuthService(db).validate_api_key(raw_key) is None
+
+
+def test_revoked_key_is_rejected_with_dev_keys_enabled(db, user, monkeypatch):
+    monkeypatch.setattr(auth_service, "ALLOW_DEV_API_KEYS", True)
+    raw_key, api_key = AuthService(db).generate_api_key(user.id)
+    AuthService(db).revoke_api_key(api_key.id)
+
+    assert AuthService(db).resolve_api_key(raw_key) is None
+    assert AuthService(db).validate_api_key(raw_key) is None
+
+
+def test_dev_format_key_is_rejected_by_default(db, user):
+    assert AuthService(db).resolve_api_key(f"pulseai_{user.id}_forged") is None
+
+
+def test_dev_format_key_is_accepted_when_enabled(db, user, monkeypatch):
+    monkeypatch.setattr(auth_service, "ALLOW_DEV_API_KEYS", True)
+
+    identity = AuthService(db).resolve_api_key(f"pulseai_{user.id}_devkey")
+
+    assert identity.user_id == user.id
+    assert identity.key_id is None
+
+
+def test_issued_key_is_stored_hashed_and_resolves(db, user):
+    raw_key, api_key = AuthService(db).generate_api_key(user.id)
+
+    stored = db.get(APIKey, api_key.id)
+    assert stored.key == hash_api_key(raw_key)
+    assert len(stored.key) == 32
+    assert stored.key_prefix == get_key_prefix(raw_key)
+
+    identity = AuthService(db).resolve_api_key(raw_key)
+    assert identity == (api_key.id, user.id, user.email, user.name, None)
+    assert AuthService(db).validate_api_key(raw_key).id == user.id
+
+
+def test_unknown_key_is_rejected(db, user):
+    raw_key, _ = AuthService(db).generate_api_key(user.id)
+
+    # Same prefix, different secret
+    assert AuthService(db).resolve_api_key(raw_key + "x") is None
+    assert AuthService(db).resolve_api_key("") is None
+
+
+def test_expired_key_is_rejected(db, user, monkeypatch):
+    monkeypatch.setattr(auth_service, "ALLOW_DEV_API_KEYS", True)
+    raw_key, api_key = AuthService(db).generate_api_key(user.id, expires_in_days=1)
+    assert AuthService(db).resolve_api_key(raw_key) is not None
+
+    db.get(APIKey, api_key.id).expires_at = datetime.utcnow() - timedelta(minutes=1)
+    db.commit()
+    with auth_service._identity_cache_lock:
+        auth_service._identity_cache.clear()
+
+    assert AuthService(db).resolve_api_key(raw_key) is None
+    assert AuthService(db).validate_api_key(raw_key) is None
+
+
+def test_cached_identity_is_rejected_once_expired(db, user):
+    raw_key, _ = AuthService(db).generate_api_key(user.id, expires_in_days=1)
+    identity = AuthService(db).resolve_api_key(raw_key)
+
+    # Served from the identity cache, which checks expiry itself
+    with auth_service._identity_cache_lock:
+        auth_service._identity_cache[hash_api_key(raw_key)] = identity._replace(
+            expires_at=datetime.utcnow() - timedelta(minutes=1)
+        )
+
+    assert AuthService(db).resolve_api_key(raw_key) is None
+
+
+def test_legacy_key_without_prefix_resolves_and_revokes(db, user):
+    raw_key = f"pulseai_{user.id}_legacysecret"
+    api_key = APIKey(user_id=user.id, key=hash_api_key(raw_key), key_prefix=None, is_active=True)
+    db.add(api_key)
+    db.commit()
+
+    assert AuthService(db).resolve_api_key(raw_key).key_id == api_key.id
+
+    AuthService(db).revoke_api_key(api_key.id)
+    assert AuthService(db).resolve_api_key(raw_key) is None
+
+
+def test_usage_is_recorded_for_accepted_key(db, user):
+    raw_key, api_key = AuthService(db).generate_api_key(user.id)
+
+    AuthService(db).resolve_api_key(raw_key)
+
+    assert auth_service._pending_usage[api_key.id][0] == 1
+
+
+def test_inactive_users_key_is_rejected_without_recording_usage(db, user):
+    raw_key, api_key = AuthService(db).generate_api_key(user.id)
+    user.is_active = False
+    db.commit()
+
+    assert AuthService(db).resolve_api_key(raw_key) is None
+    assert AuthService(db).validate_api_key(raw_key) is None
+    assert api_key.id not in auth_service._pending_usage
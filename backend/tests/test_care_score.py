@@ -0,0 +1,71 @@
+"""
+Tests for the CareScore routes
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.models.care_score import CareScore
+from app.routes.care_score import (
+    BATCH_SIGNALS, calculate_simple_care_score, calculate_simple_care_score_batch
+)
+
+
+def test_history_pages_across_shared_timestamps(client, db, user):
+    now = datetime(2026, 1, 28, 10, 0)
+    for timestamp in [now, now, now, now - timedelta(hours=1), now - timedelta(hours=2)]:
+        db.add(CareScore(user_id=user.id, timestamp=timestamp, care_score=10, status="stable"))
+    db.commit()
+
+    params, pages = {"limit": 2}, []
+    while params is not None:
+        body = client.get(f"/care-score/history/{user.id}", params=params).json()
+        pages.append(body["history"])
+        params = body["next_cursor"] and {"limit": 2, **body["next_cursor"]}
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    timestamps = [row["timestamp"] for page in pages for row in page]
+    assert timestamps == sorted(timestamps, reverse=True)
+
+
+def random_readings(count, seed=0):
+    """Readings and heart-rate baselines over each rule's thresholds, with gaps and zeros"""
+    rng = np.random.default_rng(seed)
+    ranges = {
+        'heart_rate': (40, 130), 'hrv': (10, 80), 'sleep_duration': (3, 10),
+        'bp_systolic': (100, 200), 'bp_diastolic': (60, 130),
+        'blood_sugar': (50, 250), 'activity_level': (0, 12000)
+    }
+    thresholds = {
+        'heart_rate': (55, 100), 'hrv': (30,), 'sleep_duration': (6, 7),
+        'bp_systolic': (130, 140, 180), 'bp_diastolic': (90, 120),
+        'blood_sugar': (70, 140, 200), 'activity_level': (3000,)
+    }
+    columns = []
+    for signal in BATCH_SIGNALS:
+        low, high = ranges[signal]
+        column = np.round(rng.uniform(low, high, count), 1)
+        edges = rng.random(count) < 0.2
+        column[edges] = rng.choice(thresholds[signal], edges.sum())
+        column[rng.random(count) < 0.1] = 0
+        column[rng.random(count) < 0.15] = np.nan
+        columns.append(column)
+    baselines = rng.choice([np.nan, 0, 60, 72, 85], count)
+    return np.column_stack(columns), baselines
+
+
+def test_batch_scorer_matches_per_reading_scorer():
+    vitals, baselines = random_readings(20_000)
+
+    scores, flags = calculate_simple_care_score_batch(vitals, baselines)
+
+    for row, baseline, score, flag in zip(vitals, baselines, scores, flags):
+        health_data = {
+            signal: None if np.isnan(value) else float(value)
+            for signal, value in zip(BATCH_SIGNALS, row)
+        }
+        user = SimpleNamespace(baseline_heart_rate=None if np.isnan(baseline) else float(baseline))
+        expected = calculate_simple_care_score(health_data, user)
+        assert (float(score), int(flag)) == (expected['score'], expected['flags']), health_data
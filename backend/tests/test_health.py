@@ -0,0 +1,75 @@
+"""
+Tests for the health data routes
+"""
+
+from app.models.care_score import CareScore
+from app.routes import health
+
+
+class FakeSuggestionsService:
+    def __init__(self):
+        self.calls = []
+
+    async def generate_suggestions_async(self, **context):
+        self.calls.append(context)
+        return {"suggestions": ["Take a short walk"], "source": "fake"}
+
+
+def test_suggestions_pass_score_components_as_factors(client, db, user, monkeypatch):
+    service = FakeSuggestionsService()
+    monkeypatch.setattr(health, "get_health_suggestions_service", lambda: service)
+    db.add(CareScore(
+        user_id=user.id,
+        care_score=45,
+        status="moderate",
+        severity_score=20,
+        persistence_score=12,
+        cross_signal_score=6
+    ))
+    db.commit()
+
+    response = client.get(f"/health/user/{user.id}/suggestions")
+
+    assert response.status_code == 200
+    assert response.json()["source"] == "fake"
+    assert service.calls == [{
+        "care_score": 45,
+        "status": "moderate",
+        "contributing_factors": [
+            "elevated severity in vital signs",
+            "sustained patterns over several days",
+            "multiple signals showing changes"
+        ],
+        "recent_metrics": None
+    }]
+
+
+def test_suggestions_without_care_score_use_defaults(client, user):
+    response = client.get(f"/health/user/{user.id}/suggestions")
+
+    assert response.status_code == 200
+    assert response.json()["source"] == "default"
+
+
+def test_health_data_pages_across_shared_timestamps(client, user):
+    # Batch items without a timestamp are all stamped with the same time
+    response = client.post("/health/ingest-batch", json={
+        "user_id": user.id,
+        "items": [{"heart_rate": 60 + i} for i in range(5)]
+    })
+    assert response.status_code == 200
+
+    params, ids = {"limit": 2}, []
+    while True:
+        response = client.get(f"/health/user/{user.id}", params=params)
+        ids += [row["id"] for row in response.json()]
+        if "X-Next-Before" not in response.headers:
+            break
+        params = {
+            "limit": 2,
+            "before": response.headers["X-Next-Before"],
+            "before_id": response.headers["X-Next-Before-Id"]
+        }
+
+    assert ids == sorted(ids, reverse=True)
+    assert len(ids) == 5
@@ -0,0 +1,114 @@
+"""
+Tests for the write-maintained summaries: the user_status_cache row, the
+health_data_daily rollup, and the health views evicted on commit
+"""
+
+from datetime import datetime, timedelta
+
+from app.models.care_score import CareScore
+from app.models.health_daily import HealthDataDaily
+from app.models.health_data import HealthData
+from app.models.user_status import UserStatusCache
+
+
+def add_reading(db, user, timestamp, heart_rate, **signals):
+    reading = HealthData(user_id=user.id, timestamp=timestamp, heart_rate=heart_rate, **signals)
+    db.add(reading)
+    db.commit()
+    return reading
+
+
+def test_ingest_updates_status_row(client, db, user):
+    response = client.post("/health/ingest", json={"user_id": user.id, "heart_rate": 72, "hrv": 48})
+    assert response.status_code == 200
+
+    status = db.get(UserStatusCache, user.id)
+    assert (status.latest_heart_rate, status.latest_hrv) == (72, 48)
+    assert status.care_score is None
+
+    body = client.get(f"/analysis/status/{user.id}").json()
+    assert body["latest_reading"]["heart_rate"] == 72
+    assert body["current_care_score"]["status"] == "unknown"
+
+
+def test_batch_ingest_updates_status_row_and_daily_rollup(client, db, user):
+    day = datetime(2026, 1, 28)
+    response = client.post("/health/ingest-batch", json={
+        "user_id": user.id,
+        "items": [
+            {"timestamp": (day + timedelta(hours=8)).isoformat(), "heart_rate": 60},
+            {"timestamp": (day + timedelta(hours=9)).isoformat(), "heart_rate": 80},
+            {"timestamp": (day + timedelta(hours=10)).isoformat(), "heart_rate": 0}
+        ]
+    })
+    assert response.status_code == 200
+
+    assert db.get(UserStatusCache, user.id).latest_heart_rate == 0
+    rollup = db.get(HealthDataDaily, (user.id, day.date()))
+    assert rollup.reading_count == 3
+    assert rollup.average("heart_rate") == 70  # Zero readings count as missing
+
+
+def test_care_score_write_updates_status_row(client, db, user):
+    timestamp = datetime(2026, 1, 28, 10, 0)
+    add_reading(db, user, timestamp, 70)
+
+    db.add(CareScore(user_id=user.id, timestamp=timestamp, care_score=42, status="mild"))
+    db.commit()
+
+    status = db.get(UserStatusCache, user.id)
+    assert (status.care_score, status.status, status.score_timestamp) == (42, "mild", timestamp)
+    assert status.latest_heart_rate == 70
+
+    body = client.get(f"/analysis/status/{user.id}").json()
+    assert body["current_care_score"] == {"score": 42, "status": "mild", "timestamp": "2026-01-28T10:00:00"}
+
+
+def test_rollback_leaves_status_row_and_rollup_unchanged(db, user):
+    day = datetime(2026, 1, 28)
+    add_reading(db, user, day + timedelta(hours=8), 70)
+
+    db.add(HealthData(user_id=user.id, timestamp=day + timedelta(hours=9), heart_rate=120))
+    db.add(CareScore(user_id=user.id, timestamp=day + timedelta(hours=9), care_score=90, status="high"))
+    db.flush()
+    db.rollback()
+
+    status = db.get(UserStatusCache, user.id)
+    assert status.latest_heart_rate == 70
+    assert status.care_score is None
+    assert db.get(HealthDataDaily, (user.id, day.date())).reading_count == 1
+
+
+def test_moving_a_reading_refreshes_both_days(db, user):
+    day = datetime(2026, 1, 28)
+    reading = add_reading(db, user, day + timedelta(hours=8), 70)
+
+    reading.timestamp = day + timedelta(days=1, hours=8)
+    db.commit()
+
+    assert db.get(HealthDataDaily, (user.id, day.date())) is None
+    assert db.get(HealthDataDaily, (user.id, (day + timedelta(days=1)).date())).reading_count == 1
+
+
+def test_commit_evicts_cached_latest_readings(client, db, user):
+    add_reading(db, user, datetime(2026, 1, 28, 8, 0), 70)
+    assert client.get(f"/health/user/{user.id}/latest").json()["heart_rate"] == 70
+
+    add_reading(db, user, datetime(2026, 1, 28, 9, 0), 75)
+
+    assert client.get(f"/health/user/{user.id}/latest").json()["heart_rate"] == 75
+
+
+def test_rollback_keeps_cached_latest_readings(client, db, user):
+    add_reading(db, user, datetime(2026, 1, 28, 8, 0), 70)
+    client.get(f"/health/user/{user.id}/latest")
+
+    db.add(HealthData(user_id=user.id, timestamp=datetime(2026, 1, 28, 9, 0), heart_rate=75))
+    db.flush()
+    db.rollback()
+    # Written behind the cache's back, so only an eviction would show it
+    db.execute(HealthData.__table__.update().values(heart_rate=99))
+    db.execute(UserStatusCache.__table__.update().values(latest_heart_rate=99))
+    db.commit()
+
+    assert client.get(f"/health/user/{user.id}/latest").json()["heart_rate"] == 70
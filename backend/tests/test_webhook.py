@@ -0,0 +1,53 @@
+"""
+Tests for webhook authentication
+"""
+
+from app.models.health_data import HealthData
+from app.services import auth_service
+from app.services.auth_service import AuthService
+
+HEART_RATE_PAYLOAD = {
+    "dataType": "HeartRate",
+    "records": [{"time": "2026-01-28T10:00:00Z", "value": 75}]
+}
+
+
+def test_ingest_rejects_forged_dev_format_key(client, db, user):
+    response = client.post(
+        "/webhook/ingest",
+        json=HEART_RATE_PAYLOAD,
+        headers={"X-API-Key": f"pulseai_{user.id}_forged"}
+    )
+
+    assert response.status_code == 401
+    assert db.query(HealthData).count() == 0
+
+
+def test_ingest_rejects_revoked_key(client, db, user):
+    raw_key, api_key = AuthService(db).generate_api_key(user.id)
+    AuthService(db).revoke_api_key(api_key.id)
+
+    response = client.post("/webhook/ingest", json=HEART_RATE_PAYLOAD, headers={"X-API-Key": raw_key})
+
+    assert response.status_code == 401
+
+
+def test_ingest_accepts_issued_key(client, db, user):
+    raw_key, _ = AuthService(db).generate_api_key(user.id)
+
+    response = client.post("/webhook/ingest", json=HEART_RATE_PAYLOAD, headers={"X-API-Key": raw_key})
+
+    assert response.status_code == 200
+    assert db.query(HealthData).filter(HealthData.user_id == user.id).count() == 1
+
+
+def test_ingest_accepts_dev_format_key_when_enabled(client, db, user, monkeypatch):
+    monkeypatch.setattr(auth_service, "ALLOW_DEV_API_KEYS", True)
+
+    response = client.post(
+        "/webhook/ingest",
+        json=HEART_RATE_PAYLOAD,
+        headers={"X-API-Key": f"pulseai_{user.id}_devkey"}
+    )
+
+    assert response.status_code == 200